@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import analysis, uploads
+from .endpoints import analysis, analytics, uploads
 
 api_router = APIRouter()
 
@@ -11,8 +11,7 @@ api_router.include_router(
 )
 
 # Upload endpoints
-api_router.include_router(
-    uploads.router, 
-    prefix="/uploads", 
-    tags=["Uploads"]
-) 
\ No newline at end of file
+api_router.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+
+# Analytics endpoints
+api_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
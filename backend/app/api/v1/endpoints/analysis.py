@@ -1,30 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from pydantic import BaseModel
+from contextlib import ExitStack
+import asyncio
 import logging
-from llama_parse import LlamaParse
-from openai import AsyncOpenAI
-import os
 from app.core.config import get_settings
-import json
-import asyncio
-import nest_asyncio
-import sys
 from app.services.parser_service import ParserService
 from app.services.storage_service import StorageService
 from app.services.analysis_service import AnalysisService
+from app.services.resume_store import resume_store, build_resume_document
+from app.services.fit_model import fit_model
 
 # Add debug logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-# Apply nest_asyncio and log the result
-try:
-    nest_asyncio.apply()
-    logger.info("nest_asyncio applied successfully")
-except Exception as e:
-    logger.error(f"Failed to apply nest_asyncio: {str(e)}")
-    raise
-
 router = APIRouter()
 settings = get_settings()
 storage_service = StorageService()
@@ -45,71 +34,124 @@ class AnalysisResponse(BaseModel):
     parsed_job_description: ParsedContent
     analysis_results: dict
 
+
+async def persist_analysis(
+    resume_id: str,
+    resume_filename: str,
+    resume_result: dict,
+    job_description_id: str,
+    analysis_result: dict,
+):
+    """Store the parsed resume and its analysis; failures never affect the response."""
+    try:
+        # Skill extraction runs spaCy; keep it off the event loop
+        document = await asyncio.to_thread(
+            build_resume_document, resume_id, resume_filename, resume_result
+        )
+        await resume_store.upsert_resume(document)
+        await resume_store.save_analysis(resume_id, job_description_id, analysis_result)
+    except Exception as e:
+        logger.error(f"Failed to persist analysis for resume {resume_id}: {str(e)}")
+
+
 @router.post("/", response_model=AnalysisResponse)
-async def analyze_resume(request: AnalysisRequest):
+async def analyze_resume(request: AnalysisRequest, background_tasks: BackgroundTasks):
     logger.info(f"Analysis request received for resume_id: {request.resume_id} and job_description_id: {request.job_description_id}")
-    
+
     # Validate file IDs exist before proceeding
     try:
-        # Check if files exist in storage - use _files instead of files
-        available_files = list(StorageService._files.keys())
-        logger.info(f"Available files in storage: {available_files}")
-        
-        if request.resume_id not in available_files:
+        # Check that both files exist in storage before doing any parsing
+        if not await storage_service.exists(request.resume_id):
             raise HTTPException(
-                status_code=404,
-                detail=f"Resume file not found. Available files: {available_files}"
+                status_code=404, detail=f"Resume file not found: {request.resume_id}"
             )
-            
-        if request.job_description_id not in available_files:
+
+        if not await storage_service.exists(request.job_description_id):
             raise HTTPException(
                 status_code=404,
-                detail=f"Job description file not found. Available files: {available_files}"
+                detail=f"Job description file not found: {request.job_description_id}",
             )
-            
+
         parser_service = ParserService()
-        
-        # Get files from storage
-        try:
-            logger.info(f"Retrieving files from storage...")
-            # Get files - each get_file call returns (filename, content)
-            resume_data = await storage_service.get_file(request.resume_id)
-            logger.info(f"Retrieved resume file: {resume_data[0]}")
-            
-            job_desc_data = await storage_service.get_file(request.job_description_id)
-            logger.info(f"Retrieved job description file: {job_desc_data[0]}")
-            
-        except FileNotFoundError as e:
-            logger.error(f"File retrieval error: {str(e)}")
-            raise HTTPException(status_code=404, detail=str(e))
-        
-        # Parse both documents
-        resume_result = await parser_service.parse_document(resume_data, is_resume=True)
-        job_desc_result = await parser_service.parse_document(job_desc_data, is_resume=False)
-        
-        # Use LLM for analysis
-        analysis_service = AnalysisService()
-        analysis_result = await analysis_service.analyze_resume_fit(
-            resume_result['structured_data'],
-            job_desc_result['structured_data']
+
+        # Get files from storage as buffers (memory-mapped on local disk), not copies;
+        # the stack closes whichever were opened, also when the second one fails
+        with ExitStack() as opened:
+            try:
+                logger.info(f"Retrieving files from storage...")
+                resume_file = opened.enter_context(
+                    await storage_service.open_file(request.resume_id)
+                )
+                logger.info(f"Retrieved resume file: {resume_file.filename}")
+
+                job_desc_file = opened.enter_context(
+                    await storage_service.open_file(request.job_description_id)
+                )
+                logger.info(f"Retrieved job description file: {job_desc_file.filename}")
+
+            except FileNotFoundError as e:
+                logger.error(f"File retrieval error: {str(e)}")
+                raise HTTPException(status_code=404, detail=str(e))
+
+            # Parse both documents
+            resume_result = await parser_service.parse_document(
+                resume_file, is_resume=True
+            )
+            job_desc_result = await parser_service.parse_document(
+                job_desc_file, is_resume=False
+            )
+
+        # The local fit model settles clear rejects and shortlists without an LLM call
+        triage = await fit_model.triage(resume_result, job_desc_result)
+        if triage is not None and triage["decision"] != "llm":
+            logger.info(
+                f"Fit model triaged resume {request.resume_id} as {triage['decision']}"
+            )
+            analysis_result = fit_model.analysis_result(triage)
+        else:
+            # Use LLM for analysis
+            analysis_service = AnalysisService()
+            analysis_result = await analysis_service.analyze_resume_fit(
+                resume_result, job_desc_result
+            )
+            # Every LLM score becomes a training example for the fit model
+            background_tasks.add_task(
+                fit_model.log_example,
+                request.resume_id,
+                request.job_description_id,
+                resume_result,
+                job_desc_result,
+                analysis_result,
+                triage["inputs"] if triage else None,
+            )
+
+        background_tasks.add_task(
+            persist_analysis,
+            request.resume_id,
+            resume_file.filename,
+            resume_result,
+            request.job_description_id,
+            analysis_result,
         )
 
         return {
             "resumeId": request.resume_id,
-            "fileName": resume_data[0],
+            "fileName": resume_file.filename,
             "parsed_resume": {
                 "original_text": resume_result['original_text'],
                 "markdown_content": resume_result['markdown_content'],
-                "structured_data": resume_result['structured_data']
+                "structured_data": resume_result['structured_data'],
             },
             "parsed_job_description": {
                 "original_text": job_desc_result['original_text'],
                 "markdown_content": job_desc_result['markdown_content'],
-                "structured_data": job_desc_result['structured_data']
+                "structured_data": job_desc_result['structured_data'],
             },
-            "analysis_results": analysis_result
+            "analysis_results": analysis_result,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing resume: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
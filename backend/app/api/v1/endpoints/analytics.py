@@ -0,0 +1,225 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import AsyncIterator, Dict, Literal, Optional
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+import csv
+import io
+import json
+import logging
+from app.core.config import get_settings
+from app.services.analytics import analytics_service
+from app.services.pagination import InvalidCursorError
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Number of per-line errors echoed back in a bulk ingestion response
+MAX_REPORTED_ERRORS = 20
+# Events read from MongoDB per batch while exporting
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CSV_FIELDS = ["_id", "timestamp", "event_type", "event_data"]
+# How far ahead of the server's clock a client timestamp may be
+MAX_CLIENT_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class ClientEvent(BaseModel):
+    user_id: str
+    event_type: str
+    event_data: Dict = {}
+    timestamp: Optional[datetime] = None
+
+    @field_validator("user_id")
+    @classmethod
+    def validate_user_id(cls, v):
+        if not ObjectId.is_valid(v):
+            raise ValueError("Invalid ObjectId")
+        return v
+
+    @field_validator("timestamp")
+    @classmethod
+    def normalize_timestamp(cls, v):
+        """
+        Naive UTC, like server-side timestamps ("...Z" parses tz-aware), and
+        no older than ANALYTICS_CLIENT_TIMESTAMP_MAX_AGE_HOURS or later than now
+        plus MAX_CLIENT_CLOCK_SKEW.
+        """
+        if v is None:
+            return v
+        if v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        now = datetime.utcnow()
+        oldest = now - timedelta(
+            hours=settings.ANALYTICS_CLIENT_TIMESTAMP_MAX_AGE_HOURS
+        )
+        return min(max(v, oldest), now + MAX_CLIENT_CLOCK_SKEW)
+
+
+async def iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """Yield the lines of a streamed request body without buffering all of it."""
+    remainder = b""
+    async for chunk in request.stream():
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line
+    if remainder:
+        yield remainder
+
+
+@router.post("/events/bulk")
+async def ingest_events(request: Request):
+    """
+    Ingest client-side events sent as NDJSON, one event object per line.
+
+    Lines are validated and queued one at a time; invalid lines are reported
+    and skipped without rejecting the rest of the batch.
+    """
+    accepted = 0
+    rejected = 0
+    errors = []
+    try:
+        line_number = 0
+        async for line in iter_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            if accepted + rejected >= settings.ANALYTICS_BULK_MAX_EVENTS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=(
+                        "Too many events; send at most "
+                        f"{settings.ANALYTICS_BULK_MAX_EVENTS} per request"
+                    ),
+                )
+            try:
+                event = ClientEvent.model_validate(json.loads(line))
+            except (ValueError, ValidationError) as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+
+            try:
+                await analytics_service.track_event(
+                    event.user_id,
+                    event.event_type,
+                    event.event_data,
+                    timestamp=event.timestamp,
+                )
+            except Exception as e:
+                # Earlier lines are already queued; failing the request would make
+                # the client resend, and duplicate, them
+                logger.error(
+                    f"Error tracking bulk event on line {line_number}: {str(e)}"
+                )
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+            accepted += 1
+
+        logger.info(f"Bulk event ingestion: {accepted} accepted, {rejected} rejected")
+        return {"accepted": accepted, "rejected": rejected, "errors": errors}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting events: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def serialize_event(event: Dict) -> Dict:
+    return jsonable_encoder(event, custom_encoder={ObjectId: str})
+
+
+def validate_user_id(user_id: str) -> str:
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user id")
+    return user_id
+
+
+@router.get("/users/{user_id}/activity")
+async def get_user_activity(
+    user_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = Query(default=settings.ANALYTICS_ACTIVITY_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """
+    A page of a user's events, newest first; follow `next_cursor` for the next page.
+    """
+    validate_user_id(user_id)
+    try:
+        page = await analytics_service.get_user_activity_page(
+            user_id, start_date, end_date, limit=limit, cursor=cursor
+        )
+        page["results"] = [serialize_event(event) for event in page["results"]]
+        return page
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching activity for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def ndjson_lines(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    async for event in events:
+        yield json.dumps(serialize_event(event)) + "\n"
+
+
+async def csv_lines(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    async for event in events:
+        row = serialize_event(event)
+        row["event_data"] = json.dumps(row.get("event_data", {}))
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/users/{user_id}/activity/export")
+async def export_user_activity(
+    user_id: str,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    max_events: int = Query(
+        default=settings.ANALYTICS_EXPORT_MAX_EVENTS,
+        ge=1,
+        le=settings.ANALYTICS_EXPORT_MAX_EVENTS,
+    ),
+):
+    """
+    Stream a user's event history as NDJSON or CSV, newest first and at most
+    `max_events` (ANALYTICS_EXPORT_MAX_EVENTS) events.
+
+    Events are read from a cursor in batches and written out as they arrive,
+    so memory use does not depend on the size of the history.
+    """
+    validate_user_id(user_id)
+    events = analytics_service.iter_user_activity(
+        user_id,
+        start_date,
+        end_date,
+        max_events=max_events,
+        batch_size=EXPORT_BATCH_SIZE,
+    )
+    if format == "csv":
+        body, media_type = csv_lines(events), "text/csv"
+    else:
+        body, media_type = ndjson_lines(events), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="activity-{user_id}.{format}"'
+        },
+    )
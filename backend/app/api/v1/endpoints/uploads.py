@@ -1,9 +1,28 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    UploadFile,
+    File,
+    HTTPException,
+    Query,
+    Header,
+    Request,
+    Response,
+)
+from typing import List, Optional
 from pydantic import BaseModel
 import logging
 import traceback
 from app.services.storage_service import StorageService
+from app.services.bulk_upload import bulk_upload_service
+from app.services.resumable_upload import (
+    resumable_uploads,
+    DigestMismatch,
+    IncompleteUpload,
+    OffsetMismatch,
+    UploadBusy,
+    UploadTooLarge,
+)
 from io import BytesIO
 import uuid
 
@@ -14,14 +33,29 @@ storage_service = StorageService()
 class JobDescriptionText(BaseModel):
     text: str
 
+
+class ResumableUploadCreate(BaseModel):
+    filename: str
+    size: int
+    content_type: Optional[str] = None
+    # SHA-256 hex digest of the whole file, verified on finalize when given
+    digest: Optional[str] = None
+
+
+def upload_headers(upload: dict) -> dict:
+    return {
+        "Upload-Offset": str(upload["offset"]),
+        "Upload-Length": str(upload["size"]),
+    }
+
+
 @router.post("/job-description")
 async def upload_job_description(file: UploadFile = File(...)):
     """Upload a job description file"""
     try:
-        # Store file using store_file method
-        file_id = await storage_service.store_file(file)
-        logger.info(f"File stored with ID: {file_id}")
-        return {"file_id": file_id}
+        stored = await storage_service.store(file)
+        logger.info(f"File stored with ID: {stored['file_id']}")
+        return stored
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -32,18 +66,44 @@ async def upload_resume(file: UploadFile = File(...)):
     try:
         # Log the file upload
         logger.info(f"Uploading resume: {file.filename}")
-        
-        # Use store_file instead of save_file
-        file_id = await storage_service.store_file(file)
-        
+
+        stored = await storage_service.store(file)
+
         # Log successful upload
-        logger.info(f"Successfully uploaded resume with ID: {file_id}")
-        
-        return {"file_id": file_id}
+        logger.info(f"Successfully uploaded resume with ID: {stored['file_id']}")
+
+        return stored
     except Exception as e:
         logger.error(f"Error uploading resume: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/resumes")
+async def upload_resumes(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    parse: bool = Query(
+        False, description="Parse the stored resumes in the background"
+    ),
+):
+    """
+    Upload many resumes at once: any mix of resume files and zip or tar
+    archives of them. Returns a manifest of the stored, skipped and failed files.
+    """
+    try:
+        logger.info(f"Bulk upload of {len(files)} file(s)")
+        manifest = await bulk_upload_service.upload(files)
+        manifest["parse_enqueued"] = parse and bool(manifest["files"])
+        if manifest["parse_enqueued"]:
+            background_tasks.add_task(
+                bulk_upload_service.parse_resumes, manifest["files"]
+            )
+        return manifest
+    except Exception as e:
+        logger.error(f"Error in bulk upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/job-description-text")
 async def upload_job_description_text(job_desc: JobDescriptionText):
     """Upload job description as text"""
@@ -54,27 +114,128 @@ async def upload_job_description_text(job_desc: JobDescriptionText):
             file=file_content,
             filename="job_description.txt"
         )
-        
-        # Store file using store_file method
-        file_id = await storage_service.store_file(file)
-        logger.info(f"Stored job description text with ID: {file_id}")
-        return {"file_id": file_id}
+
+        stored = await storage_service.store(file)
+        logger.info(f"Stored job description text with ID: {stored['file_id']}")
+        return stored
     except Exception as e:
         logger.error(f"Error in upload_job_description_text: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) 
 
+
+@router.post("/resumable", status_code=201)
+async def create_resumable_upload(
+    upload: ResumableUploadCreate, request: Request, response: Response
+):
+    """
+    Start a resumable upload. Send the file in chunks with PATCH, each with
+    an Upload-Offset header; after a failure, HEAD gives the offset to resume
+    from. Finish with POST /resumable/{upload_id}/finalize.
+    """
+    try:
+        created = await resumable_uploads.create(
+            upload.filename, upload.size, upload.content_type, upload.digest
+        )
+        response.headers["Location"] = str(
+            request.url_for("resumable_upload_status", upload_id=created["upload_id"])
+        )
+        response.headers.update(upload_headers(created))
+        return created
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating resumable upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.head("/resumable/{upload_id}")
+async def resumable_upload_status(upload_id: str):
+    """The offset a resumable upload has reached, in the Upload-Offset header"""
+    try:
+        upload = await resumable_uploads.status(upload_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404)
+    return Response(headers={**upload_headers(upload), "Cache-Control": "no-store"})
+
+
+@router.patch("/resumable/{upload_id}")
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+):
+    """Append the request body, which must start at the upload's current offset"""
+    try:
+        # The body is written as it arrives, so memory use stays flat for any chunk size
+        upload = await resumable_uploads.append(
+            upload_id, upload_offset, request.stream()
+        )
+        response.headers.update(upload_headers(upload))
+        return {
+            "upload_id": upload_id,
+            "offset": upload["offset"],
+            "size": upload["size"],
+        }
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OffsetMismatch as e:
+        raise HTTPException(
+            status_code=409, detail=str(e), headers={"Upload-Offset": str(e.offset)}
+        )
+    except UploadBusy as e:
+        raise HTTPException(status_code=423, detail=str(e))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error appending to resumable upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/resumable/{upload_id}/finalize")
+async def finalize_resumable_upload(upload_id: str):
+    """Verify the assembled file's digest and store it; returns its file_id"""
+    try:
+        return await resumable_uploads.finalize(upload_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IncompleteUpload as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadBusy as e:
+        raise HTTPException(status_code=423, detail=str(e))
+    except DigestMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error finalizing resumable upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/resumable/{upload_id}", status_code=204)
+async def abort_resumable_upload(upload_id: str):
+    """Abandon a resumable upload and delete its chunks"""
+    try:
+        await resumable_uploads.abort(upload_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadBusy as e:
+        raise HTTPException(status_code=423, detail=str(e))
+    return Response(status_code=204)
+
+
 @router.get("/debug/storage/{file_id}")
 async def debug_storage(file_id: str):
     """Debug endpoint to check storage content"""
     try:
-        stored_data = storage_service._files.get(file_id)
+        metadata = await storage_service.get_metadata(file_id)
         return {
-            "exists": file_id in storage_service._files,
-            "type": str(type(stored_data)),
-            "is_tuple": isinstance(stored_data, tuple),
-            "length": len(stored_data) if isinstance(stored_data, tuple) else None,
-            "filename": stored_data[0] if isinstance(stored_data, tuple) else None,
-            "content_length": len(stored_data[1]) if isinstance(stored_data, tuple) else None
+            "exists": True,
+            "backend": type(storage_service.backend).__name__,
+            "filename": metadata["filename"],
+            "content_length": metadata["size"],
+            "content_type": metadata["content_type"],
+            "digest": metadata["digest"],
         }
+    except FileNotFoundError:
+        return {"exists": False, "backend": type(storage_service.backend).__name__}
     except Exception as e:
-        return {"error": str(e)} 
\ No newline at end of file
+        return {"error": str(e)}
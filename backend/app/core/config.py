@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Any, Dict, List
 import os
 from dotenv import load_dotenv
 import logging
@@ -11,14 +13,189 @@ logger = logging.getLogger(__name__)
 env_path = Path(__file__).parents[2] / '.env'
 load_dotenv(dotenv_path=env_path)
 
-class Settings(BaseModel):
+# HS256 keys shorter than the 256-bit hash can be brute-forced offline
+JWT_SECRET_MIN_LENGTH = 32
+
+
+class Settings(BaseSettings):
     LLAMA_CLOUD_API_KEY: str = Field(default="")
     OPENAI_API_KEY: str = Field(default="")
     OPENAI_MODEL: str = Field(default="gpt-4o-mini")
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    OPENAI_LARGE_MODEL: str = Field(default="gpt-4o")
+
+    # Shared OpenAI call path (app.services.llm_client)
+    # Per-task model routing, as JSON in the environment: the first rule whose
+    # limits hold picks the model. Long documents go to the large model unless
+    # it is backed up, in which case they stay on the default one
+    LLM_ROUTES: Dict[str, List[Dict[str, Any]]] = Field(
+        default={
+            "summarize": [
+                {"tier": "default", "max_prompt_tokens": 8000},
+                {"tier": "large", "max_in_flight": 16, "max_p95_seconds": 20},
+            ],
+            "parse": [{"tier": "default"}],
+            "score": [
+                {"tier": "default", "max_prompt_tokens": 8000},
+                {"tier": "large", "max_in_flight": 16, "max_p95_seconds": 20},
+            ],
+        }
+    )
+    LLM_TIMEOUT_SECONDS: float = Field(default=30.0)
+    # Send a prompt_cache_key naming the shared prompt prefix of fit scoring
+    # calls, which keeps them on the same provider cache
+    LLM_PROMPT_CACHE_KEYS: bool = Field(default=True)
+    LLM_MAX_RETRIES: int = Field(default=3)
+    # Hedging: duplicate a call still running at the given percentile of recent
+    # latencies; the budget caps hedges to this share of calls
+    LLM_HEDGING_ENABLED: bool = Field(default=False)
+    LLM_HEDGE_PERCENTILE: float = Field(default=95)
+    LLM_HEDGE_MIN_SAMPLES: int = Field(default=20)
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = Field(default=2.0)
+    LLM_HEDGE_BUDGET: float = Field(default=0.05)
+    LLM_LATENCY_WINDOW: int = Field(default=500)
+    # Offline batch jobs (app.services.llm_batch): openai submits them to the
+    # Batch API, local answers them in process through the interactive client.
+    # Input files are split to stay within the Batch API's per-file limits
+    LLM_BATCH_BACKEND: str = Field(default="openai")
+    LLM_BATCH_PATH: str = Field(default="batches")
+    LLM_BATCH_COMPLETION_WINDOW: str = Field(default="24h")
+    LLM_BATCH_POLL_SECONDS: float = Field(default=60.0)
+    LLM_BATCH_MAX_REQUESTS: int = Field(default=50000)
+    LLM_BATCH_MAX_BYTES: int = Field(default=190 * 1024 * 1024)
+
+    # Local fit-score model (app.scripts.train_fit_model). Pairs it is confident
+    # about skip the LLM; LLM scores are logged as its training examples
+    FIT_MODEL_PATH: str = Field(default="models/fit_model.joblib")
+    FIT_TRIAGE_ENABLED: bool = Field(default=True)
+    FIT_TRIAGE_REJECT_BELOW: float = Field(default=35)
+    FIT_TRIAGE_SHORTLIST_ABOVE: float = Field(default=80)
+    # Share of confident pairs still sent to the LLM, to keep labels unbiased
+    FIT_TRIAGE_EXPLORE_RATE: float = Field(default=0.05)
+    FIT_EXAMPLES_ENABLED: bool = Field(default=True)
+
+    # Server settings used by app.serve; 0 workers means one per CPU
+    SERVER_HOST: str = Field(default="0.0.0.0")
+    SERVER_PORT: int = Field(default=8000)
+    SERVER_WORKERS: int = Field(default=0)
+
+    # Upload storage: memory (single process only), local, gridfs or azure.
+    # Every backend but memory also keeps its upload records in MongoDB by default
+    STORAGE_BACKEND: str = Field(default="memory")
+    STORAGE_CHUNK_SIZE: int = Field(default=1024 * 1024)
+    STORAGE_LOCAL_PATH: str = Field(default="uploads")
+    STORAGE_GRIDFS_BUCKET: str = Field(default="uploads")
+    # "UseDevelopmentStorage=true" targets a local Azurite emulator
+    AZURE_STORAGE_CONNECTION_STRING: str = Field(default="")
+    AZURE_STORAGE_CONTAINER: str = Field(default="uploads")
+    # Where upload records and blob reference counts live: memory or mongo;
+    # empty picks memory for the memory backend and mongo otherwise
+    STORAGE_CATALOG: str = Field(default="")
+    # Uploads larger than this are spooled to a temporary file while hashed
+    STORAGE_SPOOL_MAX_MEMORY: int = Field(default=8 * 1024 * 1024)
+    # A job run every interval deletes blobs unreferenced past the grace period
+    STORAGE_GC_GRACE_SECONDS: int = Field(default=3600)
+    STORAGE_GC_INTERVAL_MINUTES: int = Field(default=60)
+
+    # Bulk and archive uploads: files stored at once, files per request,
+    # largest file (also guards against archive bombs), parses at once and
+    # skipped entries listed in the manifest (the rest are only counted)
+    BULK_UPLOAD_CONCURRENCY: int = Field(default=8)
+    BULK_UPLOAD_MAX_FILES: int = Field(default=1000)
+    BULK_UPLOAD_MAX_FILE_SIZE: int = Field(default=25 * 1024 * 1024)
+    BULK_PARSE_CONCURRENCY: int = Field(default=4)
+    BULK_UPLOAD_MAX_REPORTED_SKIPPED: int = Field(default=100)
+
+    # Resumable uploads: chunks are assembled under this directory, which
+    # every worker must share, and abandoned uploads expire
+    RESUMABLE_UPLOAD_PATH: str = Field(default="uploads_incoming")
+    RESUMABLE_UPLOAD_MAX_SIZE: int = Field(default=500 * 1024 * 1024)
+    RESUMABLE_UPLOAD_EXPIRY_HOURS: int = Field(default=24)
+
+    # Authentication settings. Without a JWT secret no tokens are issued or
+    # accepted; a secret must be at least JWT_SECRET_MIN_LENGTH characters
+    JWT_SECRET_KEY: str = Field(default="")
+    ALGORITHM: str = Field(default="HS256")
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=15)
+    # Threads running bcrypt for the async password helpers
+    PASSWORD_HASH_WORKERS: int = Field(default=4)
+    # Verified token payloads cached per process; 0 disables the cache
+    TOKEN_CACHE_SIZE: int = Field(default=10000)
+    TOKEN_CACHE_TTL_SECONDS: int = Field(default=300)
+
+    # Database settings
+    DATABASE_URL: str = Field(default="mongodb://localhost:27017")
+    MONGODB_DB_NAME: str = Field(default="talent_lens")
+    MONGODB_MAX_CONNECTIONS: int = Field(default=100)
+    MONGODB_MIN_CONNECTIONS: int = Field(default=0)
+    MONGODB_MAX_IDLE_TIME_MS: int = Field(default=300000)
+    MONGODB_CONNECT_TIMEOUT_MS: int = Field(default=5000)
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = Field(default=5000)
+    # 0 waits indefinitely; long analytics aggregations need headroom
+    MONGODB_SOCKET_TIMEOUT_MS: int = Field(default=60000)
+    # Comma-separated compressors by preference (zstd and snappy need extra packages)
+    MONGODB_COMPRESSORS: str = Field(default="zlib")
+    # Connections opened at startup so the first requests don't pay for the handshake
+    MONGODB_WARMUP_CONNECTIONS: int = Field(default=10)
+    MONGODB_PING_INTERVAL_SECONDS: int = Field(default=15)
+    # Number of parsed resumes sent to MongoDB per bulk_write in batch runs
+    MONGODB_BULK_BATCH_SIZE: int = Field(default=500)
+
+    # Search settings
+    # Past this many matches, searches return total_at_least instead of total
+    SEARCH_EXACT_TOTAL_LIMIT: int = Field(default=10000)
+    SEARCH_FACET_SIZE: int = Field(default=20)
+    # Answer skill searches from the in-process inverted index once it is built
+    SKILL_INDEX_ENABLED: bool = Field(default=True)
+    SKILL_INDEX_REFRESH_MINUTES: int = Field(default=15)
+
+    # Analytics settings
+    ANALYTICS_BUFFER_ENABLED: bool = Field(default=True)
+    ANALYTICS_BUFFER_MAX_BATCH_SIZE: int = Field(default=500)
+    ANALYTICS_BUFFER_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0)
+    ANALYTICS_BUFFER_MAX_SIZE: int = Field(default=10000)
+    # drop_oldest, drop_newest or block
+    ANALYTICS_BUFFER_OVERFLOW_POLICY: str = Field(default="drop_oldest")
+    ANALYTICS_ROLLUPS_ENABLED: bool = Field(default=True)
+    ANALYTICS_ROLLUP_INTERVAL_MINUTES: int = Field(default=5)
+    # Only hours older than this are rolled up; must exceed the buffer flush interval
+    ANALYTICS_ROLLUP_LAG_SECONDS: int = Field(default=120)
+    # Caps the backfill done by a single run
+    ANALYTICS_ROLLUP_MAX_HOURS_PER_RUN: int = Field(default=168)
+    # Per-day streaming sketches (skill trends, active users), shared via checkpoints
+    ANALYTICS_SKETCHES_ENABLED: bool = Field(default=True)
+    ANALYTICS_SKETCH_CHECKPOINT_SECONDS: int = Field(default=60)
+    ANALYTICS_SKETCH_RETENTION_DAYS: int = Field(default=90)
+    # Skills tracked per day; counts are overestimated by at most events / capacity
+    SKILL_TRENDS_SKETCH_CAPACITY: int = Field(default=500)
+    # 2**p HyperLogLog registers per day, for a standard error of 1.04 / sqrt(2**p)
+    ANALYTICS_HLL_PRECISION: int = Field(default=14)
+    # Upper bound on events returned in one list by get_user_activity
+    ANALYTICS_ACTIVITY_MAX_EVENTS: int = Field(default=10000)
+    ANALYTICS_ACTIVITY_PAGE_SIZE: int = Field(default=100)
+    # Default and largest number of events in one activity export
+    ANALYTICS_EXPORT_MAX_EVENTS: int = Field(default=1000000)
+    # Raw events older than this are deleted by a TTL index; 0 keeps them forever.
+    # Rollups keep dashboard history, but exact=True queries only see retained events.
+    ANALYTICS_EVENT_TTL_DAYS: int = Field(default=0)
+    # Upper bound on events accepted by one bulk ingestion request
+    ANALYTICS_BULK_MAX_EVENTS: int = Field(default=10000)
+    # Client event timestamps are clamped to this many hours ago at most
+    # (and a few minutes ahead), so a skewed client clock cannot backdate events
+    ANALYTICS_CLIENT_TIMESTAMP_MAX_AGE_HOURS: int = Field(default=24)
+
+    @field_validator("JWT_SECRET_KEY")
+    @classmethod
+    def check_jwt_secret(cls, value: str) -> str:
+        if value and len(value) < JWT_SECRET_MIN_LENGTH:
+            raise ValueError(
+                f"JWT_SECRET_KEY must be at least {JWT_SECRET_MIN_LENGTH} characters"
+            )
+        return value
+
+    model_config = SettingsConfigDict(
+        env_file=".env", case_sensitive=True, extra="ignore"
+    )
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -26,4 +203,4 @@ def get_settings() -> Settings:
 
 # Add function to clear settings cache
 def refresh_settings():
-    get_settings.cache_clear()
\ No newline at end of file
+    get_settings.cache_clear()
@@ -1,5 +1,10 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import get_settings
@@ -7,6 +12,20 @@ from .config import get_settings
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a few threads hash in parallel off the event loop.
+# The pool size bounds how much CPU a burst of logins can take.
+_hash_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+    return _hash_executor
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,12 +35,34 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password for async handlers; bcrypt runs on the hashing thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor(), verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash for async handlers; bcrypt runs on the hashing thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), get_password_hash, password)
+
+
+class MissingSecretKey(RuntimeError):
+    """Raised when a token is to be signed but JWT_SECRET_KEY is not set."""
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    if not settings.JWT_SECRET_KEY:
+        raise MissingSecretKey("JWT_SECRET_KEY is not set; refusing to sign tokens")
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = datetime.utcnow() + timedelta(
+            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        )
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(
         to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM
@@ -29,11 +70,73 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+class TokenCache:
+    """
+    LRU cache of verified token payloads.
+
+    An entry lives until the token's own `exp` or `ttl` seconds after it was
+    verified, whichever comes first, so an expired token is never served from
+    the cache. Only successful verifications are cached.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        # verify_token is sync and may be called from threadpool-run dependencies
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if time.time() >= expires_at:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return dict(payload)
+
+    def put(self, token: str, payload: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if isinstance(payload.get("exp"), (int, float)):
+            expires_at = min(expires_at, payload["exp"])
+        with self._lock:
+            self._entries[token] = (expires_at, dict(payload))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+
+
 def verify_token(token: str) -> Optional[dict]:
+    # An empty key would accept any token signed with an empty key
+    if not settings.JWT_SECRET_KEY:
+        return None
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(
             token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        return payload
     except JWTError:
-        return None 
\ No newline at end of file
+        return None
+    token_cache.put(token, payload)
+    return payload
@@ -1,33 +1,108 @@
+from typing import Dict, Optional
+from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+import asyncio
+import logging
+import time
 from ..core.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class MongoDB:
     client: AsyncIOMotorClient = None
     db = None
+    # Result of the latest ping, for readiness checks
+    healthy: bool = False
+    last_ping: Optional[datetime] = None
+    last_ping_ms: Optional[float] = None
+    last_error: Optional[str] = None
 
 
 db = MongoDB()
 
 
 async def connect_to_mongo():
+    """Create the pooled client and open the warm-up connections."""
     db.client = AsyncIOMotorClient(
         settings.DATABASE_URL,
         maxPoolSize=settings.MONGODB_MAX_CONNECTIONS,
-        minPoolSize=settings.MONGODB_MIN_CONNECTIONS
+        minPoolSize=settings.MONGODB_MIN_CONNECTIONS,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS or None,
+        compressors=settings.MONGODB_COMPRESSORS or None,
+        appname="talent-lens",
     )
-    db.db = db.client.talent_lens
+    db.db = db.client[settings.MONGODB_DB_NAME]
+    await warm_up(settings.MONGODB_WARMUP_CONNECTIONS)
+
+
+async def warm_up(connections: int):
+    """
+    Run `connections` concurrent pings so the pool holds that many open sockets.
+
+    Concurrent operations each check out their own connection, which forces
+    the driver to do the TCP/TLS handshake and authentication now rather than
+    on the first requests after a deploy.
+    """
+    if connections <= 0:
+        await ping()
+        return
+    started = time.perf_counter()
+    results = await asyncio.gather(*(ping() for _ in range(connections)))
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Warmed up {sum(results)}/{connections} MongoDB connections "
+        f"in {elapsed:.0f} ms"
+    )
+
+
+async def ping() -> bool:
+    """Ping the server and record the outcome on `db`. Never raises."""
+    started = time.perf_counter()
+    try:
+        await db.client.admin.command("ping")
+        db.healthy = True
+        db.last_error = None
+        db.last_ping_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        if db.healthy or db.last_error is None:
+            logger.error(f"MongoDB ping failed: {str(e)}")
+        db.healthy = False
+        db.last_error = str(e)
+        db.last_ping_ms = None
+    db.last_ping = datetime.utcnow()
+    return db.healthy
+
+
+def health() -> Dict:
+    return {
+        "healthy": db.healthy,
+        "last_ping": db.last_ping,
+        "last_ping_ms": db.last_ping_ms,
+        "last_error": db.last_error,
+    }
 
 
 async def close_mongo_connection():
     if db.client:
         db.client.close()
+        db.client = None
+        db.db = None
+        db.healthy = False
 
 
 # Database collections
 def get_collection(collection_name: str):
+    if db.db is None:
+        raise RuntimeError(
+            "MongoDB is not connected; connect_to_mongo() runs in the app lifespan"
+        )
     return db.db[collection_name]
 
 
@@ -35,4 +110,160 @@ def get_collection(collection_name: str):
 USERS_COLLECTION = "users"
 RESUMES_COLLECTION = "resumes"
 JOBS_COLLECTION = "jobs"
-ANALYTICS_COLLECTION = "analytics" 
\ No newline at end of file
+ANALYTICS_COLLECTION = "analytics"
+ANALYSES_COLLECTION = "analyses"
+ANALYTICS_HOURLY_COLLECTION = "analytics_hourly"
+ANALYTICS_SEARCH_TERMS_COLLECTION = "analytics_search_terms_hourly"
+ANALYTICS_DAILY_USERS_COLLECTION = "analytics_daily_users"
+ANALYTICS_DAILY_COLLECTION = "analytics_daily"
+ANALYTICS_ROLLUP_STATE_COLLECTION = "analytics_rollup_state"
+ANALYTICS_SKETCHES_COLLECTION = "analytics_sketches"
+UPLOAD_FILES_COLLECTION = "upload_files"
+UPLOAD_BLOBS_COLLECTION = "upload_blobs"
+FIT_EXAMPLES_COLLECTION = "fit_examples"
+
+
+# Indexes backing the queries in SearchService and the upserts in ResumeStore.
+# A collection can only carry one text index, so each one lists every field
+# that $text searches against.
+INDEXES = {
+    RESUMES_COLLECTION: [
+        IndexModel(
+            [("file_id", ASCENDING)], name="file_id_unique", unique=True, sparse=True
+        ),
+        IndexModel([("skills_normalized", ASCENDING)], name="skills_normalized"),
+        IndexModel(
+            [("location", ASCENDING), ("total_experience", DESCENDING)],
+            name="location_experience",
+        ),
+        IndexModel(
+            [
+                ("skills_normalized", ASCENDING),
+                ("location", ASCENDING),
+                ("total_experience", DESCENDING),
+            ],
+            name="skills_location_experience",
+        ),
+        IndexModel(
+            [("title", TEXT), ("skills", TEXT), ("processed_data.summary", TEXT)],
+            name="resume_text",
+            weights={"title": 5, "skills": 3, "processed_data.summary": 1},
+        ),
+    ],
+    USERS_COLLECTION: [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("full_name", TEXT), ("email", TEXT)], name="user_text"),
+    ],
+    ANALYSES_COLLECTION: [
+        IndexModel(
+            [("resume_id", ASCENDING), ("job_description_id", ASCENDING)],
+            name="resume_job_unique",
+            unique=True,
+        ),
+    ],
+    ANALYTICS_COLLECTION: [
+        # Serves activity pages and exports, sorted by (timestamp, _id) per user
+        IndexModel(
+            [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="user_timestamp_id",
+        ),
+        IndexModel(
+            [("event_type", ASCENDING), ("timestamp", DESCENDING)],
+            name="event_type_timestamp",
+        ),
+        IndexModel([("received_at", ASCENDING)], name="received_at"),
+        IndexModel(
+            [("timestamp", ASCENDING)],
+            name="timestamp",
+            **(
+                {"expireAfterSeconds": settings.ANALYTICS_EVENT_TTL_DAYS * 86400}
+                if settings.ANALYTICS_EVENT_TTL_DAYS > 0
+                else {}
+            ),
+        ),
+    ],
+    # Rollups are written with $merge, which needs a unique index on its `on` fields
+    ANALYTICS_HOURLY_COLLECTION: [
+        IndexModel(
+            [("hour", ASCENDING), ("event_type", ASCENDING)],
+            name="hour_event_type",
+            unique=True,
+        ),
+    ],
+    ANALYTICS_SEARCH_TERMS_COLLECTION: [
+        IndexModel(
+            [("hour", ASCENDING), ("query", ASCENDING)], name="hour_query", unique=True
+        ),
+    ],
+    ANALYTICS_DAILY_USERS_COLLECTION: [
+        IndexModel(
+            [("date", ASCENDING), ("user_id", ASCENDING)], name="date_user", unique=True
+        ),
+    ],
+    ANALYTICS_SKETCHES_COLLECTION: [
+        IndexModel([("kind", ASCENDING), ("date", ASCENDING)], name="kind_date"),
+    ],
+    UPLOAD_FILES_COLLECTION: [
+        IndexModel([("digest", ASCENDING)], name="digest"),
+    ],
+    # Blob _id is the content digest; this one serves the garbage-collection sweep
+    UPLOAD_BLOBS_COLLECTION: [
+        IndexModel(
+            [("refs", ASCENDING), ("zero_since", ASCENDING)], name="refs_zero_since"
+        ),
+    ],
+    FIT_EXAMPLES_COLLECTION: [
+        IndexModel(
+            [("resume_id", ASCENDING), ("job_description_id", ASCENDING)],
+            name="resume_job_unique",
+            unique=True,
+        ),
+        IndexModel(
+            [("feature_version", ASCENDING), ("updated_at", ASCENDING)],
+            name="feature_version_updated_at",
+        ),
+    ],
+}
+
+
+# Server error code for an existing index whose options differ from the requested ones
+INDEX_OPTIONS_CONFLICT = 85
+
+
+async def create_indexes():
+    """Create the indexes every collection relies on. Safe to run on every startup."""
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created = await get_collection(collection_name).create_indexes(indexes)
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # Changing a TTL needs collMod; create_indexes refuses to alter the index
+            await _update_ttls(collection_name, indexes)
+            try:
+                created = await get_collection(collection_name).create_indexes(indexes)
+            except OperationFailure as e:
+                # e.g. a TTL that was since disabled; drop the index by hand
+                logger.error(
+                    f"Conflicting index options on {collection_name}: {str(e)}"
+                )
+                continue
+        logger.info(f"Ensured indexes on {collection_name}: {created}")
+
+
+async def _update_ttls(collection_name: str, indexes):
+    for index in indexes:
+        document = index.document
+        if "expireAfterSeconds" in document:
+            await db.db.command(
+                "collMod",
+                collection_name,
+                index={
+                    "name": document["name"],
+                    "expireAfterSeconds": document["expireAfterSeconds"],
+                },
+            )
+            logger.info(
+                f"Set TTL of {collection_name}.{document['name']} to "
+                f"{document['expireAfterSeconds']}s"
+            )
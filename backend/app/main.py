@@ -1,7 +1,21 @@
 from fastapi import FastAPI, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse, Response
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response
+from contextlib import asynccontextmanager
 from app.api.v1.api import api_router
+from app.db.mongodb import (
+    connect_to_mongo,
+    close_mongo_connection,
+    create_indexes,
+    ping,
+    health,
+)
+from app.core.config import get_settings
+from app.services.skill_index import skill_index
+from app.services.analytics import event_buffer, analytics_service
+from app.services.analytics_rollups import analytics_rollups
+from app.services.storage_service import StorageService
+from app.services.resumable_upload import resumable_uploads
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import logging
 import os
@@ -9,12 +23,108 @@ import os
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+scheduler = AsyncIOScheduler()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Application startup")
+    await connect_to_mongo()
+    try:
+        await create_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create MongoDB indexes: {str(e)}")
+    if settings.SKILL_INDEX_ENABLED:
+        try:
+            await skill_index.build()
+        except Exception as e:
+            logger.error(f"Failed to build skill index: {str(e)}")
+        # Pick up resumes written by other workers
+        scheduler.add_job(
+            skill_index.build,
+            "interval",
+            minutes=settings.SKILL_INDEX_REFRESH_MINUTES,
+            id="skill_index_refresh",
+            replace_existing=True,
+        )
+    if settings.ANALYTICS_BUFFER_ENABLED:
+        await event_buffer.start()
+    if settings.ANALYTICS_ROLLUPS_ENABLED:
+        scheduler.add_job(
+            analytics_rollups.run,
+            "interval",
+            minutes=settings.ANALYTICS_ROLLUP_INTERVAL_MINUTES,
+            id="analytics_rollups",
+            replace_existing=True,
+            max_instances=1,
+        )
+    if settings.ANALYTICS_SKETCHES_ENABLED:
+        try:
+            await analytics_service.load_sketches()
+        except Exception as e:
+            logger.error(f"Failed to load analytics sketches: {str(e)}")
+        scheduler.add_job(
+            analytics_service.checkpoint_sketches,
+            "interval",
+            seconds=settings.ANALYTICS_SKETCH_CHECKPOINT_SECONDS,
+            id="analytics_sketches",
+            replace_existing=True,
+            max_instances=1,
+        )
+    # Keeps the readiness state current and idle pooled connections alive
+    scheduler.add_job(
+        ping,
+        "interval",
+        seconds=settings.MONGODB_PING_INTERVAL_SECONDS,
+        id="mongodb_ping",
+        replace_existing=True,
+        max_instances=1,
+    )
+    # Deletes upload blobs that no file references any more
+    scheduler.add_job(
+        StorageService().collect_garbage,
+        "interval",
+        minutes=settings.STORAGE_GC_INTERVAL_MINUTES,
+        id="storage_gc",
+        replace_existing=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        resumable_uploads.expire,
+        "interval",
+        minutes=settings.STORAGE_GC_INTERVAL_MINUTES,
+        id="resumable_upload_expiry",
+        replace_existing=True,
+        max_instances=1,
+    )
+    # Start the scheduler
+    scheduler.start()
+
+    yield
+
+    logger.info("Application shutdown")
+    # Check if scheduler is running before shutting down
+    if scheduler.running:
+        scheduler.shutdown()
+    # Write out buffered analytics events before the connection closes
+    await event_buffer.stop()
+    if settings.ANALYTICS_SKETCHES_ENABLED:
+        try:
+            await analytics_service.checkpoint_sketches()
+        except Exception as e:
+            logger.error(f"Failed to checkpoint analytics sketches: {str(e)}")
+    await StorageService().close()
+    await close_mongo_connection()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="TalentLens API",
     description="API for resume analysis and job matching",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -24,6 +134,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the browser read resumable upload offsets
+    expose_headers=["Location", "Upload-Offset", "Upload-Length"],
 )
 
 # Root endpoint with HTML response
@@ -223,27 +335,31 @@ async def health_check():
     </html>
     """
 
-# Include API router
-app.include_router(api_router, prefix="/api/v1")
 
-scheduler = AsyncIOScheduler()
+# Readiness probe for load balancers and orchestrators
+@app.get("/ready")
+async def readiness_check():
+    status = health()
+    return JSONResponse(
+        status_code=200 if status["healthy"] else 503,
+        content={
+            "status": "ready" if status["healthy"] else "unavailable",
+            "mongodb": {
+                **status,
+                "last_ping": (
+                    status["last_ping"].isoformat() if status["last_ping"] else None
+                ),
+            },
+        },
+    )
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Application startup")
-    # Start the scheduler
-    scheduler.start()
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Application shutdown")
-    # Check if scheduler is running before shutting down
-    if scheduler.running:
-        scheduler.shutdown()
+# Include API router
+app.include_router(api_router, prefix="/api/v1")
 
 @app.get('/favicon.ico', include_in_schema=False)
 async def favicon():
     favicon_path = os.path.join(os.path.dirname(__file__), "static", "favicon.ico")
     if os.path.exists(favicon_path):
         return FileResponse(favicon_path)
-    return Response(status_code=204)
\ No newline at end of file
+    return Response(status_code=204)
@@ -1,111 +1,293 @@
 import os
 import json
-from os.path import join, dirname, abspath
-from dotenv import load_dotenv
-from openai import OpenAI
-from utils.prompting_instructions import FIT_SCORE_SYSTEM_PROMPT  # Import the prompt
+import asyncio
+import argparse
+from datetime import datetime
+from os.path import join, dirname, abspath, splitext
 from colorama import init, Fore, Style
+from ..core.config import get_settings
+from ..services.analysis_service import fit_score_messages
+from ..services.llm_client import llm_client
+from ..services.llm_batch import (
+    BatchRunner,
+    chat_request,
+    completion_content,
+    create_batch_backend,
+)
 
 # Initialize colorama for Windows
 init()
 
 # Define directories
 BACKEND_DIR = dirname(abspath(__file__))
-ENV_PATH = join(BACKEND_DIR, '.env')
 JOB_DESC_DIR = join(BACKEND_DIR, 'parsed_job_desc', 'json')
 RESUME_DIR = join(BACKEND_DIR, 'parsed_resumes', 'json')
 OUTPUT_DIR = join(BACKEND_DIR, 'relevance_score')
+# Pair manifests of submitted batch jobs, for collecting their results later
+MANIFEST_DIR = join(OUTPUT_DIR, 'batches')
+DEFAULT_JOB_DESC = 'JD-Data-Engineer.json'  # Example file
 
-# Debug: Print the actual path we're trying to load
-print(f"{Fore.CYAN}Loading .env from: {Style.BRIGHT}{ENV_PATH}{Style.RESET_ALL}")
+# API keys and models come from backend/.env through the app settings
+settings = get_settings()
 
-# Load environment variables from backend/.env
-if not os.path.exists(ENV_PATH):
-    raise FileNotFoundError(f".env file not found at {ENV_PATH}")
 
-load_dotenv(ENV_PATH, override=True)  # Added override=True to ensure our values take precedence
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
-# Get and verify environment variables
-llama_cloud_api_key = os.environ.get("LLAMA_CLOUD_API_KEY")
-openai_api_key = os.environ.get("OPENAI_API_KEY")
-llm_model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=openai_api_key)
+def fit_score_pairs(job_desc_files):
+    """
+    (job description file, resume file, output file) for every pair. With a
+    single job description, outputs keep their fit_score_<resume> names.
+    """
+    resume_files = sorted(f for f in os.listdir(RESUME_DIR) if f.endswith('.json'))
+    pairs = []
+    for job_desc_file in job_desc_files:
+        prefix = '' if len(job_desc_files) == 1 else f"{splitext(job_desc_file)[0]}_"
+        for resume_filename in resume_files:
+            output_file = join(OUTPUT_DIR, f"fit_score_{prefix}{resume_filename}")
+            pairs.append(
+                (
+                    join(JOB_DESC_DIR, job_desc_file),
+                    join(RESUME_DIR, resume_filename),
+                    output_file,
+                )
+            )
+    return pairs
 
-# Create output directory if it doesn't exist
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
 
-# Load job description
-job_desc_file = join(JOB_DESC_DIR, 'JD-Data-Engineer.json')  # Example file
-with open(job_desc_file, 'r', encoding='utf-8') as f:
-    job_desc = json.load(f)
-
-# Function to calculate fit score using OpenAI
-def calculate_fit_score_with_llm(resume, job_desc):
-    # Use the imported system prompt
-    system_prompt = FIT_SCORE_SYSTEM_PROMPT
-
-    # Prepare the input for the model
-    input_content = {
-        "job_description": job_desc,
-        "resume": resume
+def fit_score_request(resume, job_desc, model=None):
+    """
+    Keyword arguments of the chat completion that scores a resume against a job
+    description.
+    """
+    # The system prompt and job description lead, so every resume scored against
+    # the same job description shares a cached prompt prefix
+    request = {
+        "messages": fit_score_messages(
+            json.dumps(job_desc, sort_keys=True), json.dumps(resume, sort_keys=True)
+        ),
+        "temperature": 0.3,
+        "response_format": {"type": "json_object"},
     }
+    if model:
+        request["model"] = model
+    return request
+
 
+def save_fit_score(output_file, response_content):
     try:
-        # Call OpenAI API
-        completion = openai_client.chat.completions.create(
-            model=llm_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps(input_content)}
-            ],
-            temperature=0.3,
-            response_format={"type": "json_object"}
+        fit_score = json.loads(response_content)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing JSON response: {e}")
+        print(f"Response content: {response_content}")
+        raise
+    if os.path.exists(output_file):
+        print(
+            f"{Fore.YELLOW}Overwriting existing fit score file: "
+            f"{output_file}{Style.RESET_ALL}"
         )
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(fit_score, f, indent=2)
+    print(
+        f"{Fore.GREEN}{Style.BRIGHT}✓ Saved fit score to: "
+        f"{output_file}{Style.RESET_ALL}"
+    )
 
-        # Get the response content
-        response_content = completion.choices[0].message.content
-        print(f"{Fore.MAGENTA}Raw API Response: {Style.BRIGHT}{response_content}{Style.RESET_ALL}")  # Debug print
 
+async def score_interactive(pairs, model=None):
+    """Score each pair with its own chat completion, as they are needed."""
+    for job_desc_file, resume_file, output_file in pairs:
+        print(
+            f"\n{Fore.BLUE}{Style.BRIGHT}Processing resume: "
+            f"{os.path.basename(resume_file)}{Style.RESET_ALL}"
+        )
         try:
-            # Parse the response
-            fit_score = json.loads(response_content)
-            return fit_score
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON response: {e}")
-            print(f"Response content: {response_content}")
-            raise
-
-    except Exception as e:
-        print(f"Error calling OpenAI API: {e}")
-        raise
+            # The model is routed by LLM_ROUTES unless --model is given
+            completion = await llm_client.chat(
+                task="score",
+                **fit_score_request(
+                    load_json(resume_file), load_json(job_desc_file), model
+                ),
+            )
+            response_content = completion.choices[0].message.content
+            print(
+                f"{Fore.MAGENTA}Raw API Response: "
+                f"{Style.BRIGHT}{response_content}{Style.RESET_ALL}"
+            )  # Debug print
+            save_fit_score(output_file, response_content)
+        except Exception as e:
+            print(
+                f"{Fore.RED}{Style.BRIGHT}Error processing "
+                f"{os.path.basename(resume_file)}: {e}{Style.RESET_ALL}"
+            )
+            continue  # Continue with next resume even if one fails
 
-# Process all resumes in the directory
-resume_files = [f for f in os.listdir(RESUME_DIR) if f.endswith('.json')]
-print(f"\n{Fore.CYAN}{Style.BRIGHT}Found {len(resume_files)} resume files to process{Style.RESET_ALL}")
 
-for resume_filename in resume_files:
-    print(f"\n{Fore.BLUE}{Style.BRIGHT}Processing resume: {resume_filename}{Style.RESET_ALL}")
-    
-    # Load resume
-    resume_file = join(RESUME_DIR, resume_filename)
-    try:
-        with open(resume_file, 'r', encoding='utf-8') as f:
-            resume = json.load(f)
-
-        # Calculate fit score using OpenAI
-        fit_score = calculate_fit_score_with_llm(resume, job_desc)
-
-        # Save output
-        output_file = join(OUTPUT_DIR, f"fit_score_{resume_filename}")
-        if os.path.exists(output_file):
-            print(f"{Fore.YELLOW}Overwriting existing fit score file: {output_file}{Style.RESET_ALL}")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(fit_score, f, indent=2)
-        print(f"{Fore.GREEN}{Style.BRIGHT}✓ Saved fit score to: {output_file}{Style.RESET_ALL}")
-
-    except Exception as e:
-        print(f"{Fore.RED}{Style.BRIGHT}Error processing {resume_filename}: {e}{Style.RESET_ALL}")
-        continue  # Continue with next resume even if one fails
\ No newline at end of file
+async def submit_batch(pairs, model, backend, runner):
+    """
+    Submit every pair as one batch job through `runner`; returns the path of its
+    manifest.
+    """
+    # A batch input file may only use one model, so batches are not routed
+    model = model or settings.OPENAI_MODEL
+    outputs = {}
+    requests = []
+    for index, (job_desc_file, resume_file, output_file) in enumerate(pairs):
+        custom_id = f"pair-{index}"
+        try:
+            requests.append(
+                chat_request(
+                    custom_id,
+                    fit_score_request(
+                        load_json(resume_file), load_json(job_desc_file), model
+                    ),
+                )
+            )
+            outputs[custom_id] = output_file
+        except Exception as e:
+            print(
+                f"{Fore.RED}{Style.BRIGHT}Error reading "
+                f"{os.path.basename(resume_file)}: {e}{Style.RESET_ALL}"
+            )
+
+    name = f"fit-score-{datetime.utcnow():%Y%m%d-%H%M%S}"
+    batch_ids = await runner.submit(requests, name)
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    manifest_file = join(MANIFEST_DIR, f"{name}.json")
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(
+            {
+                "backend": backend,
+                "model": model,
+                "batch_ids": batch_ids,
+                "outputs": outputs,
+            },
+            f,
+            indent=2,
+        )
+    print(
+        f"{Fore.CYAN}{Style.BRIGHT}Submitted {len(requests)} pairs "
+        f"in {len(batch_ids)} batch(es); manifest: {manifest_file}{Style.RESET_ALL}"
+    )
+    return manifest_file
+
+
+async def collect_batch(manifest_file, poll_seconds=None, runner=None):
+    """
+    Wait for a submitted batch job and write each pair's fit score. Local
+    batches run in the submitting process, so they can only be collected
+    through the `runner` that submitted them.
+    """
+    manifest = load_json(manifest_file)
+    if manifest["backend"] == "local":
+        if runner is None:
+            raise ValueError(
+                f"{manifest_file} is a local batch; "
+                "it only runs in the process that submitted it"
+            )
+        if poll_seconds is None:
+            poll_seconds = 1
+    runner = runner or BatchRunner(create_batch_backend(manifest["backend"]))
+    print(
+        f"{Fore.CYAN}Waiting for {len(manifest['batch_ids'])} batch(es) of "
+        f"{manifest_file}{Style.RESET_ALL}"
+    )
+    await runner.wait(manifest["batch_ids"], poll_seconds=poll_seconds)
+    results = await runner.results(manifest["batch_ids"])
+
+    failed = 0
+    for custom_id, output_file in manifest["outputs"].items():
+        try:
+            if custom_id not in results:
+                raise ValueError("no result; the batch ended before answering it")
+            save_fit_score(output_file, completion_content(results[custom_id]))
+        except Exception as e:
+            failed += 1
+            print(
+                f"{Fore.RED}{Style.BRIGHT}Error scoring "
+                f"{os.path.basename(output_file)}: {e}{Style.RESET_ALL}"
+            )
+    print(
+        f"\n{Fore.CYAN}{Style.BRIGHT}Saved {len(manifest['outputs']) - failed} "
+        f"fit scores, {failed} failed{Style.RESET_ALL}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Score parsed resumes against parsed job descriptions"
+    )
+    parser.add_argument(
+        "--job-desc",
+        nargs="+",
+        default=[DEFAULT_JOB_DESC],
+        help=f"job description files in {JOB_DESC_DIR}, or 'all'",
+    )
+    parser.add_argument(
+        "--model", help="model to score with; routed by LLM_ROUTES when not given"
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="score every pair in an offline batch job instead of one call at a time",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("openai", "local"),
+        default=settings.LLM_BATCH_BACKEND,
+        help="batch job backend; local answers the batch in process, for testing",
+    )
+    parser.add_argument(
+        "--no-wait", action="store_true", help="submit the batch job and exit"
+    )
+    parser.add_argument(
+        "--collect",
+        metavar="MANIFEST",
+        help="collect the results of a submitted batch job",
+    )
+    parser.add_argument(
+        "--poll-seconds", type=float, help="seconds between batch status checks"
+    )
+    args = parser.parse_args()
+    # The local backend only runs while this process does
+    if args.batch and args.backend == "local" and args.no_wait:
+        parser.error(
+            "--no-wait needs --backend openai; local batches stop with this process"
+        )
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if args.collect:
+        if load_json(args.collect)["backend"] == "local":
+            parser.error(
+                "--collect needs an openai batch; "
+                "local batches are collected by the run that submits them"
+            )
+        await collect_batch(args.collect, args.poll_seconds)
+        return
+
+    job_desc_files = args.job_desc
+    if job_desc_files == ["all"]:
+        job_desc_files = sorted(
+            f for f in os.listdir(JOB_DESC_DIR) if f.endswith('.json')
+        )
+    pairs = fit_score_pairs(job_desc_files)
+    print(
+        f"\n{Fore.CYAN}{Style.BRIGHT}Found {len(pairs)} resume and job description "
+        f"pairs to process{Style.RESET_ALL}"
+    )
+
+    if not args.batch:
+        await score_interactive(pairs, args.model)
+        return
+    runner = BatchRunner(create_batch_backend(args.backend))
+    manifest_file = await submit_batch(pairs, args.model, args.backend, runner)
+    if not args.no_wait:
+        await collect_batch(manifest_file, args.poll_seconds, runner)
+    else:
+        print(f"Collect the results later with --collect {manifest_file}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
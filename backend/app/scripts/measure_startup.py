@@ -0,0 +1,109 @@
+from typing import Dict, List
+from pathlib import Path
+import argparse
+import json
+import subprocess
+import sys
+
+# Packages that must only be imported on first use, never while the API starts
+HEAVY_MODULES = (
+    "llama_parse",
+    "llama_index",
+    "openai",
+    "nest_asyncio",
+    "spacy",
+    "numpy",
+    "pandas",
+    "sklearn",
+)
+
+# Import-time budget for app.main, in milliseconds
+STARTUP_BUDGET_MS = 1000
+
+BACKEND_ROOT = Path(__file__).parents[2]
+
+
+def measure_import(module: str = "app.main") -> Dict:
+    """
+    Import `module` in a fresh interpreter under `-X importtime`.
+
+    Returns the module's cumulative import time, the slowest imports and the
+    heavy packages that ended up loaded.
+    """
+    code = f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [
+            part.strip() for part in line.replace("import time:", "|", 1).split("|")
+        ]
+        imports.append(
+            {
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    total = next(
+        (entry["cumulative_ms"] for entry in imports if entry["module"] == module), None
+    )
+    return {
+        "module": module,
+        "total_ms": total,
+        "slowest": sorted(
+            imports, key=lambda entry: entry["cumulative_ms"], reverse=True
+        ),
+        "heavy_modules": sorted(
+            {name.split(".")[0] for name in loaded} & set(HEAVY_MODULES)
+        ),
+    }
+
+
+def report(measurement: Dict, top: int) -> List[str]:
+    lines = [f"{measurement['module']}: {measurement['total_ms']:.0f} ms"]
+    lines += [
+        f"  {entry['cumulative_ms']:8.1f} ms  {entry['module']}"
+        for entry in measurement["slowest"][:top]
+    ]
+    if measurement["heavy_modules"]:
+        lines.append(
+            f"Heavy modules loaded at import: {', '.join(measurement['heavy_modules'])}"
+        )
+    return lines
+
+
+def main():
+    """
+    Measure API import time; exits non-zero when over budget or a heavy module is loaded
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument(
+        "--top", type=int, default=20, help="number of slowest imports to list"
+    )
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    measurement = measure_import(args.module)
+    print("\n".join(report(measurement, args.top)))
+    if measurement["total_ms"] > args.budget_ms or measurement["heavy_modules"]:
+        print(
+            f"Startup budget of {args.budget_ms:.0f} ms exceeded "
+            "or heavy modules loaded"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
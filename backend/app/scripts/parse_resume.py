@@ -1,11 +1,14 @@
 import os
 import json
+import asyncio
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
 from llama_parse import LlamaParse
 from ..utils.prompting_instructions import RESUME_PARSER_SYSTEM_PROMPT
 from ..utils.resume_schema import ResumeOutput
+from ..db.mongodb import connect_to_mongo, close_mongo_connection
+from ..services.resume_store import resume_store, build_resume_document
+from ..services.llm_client import llm_client
 from typing import List
 import logging
 
@@ -20,12 +23,10 @@ class ResumeParser:
     def __init__(self):
         # Load environment variables
         load_dotenv()
-        
+
         # Initialize API clients
         self.llama_parser = LlamaParse(api_key=os.getenv("LLAMA_CLOUD_API_KEY"))
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = os.getenv("OPENAI_MODEL", "gpt-4-1106-preview")
-        
+
         # Set up directories
         self.input_dir = Path("uploads/resumes")
         self.output_dir = Path("processed/resumes")
@@ -35,36 +36,37 @@ class ResumeParser:
         """Parse a single resume file and return structured data"""
         try:
             logger.info(f"Processing resume: {file_path}")
-            
+
             # First pass: Convert to markdown using LlamaParse
             markdown_content = self.llama_parser.parse_document(
                 file_path,
                 result_type="markdown"
             )
-            
+
             # Second pass: Structure the content using OpenAI
-            completion = await self.openai_client.chat.completions.create(
-                model=self.model,
+            # The model is routed by LLM_ROUTES, as in the API
+            completion = await llm_client.chat(
+                task="parse",
                 messages=[
                     {"role": "system", "content": RESUME_PARSER_SYSTEM_PROMPT},
-                    {"role": "user", "content": markdown_content}
+                    {"role": "user", "content": markdown_content},
                 ],
                 response_format={"type": "json_object"},
-                temperature=0.3
+                temperature=0.3,
             )
-            
+
             # Parse and validate the response
             json_response = json.loads(completion.choices[0].message.content)
             resume_output = ResumeOutput.model_validate(json_response)
-            
+
             # Save the processed output
             output_file = self.output_dir / f"{file_path.stem}_processed.json"
             with open(output_file, "w", encoding="utf-8") as f:
                 f.write(resume_output.model_dump_json(indent=2))
-            
+
             logger.info(f"Successfully processed resume: {file_path}")
             return resume_output
-            
+
         except Exception as e:
             logger.error(f"Error processing resume {file_path}: {str(e)}")
             raise
@@ -72,24 +74,39 @@ class ResumeParser:
     async def process_directory(self) -> List[ResumeOutput]:
         """Process all resume files in the input directory"""
         results = []
-        
+        documents = []
+
         # Supported file extensions
         supported_extensions = {".pdf", ".docx", ".doc", ".txt"}
-        
+
         try:
             for file_path in self.input_dir.iterdir():
                 if file_path.suffix.lower() in supported_extensions:
                     try:
                         result = await self.parse_single_resume(file_path)
                         results.append(result)
+                        # Skill extraction runs spaCy; keep it off the event loop
+                        documents.append(
+                            await asyncio.to_thread(
+                                build_resume_document,
+                                file_path.name,
+                                file_path.name,
+                                result.model_dump(mode="json", exclude_none=True),
+                            )
+                        )
                     except Exception as e:
                         logger.error(f"Failed to process {file_path}: {str(e)}")
                         continue
                 else:
                     logger.warning(f"Skipping unsupported file: {file_path}")
-            
+
+            # Persist the whole run with batched bulk writes
+            if documents:
+                totals = await resume_store.bulk_upsert_resumes(documents)
+                logger.info(f"Persisted {len(documents)} resumes to MongoDB: {totals}")
+
             return results
-            
+
         except Exception as e:
             logger.error(f"Error processing directory: {str(e)}")
             raise
@@ -97,15 +114,17 @@ class ResumeParser:
 async def main():
     """Main entry point for the resume parsing script"""
     try:
+        await connect_to_mongo()
         parser = ResumeParser()
         results = await parser.process_directory()
         logger.info(f"Successfully processed {len(results)} resumes")
-        
+
     except Exception as e:
         logger.error(f"Script execution failed: {str(e)}")
         raise
+    finally:
+        await close_mongo_connection()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
-# ... rest of the script ... 
\ No newline at end of file
+# ... rest of the script ...
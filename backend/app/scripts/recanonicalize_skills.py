@@ -0,0 +1,29 @@
+from ..db.mongodb import connect_to_mongo, close_mongo_connection
+from ..services.resume_store import resume_store
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Recompute canonical skills for all stored resumes after a taxonomy change"""
+    try:
+        await connect_to_mongo()
+        totals = await resume_store.recanonicalize_skills()
+        logger.info(f"Recanonicalized resume skills: {totals}")
+
+    except Exception as e:
+        logger.error(f"Script execution failed: {str(e)}")
+        raise
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+from ..core.config import get_settings
+from ..db.mongodb import connect_to_mongo, close_mongo_connection
+from ..services import fit_model as fit
+from typing import Dict, List
+import argparse
+import logging
+import random
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def evaluate(bundle: Dict, examples: List[Dict]) -> Dict:
+    """
+    Error, interval coverage and the share of pairs the triage would settle without the
+    LLM.
+    """
+    predictions = fit.predict(bundle, [example["inputs"] for example in examples])
+    errors, covered, settled, wrong = [], 0, 0, 0
+    for example, prediction in zip(examples, predictions):
+        score = example["fit_score"]
+        errors.append(abs(prediction["score"] - score))
+        covered += prediction["lower"] <= score <= prediction["upper"]
+        if prediction["upper"] < settings.FIT_TRIAGE_REJECT_BELOW:
+            settled += 1
+            wrong += score >= settings.FIT_TRIAGE_REJECT_BELOW
+        elif prediction["lower"] > settings.FIT_TRIAGE_SHORTLIST_ABOVE:
+            settled += 1
+            wrong += score <= settings.FIT_TRIAGE_SHORTLIST_ABOVE
+    return {
+        "examples": len(examples),
+        "mean_absolute_error": round(sum(errors) / len(errors), 2),
+        "interval_coverage": round(covered / len(examples), 3),
+        "settled_without_llm": round(settled / len(examples), 3),
+        # Settled pairs whose LLM score was on the other side of the threshold
+        "settled_wrongly": round(wrong / settled, 3) if settled else 0.0,
+    }
+
+
+async def main():
+    """Train the local fit-score model on the fit scores logged from LLM analyses"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--output", default=settings.FIT_MODEL_PATH)
+    parser.add_argument("--min-examples", type=int, default=200)
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.2,
+        help="share of examples kept for evaluation",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="evaluate without writing the model"
+    )
+    args = parser.parse_args()
+
+    try:
+        await connect_to_mongo()
+        examples = await fit.fit_model.load_examples()
+        logger.info(
+            f"Loaded {len(examples)} examples "
+            f"with feature version {fit.FEATURE_VERSION}"
+        )
+        if len(examples) < args.min_examples:
+            logger.error(
+                f"Need at least {args.min_examples} examples to train; "
+                "keep analysing with the LLM"
+            )
+            return
+
+        random.Random(42).shuffle(examples)
+        split = int(len(examples) * (1 - args.holdout))
+        metrics = evaluate(fit.train(examples[:split]), examples[split:])
+        logger.info(f"Holdout evaluation: {metrics}")
+
+        # The served model is trained on every example
+        bundle = fit.train(examples)
+        bundle["holdout"] = metrics
+        if args.dry_run:
+            return
+        fit.save(bundle, args.output)
+        logger.info(
+            f"Saved fit model to {args.output}; "
+            "running workers reload it on their next analysis"
+        )
+
+    except Exception as e:
+        logger.error(f"Script execution failed: {str(e)}")
+        raise
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+from typing import Dict, List, Optional
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+APP = "app.main:app"
+
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def cpu_count() -> int:
+    """CPUs this process may run on, which respects container CPU sets."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers() -> int:
+    # Handlers are async and CPU-bound work runs in thread pools, so one
+    # worker per core keeps every core busy without oversubscribing
+    return max(cpu_count(), 1)
+
+
+def event_loop() -> str:
+    """
+    uvloop when installed. Nothing in the app may patch the running loop:
+    nest_asyncio cannot patch uvloop loops, which is why documents are
+    parsed with LlamaParse's async API.
+    """
+    return "uvloop" if available("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if available("httptools") else "h11"
+
+
+def worker_safety_problems(workers: int) -> List[str]:
+    """
+    Per-process state that breaks when requests are spread over several workers.
+
+    Caches that are rebuilt or synchronized through MongoDB (skill index,
+    analytics sketches, token cache) are fine; state that exists only in
+    one process's memory is not.
+    """
+    problems = []
+    if workers > 1 and settings.STORAGE_BACKEND == "memory":
+        problems.append(
+            "STORAGE_BACKEND=memory keeps uploads in process memory, so an analysis "
+            "request served by another worker than its upload gets a 404"
+        )
+    elif workers > 1 and settings.STORAGE_CATALOG == "memory":
+        problems.append(
+            "STORAGE_CATALOG=memory keeps upload records in process memory, so other "
+            "workers cannot resolve file ids; use the mongo catalog"
+        )
+    return problems
+
+
+def resolve_workers(requested: Optional[int]) -> int:
+    """
+    The worker count to run: `requested` (from --workers or SERVER_WORKERS)
+    as given, else one per CPU, or a single worker when per-process state
+    would break across workers. Only explicit counts are refused later.
+    """
+    if requested:
+        return requested
+    workers = default_workers()
+    problems = worker_safety_problems(workers)
+    if problems:
+        for problem in problems:
+            logger.info(f"Defaulting to 1 worker: {problem}")
+        return 1
+    return workers
+
+
+def serve_uvicorn(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=event_loop(),
+        http=http_protocol(),
+        log_level=args.log_level,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        proxy_headers=True,
+    )
+
+
+def serve_gunicorn(args: argparse.Namespace) -> None:
+    """
+    Run under gunicorn with preload_app, so the app is imported once in the
+    master and workers share its memory copy-on-write after fork. The
+    lifespan (database connections, caches) still runs in each worker.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def __init__(self, options: Dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    Application(
+        {
+            "bind": f"{args.host}:{args.port}",
+            "workers": args.workers,
+            # Picks uvloop and httptools on its own when they are installed
+            "worker_class": "uvicorn.workers.UvicornWorker",
+            "preload_app": True,
+            "backlog": args.backlog,
+            "keepalive": args.keep_alive,
+            "loglevel": args.log_level,
+            "graceful_timeout": 30,
+        }
+    ).run()
+
+
+def main():
+    """Run the TalentLens API with production settings"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS or None,
+        help=(
+            "worker processes "
+            "(default: one per available CPU, or 1 without shared storage)"
+        ),
+    )
+    parser.add_argument(
+        "--preload",
+        action="store_true",
+        help="import the app once before forking workers (requires gunicorn)",
+    )
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument(
+        "--keep-alive", type=int, default=5, help="keep-alive timeout in seconds"
+    )
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--allow-unsafe-workers",
+        action="store_true",
+        help="start several workers even if per-process state would break",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    args.workers = resolve_workers(args.workers)
+
+    problems = worker_safety_problems(args.workers)
+    if problems and not args.allow_unsafe_workers:
+        for problem in problems:
+            logger.error(f"Not worker-safe: {problem}")
+        logger.error("Run with --workers 1, or pass --allow-unsafe-workers")
+        sys.exit(1)
+
+    logger.info(
+        f"Serving {APP} on {args.host}:{args.port} with {args.workers} worker(s), "
+        f"loop={event_loop()}, http={http_protocol()}, preload={args.preload}"
+    )
+    if args.preload:
+        if not available("gunicorn"):
+            logger.error("--preload needs gunicorn: pip install gunicorn")
+            sys.exit(1)
+        serve_gunicorn(args)
+    else:
+        serve_uvicorn(args)
+
+
+if __name__ == "__main__":
+    main()
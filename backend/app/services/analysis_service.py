@@ -1,49 +1,103 @@
-from typing import Dict
+from typing import Dict, List
+import hashlib
 import logging
-from openai import AsyncOpenAI
 from app.core.config import get_settings
 from app.utils.prompting_instructions import FIT_SCORE_SYSTEM_PROMPT
+from app.services.llm_client import llm_client, prompt_usage
 import json
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+
+def canonical_text(text: str) -> str:
+    """
+    Text with its line endings and trailing whitespace normalized, so equal documents
+    give equal bytes.
+    """
+    lines = (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def job_description_text(parsed: Dict) -> str:
+    """
+    The job description as the scorer sees it: the extracted document
+    itself, not the LLM summary of it, which can change between parses.
+    """
+    if parsed.get("markdown_content"):
+        return canonical_text(parsed["markdown_content"])
+    return canonical_text(
+        parsed.get("original_text")
+        or json.dumps(parsed.get("structured_data") or {}, sort_keys=True)
+    )
+
+
+def resume_text(parsed: Dict) -> str:
+    """
+    The resume as the scorer sees it: the extracted document followed by its summary.
+    """
+    parts = [canonical_text(parsed.get("markdown_content"))]
+    if parsed.get("original_text"):
+        parts.append(f"Summary:\n\n{canonical_text(parsed['original_text'])}")
+    if parsed.get("structured_data"):
+        parts.append(
+            "Structured data:\n\n"
+            f"{json.dumps(parsed['structured_data'], sort_keys=True)}"
+        )
+    return "\n\n".join(part for part in parts if part)
+
+
+def fit_score_messages(job_description: str, resume: str) -> List[Dict]:
+    """
+    The scoring prompt, laid out for provider-side prompt caching: the
+    system prompt and the job description form a prefix that is identical
+    for every candidate of a requisition, and the resume comes last.
+    """
+    return [
+        {"role": "system", "content": FIT_SCORE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Job description:\n\n{job_description}"},
+        {"role": "user", "content": f"Resume:\n\n{resume}"},
+    ]
+
+
+def prompt_cache_key(messages: List[Dict]) -> str:
+    """
+    Names the shared prefix, so the provider routes calls that share it to the same
+    cache.
+    """
+    prefix = json.dumps(messages[:-1], sort_keys=True).encode("utf-8")
+    return f"fit-score-{hashlib.sha256(prefix).hexdigest()[:16]}"
+
+
 class AnalysisService:
     def __init__(self):
-        openai_api_key = settings.OPENAI_API_KEY.strip()
-        if not openai_api_key:
+        if not settings.OPENAI_API_KEY.strip():
             raise ValueError("OpenAI API key not found in settings")
-            
-        self.client = AsyncOpenAI(
-            api_key=openai_api_key,
-            base_url="https://api.openai.com/v1",
-            max_retries=3,
-            timeout=30.0
-        )
-        self.model = settings.OPENAI_MODEL
 
-    async def analyze_resume_fit(self, resume_data: Dict, job_data: Dict) -> Dict:
+        self.client = llm_client
+
+    async def analyze_resume_fit(self, resume_result: Dict, job_result: Dict) -> Dict:
         """
         Analyze resume fit using OpenAI's LLM
+        Takes the ParserService results of the resume and the job description
         Returns: Full analysis result from OpenAI
         """
         try:
-            # Adapt the input format for the new summary structure
-            input_content = {
-                "job_description": job_data,
-                "resume_summary": resume_data  # Now contains the summarized format
-            }
+            messages = fit_score_messages(
+                job_description_text(job_result), resume_text(resume_result)
+            )
+            request = {}
+            if settings.LLM_PROMPT_CACHE_KEYS:
+                request["prompt_cache_key"] = prompt_cache_key(messages)
 
             logger.info("Sending analysis request to OpenAI")
             # Call OpenAI API using the FIT_SCORE_SYSTEM_PROMPT
-            completion = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": FIT_SCORE_SYSTEM_PROMPT},
-                    {"role": "user", "content": json.dumps(input_content)}
-                ],
+            completion = await self.client.chat(
+                task="score",
+                messages=messages,
                 temperature=0.5,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                **request,
             )
 
             # Parse the response
@@ -53,40 +107,82 @@ class AnalysisService:
 
             # Transform the analysis result to match the expected frontend format
             transformed_result = {
-                "overallFit": int(analysis_result.get("fit_analysis", {}).get("fit_score", 0)),
-                "skillsMatch": int(analysis_result.get("score_breakdown", {}).get("skills_match", {}).get("score", 0)),
-                "experienceMatch": int(analysis_result.get("score_breakdown", {}).get("experience_match", {}).get("score", 0)),
+                "overallFit": int(
+                    analysis_result.get("fit_analysis", {}).get("fit_score", 0)
+                ),
+                "skillsMatch": int(
+                    analysis_result.get("score_breakdown", {})
+                    .get("skills_match", {})
+                    .get("score", 0)
+                ),
+                "experienceMatch": int(
+                    analysis_result.get("score_breakdown", {})
+                    .get("experience_match", {})
+                    .get("score", 0)
+                ),
                 "recommendations": [],  # Initialize empty array
                 "detailed_analysis": {
                     "executive_summary": analysis_result.get("executive_summary"),
                     "fit_analysis": {
-                        "overall_assessment": analysis_result.get("fit_analysis", {}).get("overall_assessment"),
-                        "fit_score": int(analysis_result.get("fit_analysis", {}).get("fit_score", 0))
+                        "overall_assessment": analysis_result.get(
+                            "fit_analysis", {}
+                        ).get("overall_assessment"),
+                        "fit_score": int(
+                            analysis_result.get("fit_analysis", {}).get("fit_score", 0)
+                        ),
                     },
                     "key_strengths": {
-                        "skills": analysis_result.get("key_strengths", {}).get("skills", []),
-                        "experience": analysis_result.get("key_strengths", {}).get("experience", []),
-                        "notable_achievements": analysis_result.get("key_strengths", {}).get("notable_achievements", [])
+                        "skills": analysis_result.get("key_strengths", {}).get(
+                            "skills", []
+                        ),
+                        "experience": analysis_result.get("key_strengths", {}).get(
+                            "experience", []
+                        ),
+                        "notable_achievements": analysis_result.get(
+                            "key_strengths", {}
+                        ).get("notable_achievements", []),
                     },
                     "areas_for_development": {
-                        "skills_gaps": analysis_result.get("areas_for_development", {}).get("skills_gaps", []),
-                        "experience_gaps": analysis_result.get("areas_for_development", {}).get("experience_gaps", []),
-                        "recommendations": analysis_result.get("areas_for_development", {}).get("recommendations", [])
+                        "skills_gaps": analysis_result.get(
+                            "areas_for_development", {}
+                        ).get("skills_gaps", []),
+                        "experience_gaps": analysis_result.get(
+                            "areas_for_development", {}
+                        ).get("experience_gaps", []),
+                        "recommendations": analysis_result.get(
+                            "areas_for_development", {}
+                        ).get("recommendations", []),
                     },
                     "score_breakdown": {
-                        "skills_match": str(analysis_result.get("score_breakdown", {}).get("skills_match", {}).get("score", 0)) + "% - " + 
-                                      analysis_result.get("score_breakdown", {}).get("skills_match", {}).get("explanation", ""),
-                        "experience_match": str(analysis_result.get("score_breakdown", {}).get("experience_match", {}).get("score", 0)) + "% - " + 
-                                          analysis_result.get("score_breakdown", {}).get("experience_match", {}).get("explanation", "")
+                        "skills_match": str(
+                            analysis_result.get("score_breakdown", {})
+                            .get("skills_match", {})
+                            .get("score", 0)
+                        )
+                        + "% - "
+                        + analysis_result.get("score_breakdown", {})
+                        .get("skills_match", {})
+                        .get("explanation", ""),
+                        "experience_match": str(
+                            analysis_result.get("score_breakdown", {})
+                            .get("experience_match", {})
+                            .get("score", 0)
+                        )
+                        + "% - "
+                        + analysis_result.get("score_breakdown", {})
+                        .get("experience_match", {})
+                        .get("explanation", ""),
                     },
-                    "interesting_fact": analysis_result.get("interesting_fact")
-                }
+                    "interesting_fact": analysis_result.get("interesting_fact"),
+                    "model": completion.model,
+                    "usage": prompt_usage(completion),
+                },
             }
 
             # Add recommendations
             if analysis_result.get("executive_summary"):
                 transformed_result["recommendations"].append(analysis_result["executive_summary"])
-            
+
             if analysis_result.get("fit_analysis", {}).get("overall_assessment"):
                 transformed_result["recommendations"].append(
                     f"Overall Assessment: {analysis_result['fit_analysis']['overall_assessment']}"
@@ -134,7 +230,7 @@ class AnalysisService:
                     "executive_summary": "Error analyzing resume",
                     "fit_analysis": {
                         "overall_assessment": "Analysis failed",
-                        "fit_score": 0
-                    }
-                }
-            }
\ No newline at end of file
+                        "fit_score": 0,
+                    },
+                },
+            }
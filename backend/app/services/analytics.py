@@ -1,132 +1,451 @@
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from datetime import datetime, timedelta
+from ..core.config import get_settings
 from ..db.mongodb import get_collection, ANALYTICS_COLLECTION
+from ..utils.skills import canonicalize_skills
+from .pagination import SortSpec, keyset_filter, page_response
+from .event_buffer import EventBuffer
+from .sketches import DailySketches, HyperLogLog, SpaceSaving
+from .analytics_rollups import (
+    analytics_rollups,
+    split_window,
+    time_range,
+    ceil_day,
+    ceil_hour,
+    floor_day,
+    floor_hour,
+)
 from bson import ObjectId
+from pymongo import DESCENDING
+
+settings = get_settings()
+
+# Batches analytics writes off the request path; started with the app
+event_buffer = EventBuffer(
+    ANALYTICS_COLLECTION,
+    max_batch_size=settings.ANALYTICS_BUFFER_MAX_BATCH_SIZE,
+    flush_interval=settings.ANALYTICS_BUFFER_FLUSH_INTERVAL_SECONDS,
+    max_size=settings.ANALYTICS_BUFFER_MAX_SIZE,
+    overflow_policy=settings.ANALYTICS_BUFFER_OVERFLOW_POLICY,
+)
+
+# Event types whose event_data.skills feed the skill trends
+SKILL_TREND_EVENT_TYPES = ("search", "profile_view")
+
+# Top skills per day, fed by track_event and answered without touching raw events
+skill_trends = DailySketches(
+    "skill_trends",
+    factory=lambda: SpaceSaving(settings.SKILL_TRENDS_SKETCH_CAPACITY),
+    load=SpaceSaving.from_document,
+    retention_days=settings.ANALYTICS_SKETCH_RETENTION_DAYS,
+)
+
+# Distinct user ids per day; unions give unique users over any window
+active_users = DailySketches(
+    "active_users",
+    factory=lambda: HyperLogLog(settings.ANALYTICS_HLL_PRECISION),
+    load=HyperLogLog.from_document,
+    retention_days=settings.ANALYTICS_SKETCH_RETENTION_DAYS,
+)
+SKETCHES = [skill_trends, active_users]
+
+# Newest first; backed by the (user_id, timestamp, _id) index, so pages need no
+# in-memory sort
+ACTIVITY_SORT: SortSpec = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+# user_id is implied by the query, so activity reads leave it out
+ACTIVITY_PROJECTION = {"event_type": 1, "event_data": 1, "timestamp": 1}
+
+# Windows (in days) reported as unique_users by get_user_engagement_metrics
+UNIQUE_USER_WINDOWS = (7, 30, 90)
 
 
 class AnalyticsService:
-    def __init__(self):
-        self.collection = get_collection(ANALYTICS_COLLECTION)
+
+    @property
+    def collection(self):
+        return get_collection(ANALYTICS_COLLECTION)
 
     async def track_event(
         self,
         user_id: str,
         event_type: str,
-        event_data: Dict
+        event_data: Dict,
+        timestamp: Optional[datetime] = None,
     ) -> Dict:
-        """Track a user event in the system."""
+        """
+        Track a user event in the system.
+
+        While the event buffer is running the event is only queued and written
+        in the next batch; otherwise it is inserted directly.
+        """
+        if isinstance(event_data.get("skills"), list):
+            # Canonical names keep get_skill_trends from splitting "JS" and "JavaScript"
+            event_data = {
+                **event_data,
+                "skills": canonicalize_skills(event_data["skills"]),
+            }
+
+        received_at = datetime.utcnow()
         event = {
+            "_id": ObjectId(),
             "user_id": ObjectId(user_id),
             "event_type": event_type,
             "event_data": event_data,
-            "timestamp": datetime.utcnow()
+            "timestamp": timestamp or received_at,
+            # Lets the rollups find events timestamped before their watermark
+            "received_at": received_at,
         }
-        
-        result = await self.collection.insert_one(event)
-        event["_id"] = result.inserted_id
+        if settings.ANALYTICS_SKETCHES_ENABLED:
+            self._update_sketches(event)
+
+        if event_buffer.running:
+            await event_buffer.put(event)
+        else:
+            await self.collection.insert_one(event)
         return event
 
-    async def get_user_activity(
-        self,
-        user_id: str,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> List[Dict]:
-        """Get all activity for a specific user within a date range."""
+    def _update_sketches(self, event: Dict) -> None:
+        active_users.sketch_for(event["timestamp"]).add(str(event["user_id"]))
+        skills = event["event_data"].get("skills")
+        if event["event_type"] in SKILL_TREND_EVENT_TYPES and isinstance(skills, list):
+            sketch = skill_trends.sketch_for(event["timestamp"])
+            for skill in skills:
+                sketch.add(skill, timestamp=event["timestamp"])
+
+    async def load_sketches(self) -> None:
+        """Load the stored per-day sketches; called once at startup."""
+        for sketch in SKETCHES:
+            await sketch.load_recent()
+
+    async def checkpoint_sketches(self) -> None:
+        """
+        Merge this worker's sketch updates into MongoDB and pick up other workers'.
+        """
+        for sketch in SKETCHES:
+            await sketch.checkpoint()
+
+    def _activity_query(
+        self, user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> Dict:
         query = {"user_id": ObjectId(user_id)}
-        
+
         if start_date or end_date:
             query["timestamp"] = {}
             if start_date:
                 query["timestamp"]["$gte"] = start_date
             if end_date:
                 query["timestamp"]["$lte"] = end_date
+        return query
+
+    async def iter_user_activity(
+        self,
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        max_events: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream a user's events newest first, `batch_size` documents per round trip.
 
-        return await self.collection.find(query).sort("timestamp", -1).to_list(None)
+        Only one batch is held in memory at a time; `max_events` caps how many
+        are returned in total.
+        """
+        cursor = (
+            self.collection.find(
+                self._activity_query(user_id, start_date, end_date), ACTIVITY_PROJECTION
+            )
+            .sort(ACTIVITY_SORT)
+            .batch_size(batch_size)
+        )
+        if max_events:
+            cursor = cursor.limit(max_events)
+        async for event in cursor:
+            yield event
+
+    async def get_user_activity_page(
+        self,
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """
+        One page of a user's activity, newest first.
+
+        Pass the returned `next_cursor` back to get the following page; raises
+        InvalidCursorError for a malformed cursor. Totals are not counted.
+        """
+        query = self._activity_query(user_id, start_date, end_date)
+        if cursor:
+            query = {"$and": [query, keyset_filter(ACTIVITY_SORT, cursor)]}
+        results = (
+            await self.collection.find(query, ACTIVITY_PROJECTION)
+            .sort(ACTIVITY_SORT)
+            .limit(limit)
+            .to_list(limit)
+        )
+        return page_response(results, ACTIVITY_SORT, limit, total=None)
+
+    async def get_user_activity(
+        self,
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Get the activity for a specific user within a date range, newest first.
+
+        At most `limit` events (ANALYTICS_ACTIVITY_MAX_EVENTS by default) are
+        returned; use iter_user_activity or get_user_activity_page for more.
+        """
+        limit = limit or settings.ANALYTICS_ACTIVITY_MAX_EVENTS
+        return [
+            event
+            async for event in self.iter_user_activity(
+                user_id, start_date, end_date, max_events=limit
+            )
+        ]
 
     async def get_popular_searches(
         self,
         days: int = 7,
         limit: int = 10
     ) -> List[Dict]:
-        """Get most popular search terms in the last N days."""
+        """
+        Get most popular search terms in the last N days.
+
+        Complete hours are read from the hourly rollups; only the partial hour
+        at the start of the window and the events after the rollup watermark
+        are aggregated from raw events.
+        """
         start_date = datetime.utcnow() - timedelta(days=days)
-        
+        raw_ranges, rolled = split_window(
+            start_date, await analytics_rollups.get_watermark(), ceil_hour, floor_hour
+        )
+
+        partials = await analytics_rollups.popular_searches(*rolled) if rolled else []
+        for range_start, range_end in raw_ranges:
+            partials += await self._raw_popular_searches(range_start, range_end)
+
+        merged = {}
+        for row in partials:
+            entry = merged.setdefault(
+                row["_id"], {"_id": row["_id"], "count": 0, "last_searched": None}
+            )
+            entry["count"] += row["count"]
+            if (
+                entry["last_searched"] is None
+                or row["last_searched"] > entry["last_searched"]
+            ):
+                entry["last_searched"] = row["last_searched"]
+
+        return sorted(merged.values(), key=lambda row: row["count"], reverse=True)[
+            :limit
+        ]
+
+    async def _raw_popular_searches(
+        self, start: datetime, end: Optional[datetime]
+    ) -> List[Dict]:
         pipeline = [
-            {
-                "$match": {
-                    "event_type": "search",
-                    "timestamp": {"$gte": start_date}
-                }
-            },
+            {"$match": {"event_type": "search", "timestamp": time_range(start, end)}},
             {
                 "$group": {
                     "_id": "$event_data.query",
                     "count": {"$sum": 1},
-                    "last_searched": {"$max": "$timestamp"}
+                    "last_searched": {"$max": "$timestamp"},
                 }
             },
-            {"$sort": {"count": -1}},
-            {"$limit": limit}
         ]
-        
+
         return await self.collection.aggregate(pipeline).to_list(None)
 
     async def get_user_engagement_metrics(
-        self,
-        days: int = 30
+        self, days: int = 30, exact: bool = False
     ) -> Dict:
-        """Get user engagement metrics for the last N days."""
+        """
+        Get user engagement metrics for the last N days.
+
+        Complete days are read from the daily rollups; only the partial first
+        day of the window and the days from the rollup watermark on are
+        aggregated from raw events, so the cost grows with days, not events.
+
+        By default active and unique users are estimated from the per-day
+        HyperLogLog sketches (about 1% error), and the raw part only counts
+        events. exact=True groups raw events by user instead.
+        """
+        approximate = not exact and settings.ANALYTICS_SKETCHES_ENABLED
         start_date = datetime.utcnow() - timedelta(days=days)
-        
+        raw_ranges, rolled = split_window(
+            start_date, await analytics_rollups.get_watermark(), ceil_day, floor_day
+        )
+
+        daily_metrics = []
+        events_by_type = []
+        if rolled:
+            daily_metrics += await analytics_rollups.daily_metrics(*rolled)
+            events_by_type += await analytics_rollups.events_by_type(*rolled)
+        for range_start, range_end in raw_ranges:
+            if approximate:
+                daily_metrics += await self._raw_daily_totals(range_start, range_end)
+            else:
+                daily_metrics += await self._raw_daily_metrics(range_start, range_end)
+            events_by_type += await self._raw_events_by_type(range_start, range_end)
+
+        if approximate:
+            # Days from before the sketches existed keep their rollup counts
+            estimates = {
+                date: sketch.count() for date, sketch in active_users.window(days + 1)
+            }
+            for d in daily_metrics:
+                d["active_users"] = estimates.get(d["_id"], d.get("active_users", 0))
+            unique_users = self._estimate_unique_users(UNIQUE_USER_WINDOWS)
+        else:
+            unique_users = {
+                f"{window}d": await self._raw_unique_users(window)
+                for window in UNIQUE_USER_WINDOWS
+            }
+
+        daily_metrics = [
+            {
+                "_id": d["_id"],
+                "active_users": d["active_users"],
+                "total_events": d["total_events"],
+            }
+            for d in sorted(daily_metrics, key=lambda d: d["_id"])
+        ]
+        type_counts = {}
+        for row in events_by_type:
+            type_counts[row["_id"]] = type_counts.get(row["_id"], 0) + row["count"]
+
+        return {
+            "daily_metrics": daily_metrics,
+            "total_days": days,
+            "average_daily_active_users": (
+                sum(d["active_users"] for d in daily_metrics) / len(daily_metrics)
+                if daily_metrics
+                else 0
+            ),
+            "total_events": sum(d["total_events"] for d in daily_metrics),
+            "events_by_type": type_counts,
+            "unique_users": unique_users,
+            "approximate": approximate,
+        }
+
+    def _estimate_unique_users(self, windows) -> Dict[str, int]:
+        """Union the day sketches newest first, reading off each window on the way."""
+        days = active_users.window(max(windows))
+        cutoffs = {
+            (datetime.utcnow() - timedelta(days=window - 1)).strftime(
+                "%Y-%m-%d"
+            ): window
+            for window in windows
+        }
+        unions = {}
+        union = None
+        for date, sketch in reversed(days):
+            union = sketch if union is None else union.merge(sketch)
+            for cutoff, window in cutoffs.items():
+                if date >= cutoff:
+                    unions[window] = union
+        return {
+            f"{window}d": unions[window].count() if window in unions else 0
+            for window in windows
+        }
+
+    async def _raw_unique_users(self, days: int) -> int:
         pipeline = [
             {
                 "$match": {
-                    "timestamp": {"$gte": start_date}
+                    "timestamp": {"$gte": datetime.utcnow() - timedelta(days=days)}
                 }
             },
+            {"$group": {"_id": "$user_id"}},
+            {"$count": "users"},
+        ]
+        result = await self.collection.aggregate(pipeline).to_list(None)
+        return result[0]["users"] if result else 0
+
+    async def _raw_daily_totals(
+        self, start: datetime, end: Optional[datetime]
+    ) -> List[Dict]:
+        pipeline = [
+            {"$match": {"timestamp": time_range(start, end)}},
+            {
+                "$group": {
+                    "_id": {
+                        "$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}
+                    },
+                    "total_events": {"$sum": 1},
+                }
+            },
+        ]
+        return await self.collection.aggregate(pipeline).to_list(None)
+
+    async def _raw_daily_metrics(
+        self, start: datetime, end: Optional[datetime]
+    ) -> List[Dict]:
+        pipeline = [
+            {"$match": {"timestamp": time_range(start, end)}},
             {
                 "$group": {
                     "_id": {
                         "user": "$user_id",
-                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}
+                        "date": {
+                            "$dateToString": {
+                                "format": "%Y-%m-%d",
+                                "date": "$timestamp",
+                            }
+                        },
                     },
-                    "events": {"$sum": 1}
+                    "events": {"$sum": 1},
                 }
             },
             {
                 "$group": {
                     "_id": "$_id.date",
                     "active_users": {"$sum": 1},
-                    "total_events": {"$sum": "$events"}
+                    "total_events": {"$sum": "$events"},
                 }
             },
-            {"$sort": {"_id": 1}}
         ]
-        
-        daily_metrics = await self.collection.aggregate(pipeline).to_list(None)
-        
-        return {
-            "daily_metrics": daily_metrics,
-            "total_days": days,
-            "average_daily_active_users": sum(d["active_users"] for d in daily_metrics) / len(daily_metrics) if daily_metrics else 0,
-            "total_events": sum(d["total_events"] for d in daily_metrics)
-        }
+
+        return await self.collection.aggregate(pipeline).to_list(None)
+
+    async def _raw_events_by_type(
+        self, start: datetime, end: Optional[datetime]
+    ) -> List[Dict]:
+        pipeline = [
+            {"$match": {"timestamp": time_range(start, end)}},
+            {"$group": {"_id": "$event_type", "count": {"$sum": 1}}},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(None)
 
     async def get_skill_trends(
-        self,
-        days: int = 30,
-        limit: int = 10
+        self, days: int = 30, limit: int = 10, exact: bool = False
     ) -> List[Dict]:
-        """Get trending skills based on search and profile views."""
+        """
+        Get trending skills based on search and profile views.
+
+        By default this merges the per-day Space-Saving sketches of the window,
+        which costs the same however many events there are. Counts may be
+        overestimated by up to the returned `error`; the window is whole UTC
+        days, today included. exact=True aggregates the raw events instead.
+        """
+        if not exact and settings.ANALYTICS_SKETCHES_ENABLED:
+            merged = skill_trends.merged(days)
+            return merged.top(limit) if merged is not None else []
+
         start_date = datetime.utcnow() - timedelta(days=days)
-        
+
         pipeline = [
             {
                 "$match": {
                     "timestamp": {"$gte": start_date},
-                    "event_type": {"$in": ["search", "profile_view"]},
-                    "event_data.skills": {"$exists": True}
+                    "event_type": {"$in": list(SKILL_TREND_EVENT_TYPES)},
+                    "event_data.skills": {"$exists": True},
                 }
             },
             {"$unwind": "$event_data.skills"},
@@ -134,15 +453,15 @@ class AnalyticsService:
                 "$group": {
                     "_id": "$event_data.skills",
                     "count": {"$sum": 1},
-                    "last_seen": {"$max": "$timestamp"}
+                    "last_seen": {"$max": "$timestamp"},
                 }
             },
             {"$sort": {"count": -1}},
-            {"$limit": limit}
+            {"$limit": limit},
         ]
-        
+
         return await self.collection.aggregate(pipeline).to_list(None)
 
 
 # Create a singleton instance
-analytics_service = AnalyticsService() 
\ No newline at end of file
+analytics_service = AnalyticsService()
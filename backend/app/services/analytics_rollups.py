@@ -0,0 +1,384 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+from pymongo import UpdateOne
+from ..core.config import get_settings
+from ..db.mongodb import (
+    get_collection,
+    ANALYTICS_COLLECTION,
+    ANALYTICS_HOURLY_COLLECTION,
+    ANALYTICS_SEARCH_TERMS_COLLECTION,
+    ANALYTICS_DAILY_USERS_COLLECTION,
+    ANALYTICS_DAILY_COLLECTION,
+    ANALYTICS_ROLLUP_STATE_COLLECTION,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_day(value: datetime) -> datetime:
+    day = floor_day(value)
+    return day if day == value else day + timedelta(days=1)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    hour = floor_hour(value)
+    return hour if hour == value else hour + timedelta(hours=1)
+
+
+def split_window(
+    start: datetime, watermark: Optional[datetime], align_start, align_end
+) -> Tuple[
+    List[Tuple[datetime, Optional[datetime]]], Optional[Tuple[datetime, datetime]]
+]:
+    """
+    Split the window starting at `start` into raw-event ranges and one rolled-up range.
+
+    The rolled-up range covers the whole periods between the aligned start of
+    the window and the aligned watermark; the unaligned head and the tail past
+    the watermark are read from raw events. Ranges are half-open and the tail
+    has no upper bound (None). Returns (raw_ranges, rolled_range).
+    """
+    if watermark is None:
+        return [(start, None)], None
+    rolled_start, rolled_end = align_start(start), align_end(watermark)
+    if rolled_start >= rolled_end:
+        return [(start, None)], None
+    raw_ranges = [(rolled_end, None)]
+    if start < rolled_start:
+        raw_ranges.insert(0, (start, rolled_start))
+    return raw_ranges, (rolled_start, rolled_end)
+
+
+def time_range(start: datetime, end: Optional[datetime]) -> Dict:
+    """
+    Query condition for timestamps in [start, end), or from `start` on if end is None.
+    """
+    condition = {"$gte": start}
+    if end is not None:
+        condition["$lt"] = end
+    return condition
+
+
+class AnalyticsRollups:
+    """
+    Hourly and daily pre-aggregations of the raw analytics events.
+
+    run() rolls up complete hours between the stored watermark and
+    `ANALYTICS_ROLLUP_LAG_SECONDS` ago, which leaves time for buffered events
+    to be written first. Each run recomputes whole hours and whole days and
+    overwrites their rollups, so reruns and concurrent runs on several
+    workers never double count. Events arriving with a timestamp older than
+    the watermark (client-batched ones, say) are found by their
+    `received_at` time, and the hours they fall in are rolled up again.
+
+    Rollup collections:
+    - hourly: events per (hour, event_type)
+    - search terms: searches per (hour, query)
+    - daily users: one document per (date, user_id) seen that day
+    - daily: active users and total events per date
+    """
+
+    @property
+    def events(self):
+        return get_collection(ANALYTICS_COLLECTION)
+
+    @property
+    def hourly(self):
+        return get_collection(ANALYTICS_HOURLY_COLLECTION)
+
+    @property
+    def search_terms(self):
+        return get_collection(ANALYTICS_SEARCH_TERMS_COLLECTION)
+
+    @property
+    def daily_users(self):
+        return get_collection(ANALYTICS_DAILY_USERS_COLLECTION)
+
+    @property
+    def daily(self):
+        return get_collection(ANALYTICS_DAILY_COLLECTION)
+
+    @property
+    def state(self):
+        return get_collection(ANALYTICS_ROLLUP_STATE_COLLECTION)
+
+    async def get_watermark(self) -> Optional[datetime]:
+        """Everything before the watermark is included in the rollups."""
+        state = await self.state.find_one({"_id": "watermark"})
+        return state["watermark"] if state else None
+
+    async def run(self) -> Optional[datetime]:
+        """
+        Roll up the next batch of complete hours, and hours that got late events.
+        Returns the new watermark.
+        """
+        received_through = datetime.utcnow() - timedelta(
+            seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS
+        )
+        state = await self.state.find_one({"_id": "watermark"}) or {}
+        start = state.get("watermark")
+        if start is None:
+            first = await self.events.find_one(
+                {}, {"timestamp": 1}, sort=[("timestamp", 1)]
+            )
+            if first is None:
+                return None
+            start = floor_hour(first["timestamp"])
+        end = min(
+            floor_hour(received_through),
+            start + timedelta(hours=settings.ANALYTICS_ROLLUP_MAX_HOURS_PER_RUN),
+        )
+
+        # Late events were received since the last run, but belong to hours that
+        # were already rolled up
+        late_hours = []
+        if state.get("received_through") is not None:
+            late_hours = await self._late_hours(
+                start, state["received_through"], received_through
+            )
+        for hour in late_hours:
+            await self._roll(hour, hour + timedelta(hours=1))
+        for day in sorted({floor_day(hour) for hour in late_hours}):
+            await self._refresh_daily(day, day + timedelta(days=1))
+        if late_hours:
+            logger.info(
+                f"Rolled up {len(late_hours)} hour(s) again for late analytics events"
+            )
+
+        if start < end:
+            await self._roll(start, end)
+            await self._refresh_daily(floor_day(start), ceil_day(end))
+            logger.info(f"Rolled up analytics events from {start} to {end}")
+
+        watermark = max(start, end)
+        await self.state.update_one(
+            {"_id": "watermark"},
+            {
+                "$set": {
+                    "watermark": watermark,
+                    "received_through": received_through,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+            upsert=True,
+        )
+        return watermark
+
+    async def _late_hours(
+        self, watermark: datetime, received_from: datetime, received_to: datetime
+    ) -> List[datetime]:
+        """
+        Hours before the watermark with events received in [received_from, received_to).
+        """
+        hours = await self.events.aggregate(
+            [
+                {
+                    "$match": {
+                        "received_at": time_range(received_from, received_to),
+                        "timestamp": {"$lt": watermark},
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": {"$dateTrunc": {"date": "$timestamp", "unit": "hour"}}
+                    }
+                },
+            ]
+        ).to_list(None)
+        return sorted(hour["_id"] for hour in hours)
+
+    async def _roll(self, start: datetime, end: datetime) -> None:
+        """Recompute the hourly rollups of the whole hours in [start, end)."""
+        match = {"$match": {"timestamp": time_range(start, end)}}
+        hour = {"$dateTrunc": {"date": "$timestamp", "unit": "hour"}}
+
+        await self.events.aggregate(
+            [
+                match,
+                {
+                    "$group": {
+                        "_id": {"hour": hour, "event_type": "$event_type"},
+                        "count": {"$sum": 1},
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "hour": "$_id.hour",
+                        "event_type": "$_id.event_type",
+                        "count": 1,
+                    }
+                },
+                {
+                    "$merge": {
+                        "into": ANALYTICS_HOURLY_COLLECTION,
+                        "on": ["hour", "event_type"],
+                        "whenMatched": [{"$set": {"count": "$$new.count"}}],
+                        "whenNotMatched": "insert",
+                    }
+                },
+            ]
+        ).to_list(None)
+
+        await self.events.aggregate(
+            [
+                match,
+                {"$match": {"event_type": "search"}},
+                {
+                    "$group": {
+                        "_id": {"hour": hour, "query": "$event_data.query"},
+                        "count": {"$sum": 1},
+                        "last_searched": {"$max": "$timestamp"},
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "hour": "$_id.hour",
+                        "query": "$_id.query",
+                        "count": 1,
+                        "last_searched": 1,
+                    }
+                },
+                {
+                    "$merge": {
+                        "into": ANALYTICS_SEARCH_TERMS_COLLECTION,
+                        "on": ["hour", "query"],
+                        "whenMatched": [
+                            {
+                                "$set": {
+                                    "count": "$$new.count",
+                                    "last_searched": "$$new.last_searched",
+                                }
+                            }
+                        ],
+                        "whenNotMatched": "insert",
+                    }
+                },
+            ]
+        ).to_list(None)
+
+        await self.events.aggregate(
+            [
+                match,
+                {
+                    "$group": {
+                        "_id": {
+                            "date": {
+                                "$dateToString": {
+                                    "format": DATE_FORMAT,
+                                    "date": "$timestamp",
+                                }
+                            },
+                            "user_id": "$user_id",
+                        }
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "date": "$_id.date",
+                        "user_id": "$_id.user_id",
+                    }
+                },
+                {
+                    "$merge": {
+                        "into": ANALYTICS_DAILY_USERS_COLLECTION,
+                        "on": ["date", "user_id"],
+                        "whenMatched": "keepExisting",
+                        "whenNotMatched": "insert",
+                    }
+                },
+            ]
+        ).to_list(None)
+
+    async def _refresh_daily(self, start_day: datetime, end_day: datetime) -> None:
+        """Recompute the daily rollups of every date in [start_day, end_day)."""
+        totals = await self.hourly.aggregate(
+            [
+                {"$match": {"hour": {"$gte": start_day, "$lt": end_day}}},
+                {
+                    "$group": {
+                        "_id": {
+                            "$dateToString": {"format": DATE_FORMAT, "date": "$hour"}
+                        },
+                        "total_events": {"$sum": "$count"},
+                    }
+                },
+            ]
+        ).to_list(None)
+        dates = [total["_id"] for total in totals]
+        active = await self.daily_users.aggregate(
+            [
+                {"$match": {"date": {"$in": dates}}},
+                {"$group": {"_id": "$date", "active_users": {"$sum": 1}}},
+            ]
+        ).to_list(None)
+        active_by_date = {row["_id"]: row["active_users"] for row in active}
+
+        ops = [
+            UpdateOne(
+                {"_id": total["_id"]},
+                {
+                    "$set": {
+                        "total_events": total["total_events"],
+                        "active_users": active_by_date.get(total["_id"], 0),
+                    }
+                },
+                upsert=True,
+            )
+            for total in totals
+        ]
+        if ops:
+            await self.daily.bulk_write(ops, ordered=False)
+
+    async def popular_searches(self, start: datetime, end: datetime) -> List[Dict]:
+        """Search-term counts for the complete hours in [start, end)."""
+        return await self.search_terms.aggregate(
+            [
+                {"$match": {"hour": {"$gte": start, "$lt": end}}},
+                {
+                    "$group": {
+                        "_id": "$query",
+                        "count": {"$sum": "$count"},
+                        "last_searched": {"$max": "$last_searched"},
+                    }
+                },
+            ]
+        ).to_list(None)
+
+    async def daily_metrics(self, start: datetime, end: datetime) -> List[Dict]:
+        """Daily active users and event totals for the complete days in [start, end)."""
+        return await self.daily.find(
+            {
+                "_id": {
+                    "$gte": start.strftime(DATE_FORMAT),
+                    "$lt": end.strftime(DATE_FORMAT),
+                }
+            }
+        ).to_list(None)
+
+    async def events_by_type(self, start: datetime, end: datetime) -> List[Dict]:
+        """Event counts per type for the complete hours in [start, end)."""
+        return await self.hourly.aggregate(
+            [
+                {"$match": {"hour": {"$gte": start, "$lt": end}}},
+                {"$group": {"_id": "$event_type", "count": {"$sum": "$count"}}},
+            ]
+        ).to_list(None)
+
+
+# Create a singleton instance
+analytics_rollups = AnalyticsRollups()
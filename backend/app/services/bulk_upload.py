@@ -0,0 +1,298 @@
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import posixpath
+import tarfile
+import zipfile
+from fastapi import UploadFile
+from ..core.config import get_settings
+from .storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Document types the parser handles; anything else in a batch is skipped
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".doc", ".txt")
+ARCHIVE_EXTENSIONS = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+
+
+class UnreadableArchive(ValueError):
+    pass
+
+
+def is_archive(filename: Optional[str]) -> bool:
+    return (filename or "").lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def is_supported(filename: Optional[str]) -> bool:
+    return (filename or "").lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def archive_entries(fileobj: BinaryIO, filename: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yield (name, file object) for each regular file in a zip or tar archive.
+
+    Entries are read straight from the archive: zip members are decompressed
+    on demand and tar archives are read as a stream, so neither is extracted
+    or held in memory. Each entry must be read before asking for the next.
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as entry:
+                    yield info.filename, entry
+    else:
+        # "r|*" reads the archive front to back with any compression
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, archive.extractfile(member)
+
+
+def skip_reason(name: str) -> Optional[str]:
+    """Why an entry is not stored, or None if it should be."""
+    parts = name.replace("\\", "/").split("/")
+    # Folders and resource forks that macOS and editors add to archives
+    if any(part.startswith(".") or part == "__MACOSX" for part in parts if part):
+        return "hidden file"
+    if not is_supported(name):
+        return "unsupported file type"
+    return None
+
+
+def spool_entry(
+    source: BinaryIO, spool, max_size: int, chunk_size: int
+) -> Tuple[str, int]:
+    """Copy `source` into `spool` while hashing it. Runs in a worker thread."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise ValueError(f"larger than the {max_size} byte limit")
+        digest.update(chunk)
+        spool.write(chunk)
+    return digest.hexdigest(), size
+
+
+class BulkUploadService:
+    """
+    Stores many resumes from one request: plain files and the entries of
+    zip and tar archives.
+
+    Entries are read one at a time, since a tar stream allows nothing else,
+    and hashed into a spool; storing them then runs concurrently, up to
+    BULK_UPLOAD_CONCURRENCY at once. The semaphore is taken before an entry
+    is spooled, which bounds the spooled content in flight as well.
+    """
+
+    def __init__(self, storage: Optional[StorageService] = None):
+        self.storage = storage or StorageService()
+        self.concurrency = settings.BULK_UPLOAD_CONCURRENCY
+        self.max_files = settings.BULK_UPLOAD_MAX_FILES
+        self.max_file_size = settings.BULK_UPLOAD_MAX_FILE_SIZE
+        self.max_reported_skipped = settings.BULK_UPLOAD_MAX_REPORTED_SKIPPED
+
+    async def upload(self, files: List[UploadFile]) -> Dict:
+        """
+        Store every supported file and archive entry.
+
+        Returns a manifest: `files` holds {filename, source, file_id, digest,
+        size, deduplicated} in upload order, `source` being the archive an
+        entry came from; `skipped` and `failed` list {filename, source, reason}.
+        Only the first BULK_UPLOAD_MAX_REPORTED_SKIPPED skipped entries are
+        listed; `skipped_count` counts them all.
+        """
+        manifest = {"files": [], "skipped": [], "skipped_count": 0, "failed": []}
+        stored_files: Dict[int, Dict] = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        accepted = 0
+
+        async def store(
+            index: int, name: str, source: Optional[str], spool, digest: str, size: int
+        ):
+            try:
+                stored = await self.storage.store_spooled(
+                    spool,
+                    digest,
+                    size,
+                    posixpath.basename(name),
+                    mimetypes.guess_type(name)[0],
+                )
+                stored_files[index] = {"filename": name, "source": source, **stored}
+            except Exception as e:
+                logger.error(
+                    f"Failed to store {name} from {source or 'request'}: {str(e)}"
+                )
+                manifest["failed"].append(
+                    {"filename": name, "source": source, "reason": str(e)}
+                )
+            finally:
+                spool.close()
+                semaphore.release()
+
+        try:
+            for upload in files:
+                source = upload.filename if is_archive(upload.filename) else None
+                try:
+                    async for name, entry in self._entries(upload):
+                        reason = skip_reason(name)
+                        if reason is None and accepted >= self.max_files:
+                            reason = (
+                                f"over the limit of {self.max_files} files per request"
+                            )
+                        if reason is not None:
+                            manifest["skipped_count"] += 1
+                            if len(manifest["skipped"]) < self.max_reported_skipped:
+                                manifest["skipped"].append(
+                                    {
+                                        "filename": name,
+                                        "source": source,
+                                        "reason": reason,
+                                    }
+                                )
+                            continue
+
+                        await semaphore.acquire()
+                        spool = self.storage.new_spool()
+                        try:
+                            digest, size = await asyncio.to_thread(
+                                spool_entry,
+                                entry,
+                                spool,
+                                self.max_file_size,
+                                self.storage.backend.chunk_size,
+                            )
+                        except Exception as e:
+                            spool.close()
+                            semaphore.release()
+                            manifest["failed"].append(
+                                {"filename": name, "source": source, "reason": str(e)}
+                            )
+                            continue
+                        tasks.append(
+                            asyncio.create_task(
+                                store(accepted, name, source, spool, digest, size)
+                            )
+                        )
+                        accepted += 1
+                except UnreadableArchive as e:
+                    manifest["failed"].append(
+                        {"filename": upload.filename, "source": None, "reason": str(e)}
+                    )
+        finally:
+            await asyncio.gather(*tasks)
+
+        manifest["files"] = [stored_files[index] for index in sorted(stored_files)]
+        logger.info(
+            f"Bulk upload stored {len(manifest['files'])} file(s), "
+            f"skipped {manifest['skipped_count']}, failed {len(manifest['failed'])}"
+        )
+        return manifest
+
+    async def _entries(self, upload: UploadFile):
+        """
+        The (name, file object) pairs of an upload: its entries if it is an archive,
+        else itself.
+        """
+        if not is_archive(upload.filename):
+            await upload.seek(0)
+            yield upload.filename or "upload", upload.file
+            return
+
+        await upload.seek(0)
+        entries = archive_entries(upload.file, upload.filename)
+        try:
+            while True:
+                try:
+                    entry = await asyncio.to_thread(next, entries, None)
+                except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+                    raise UnreadableArchive(
+                        f"{upload.filename} is not a readable archive: {str(e)}"
+                    )
+                if entry is None:
+                    break
+                yield entry
+        finally:
+            await asyncio.to_thread(entries.close)
+
+    async def parse_resumes(self, files: List[Dict]) -> None:
+        """
+        Parse stored resumes and save them to the resume store, for running
+        as a background task after a bulk upload. Files with the same digest
+        are parsed once, with at most BULK_PARSE_CONCURRENCY parses at a time.
+        Files that cannot be parsed are saved with status "failed".
+        """
+        from .parser_service import ParserService
+        from .resume_store import resume_store, build_resume_document
+
+        by_digest: Dict[str, List[Dict]] = {}
+        for file in files:
+            by_digest.setdefault(file["digest"], []).append(file)
+
+        async def mark_failed(copies: List[Dict], error: str):
+            for copy in copies:
+                try:
+                    await resume_store.mark_failed(
+                        copy["file_id"], posixpath.basename(copy["filename"]), error
+                    )
+                except Exception as e:
+                    logger.error(
+                        "Failed to record the parse failure of "
+                        f"{copy['filename']}: {str(e)}"
+                    )
+
+        try:
+            parser = ParserService()
+        except Exception as e:
+            # e.g. no LlamaParse key; a background task has nobody to raise to
+            logger.error(f"Cannot parse bulk-uploaded resumes: {str(e)}")
+            for copies in by_digest.values():
+                await mark_failed(copies, str(e))
+            return
+        semaphore = asyncio.Semaphore(settings.BULK_PARSE_CONCURRENCY)
+
+        async def parse(copies: List[Dict]):
+            async with semaphore:
+                try:
+                    with await self.storage.open_file(copies[0]["file_id"]) as stored:
+                        result = await parser.parse_document(stored, is_resume=True)
+                    for copy in copies:
+                        document = await asyncio.to_thread(
+                            build_resume_document,
+                            copy["file_id"],
+                            posixpath.basename(copy["filename"]),
+                            result,
+                        )
+                        await resume_store.upsert_resume(document)
+                except Exception as e:
+                    logger.error(
+                        "Failed to parse bulk-uploaded "
+                        f"{copies[0]['filename']}: {str(e)}"
+                    )
+                    await mark_failed(copies, str(e))
+
+        await asyncio.gather(*(parse(copies) for copies in by_digest.values()))
+        logger.info(
+            f"Parsed {len(by_digest)} bulk-uploaded resume(s) for {len(files)} file(s)"
+        )
+
+
+bulk_upload_service = BulkUploadService()
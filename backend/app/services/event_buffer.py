@@ -0,0 +1,200 @@
+from typing import Deque, Dict, List, Optional
+from collections import deque
+import asyncio
+import logging
+from pymongo.errors import BulkWriteError
+from ..db.mongodb import get_collection
+
+logger = logging.getLogger(__name__)
+
+# What to do with a new event when the buffer is full
+DROP_NEWEST = "drop_newest"  # reject the incoming event
+DROP_OLDEST = "drop_oldest"  # evict the oldest buffered event
+BLOCK = "block"  # make the caller wait for the next flush (backpressure)
+OVERFLOW_POLICIES = {DROP_NEWEST, DROP_OLDEST, BLOCK}
+
+# Server error code for a duplicate key, i.e. an event that was already written
+DUPLICATE_KEY = 11000
+
+
+class EventBuffer:
+    """
+    Bounded in-process buffer that writes documents with insert_many.
+
+    Events are flushed when `max_batch_size` are waiting or every
+    `flush_interval` seconds, whichever comes first, and once more on stop().
+    Memory is capped at `max_size` buffered events; `overflow_policy` decides
+    what happens past that.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        max_batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_size: int = 10000,
+        overflow_policy: str = DROP_OLDEST,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.collection_name = collection_name
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+
+        self._events: Deque[Dict] = deque()
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._space_available: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {
+            "buffered": 0,
+            "written": 0,
+            "duplicates": 0,
+            "dropped": 0,
+            "failed_flushes": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    async def start(self) -> None:
+        """Start the background flush loop."""
+        if self.running:
+            return
+        self._batch_ready = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._space_available.set()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Started event buffer for {self.collection_name} "
+            f"(batch={self.max_batch_size}, interval={self.flush_interval}s, "
+            f"max_size={self.max_size}, policy={self.overflow_policy})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out everything still buffered."""
+        if self._task is None:
+            return
+        # Signal the loop rather than cancelling it, so an in-flight flush completes
+        self._stopping = True
+        self._batch_ready.set()
+        await self._task
+        self._task = None
+        while self._events:
+            if not await self.flush():
+                break
+        if self._events:
+            logger.error(f"Discarding {len(self._events)} unflushed events on shutdown")
+            self.stats["dropped"] += len(self._events)
+            self._events.clear()
+        logger.info(f"Stopped event buffer for {self.collection_name}: {self.stats}")
+
+    async def put(self, event: Dict) -> bool:
+        """
+        Buffer one event. Returns False if it was dropped.
+
+        Only waits when the buffer is full under the BLOCK policy; otherwise
+        this is a deque append.
+        """
+        if len(self._events) >= self.max_size:
+            if self.overflow_policy == DROP_NEWEST:
+                self.stats["dropped"] += 1
+                return False
+            if self.overflow_policy == DROP_OLDEST:
+                self._events.popleft()
+                self.stats["dropped"] += 1
+            else:
+                while len(self._events) >= self.max_size:
+                    self._space_available.clear()
+                    self._batch_ready.set()
+                    await self._space_available.wait()
+
+        self._events.append(event)
+        self.stats["buffered"] += 1
+        if len(self._events) >= self.max_batch_size:
+            self._batch_ready.set()
+        return True
+
+    async def flush(self) -> bool:
+        """Write one batch of buffered events. Returns False if the write failed."""
+        async with self._flush_lock:
+            if not self._events:
+                return True
+            batch: List[Dict] = [
+                self._events.popleft()
+                for _ in range(min(self.max_batch_size, len(self._events)))
+            ]
+            self._space_available.set()
+            try:
+                await get_collection(self.collection_name).insert_many(
+                    batch, ordered=False
+                )
+                self.stats["written"] += len(batch)
+                return True
+            except BulkWriteError as e:
+                # Unordered inserts write everything they can. Duplicates are
+                # retries of events already written; anything else is lost
+                written = e.details.get("nInserted", 0)
+                errors = [
+                    error
+                    for error in e.details.get("writeErrors", [])
+                    if error.get("code") != DUPLICATE_KEY
+                ]
+                duplicates = len(e.details.get("writeErrors", [])) - len(errors)
+                self.stats["written"] += written
+                self.stats["duplicates"] += duplicates
+                self.stats["dropped"] += len(batch) - written - duplicates
+                if errors:
+                    sample = [
+                        (error.get("code"), error.get("errmsg")) for error in errors[:3]
+                    ]
+                    logger.error(
+                        f"Dropped {len(errors)} events in a flush to "
+                        f"{self.collection_name}: {sample}"
+                    )
+                if e.details.get("writeConcernErrors"):
+                    logger.error(
+                        f"Write concern errors in a flush to {self.collection_name}: "
+                        f"{e.details['writeConcernErrors'][:3]}"
+                    )
+                return True
+            except Exception as e:
+                self.stats["failed_flushes"] += 1
+                self._requeue(batch)
+                logger.error(f"Event flush to {self.collection_name} failed: {str(e)}")
+                return False
+
+    def _requeue(self, batch: List[Dict]) -> None:
+        """Put a failed batch back at the front, within the size bound."""
+        room = max(self.max_size - len(self._events), 0)
+        keep = batch[:room]
+        self.stats["dropped"] += len(batch) - len(keep)
+        self._events.extendleft(reversed(keep))
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            if self._stopping:
+                break
+            if not await self.flush():
+                # Back off instead of hammering an unavailable database
+                await asyncio.sleep(self.flush_interval)
+            # Drain full batches without waiting for the next tick
+            while len(self._events) >= self.max_batch_size:
+                if not await self.flush():
+                    break
@@ -0,0 +1,368 @@
+from typing import Dict, List, Optional, Sequence
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import logging
+import os
+import random
+import threading
+from ..core.config import get_settings
+from ..db.mongodb import get_collection, FIT_EXAMPLES_COLLECTION
+from ..utils.skills import canonicalize_skills, display_name
+from .resume_store import mentioned_years, total_experience_years
+from .skill_extractor import skill_extractor
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Bump when the features change; training only uses examples of the current version
+FEATURE_VERSION = 1
+FEATURE_NAMES = (
+    "skill_coverage",
+    "skill_jaccard",
+    "matched_skills",
+    "missing_skills",
+    "job_skills",
+    "resume_skills",
+    "years_experience",
+    "required_years",
+    "experience_gap",
+    "text_similarity",
+)
+# Lower bound, point estimate and upper bound of the predicted fit score
+QUANTILES = (0.1, 0.5, 0.9)
+# Longest resume or job text kept per training example, in characters
+MAX_EXAMPLE_TEXT = 20000
+
+
+def document_text(parsed: Dict) -> str:
+    """
+    The text of a parse result: the extracted markdown and the LLM's summary of it.
+    """
+    parts = [parsed.get("markdown_content"), parsed.get("original_text")]
+    return "\n\n".join(part for part in parts if part)[:MAX_EXAMPLE_TEXT]
+
+
+def fit_inputs(resume_result: Dict, job_result: Dict) -> Dict:
+    """
+    The raw inputs the features are computed from. They are logged with
+    each example, so features can be recomputed when they change.
+    """
+    resume_text = document_text(resume_result)
+    job_text = document_text(job_result)
+    resume_structured = resume_result.get("structured_data") or {}
+    job_structured = job_result.get("structured_data") or {}
+    experience = (
+        resume_structured.get("work_experience")
+        or resume_structured.get("experience")
+        or []
+    )
+    requirements = " ".join(job_structured.get("qualifications") or []) or job_text
+    return {
+        "resume_skills": canonicalize_skills(
+            [
+                *(resume_structured.get("skills") or []),
+                *skill_extractor.extract(resume_text),
+            ]
+        ),
+        "job_skills": canonicalize_skills(
+            [*(job_structured.get("skills") or []), *skill_extractor.extract(job_text)]
+        ),
+        "years_experience": total_experience_years(experience)
+        or mentioned_years(resume_text),
+        "required_years": mentioned_years(requirements),
+        "resume_text": resume_text,
+        "job_text": job_text,
+    }
+
+
+def feature_vector(inputs: Dict, text_similarity: float) -> List[float]:
+    """Features in FEATURE_NAMES order."""
+    resume_skills = set(inputs["resume_skills"])
+    job_skills = set(inputs["job_skills"])
+    matched = len(resume_skills & job_skills)
+    union = len(resume_skills | job_skills)
+    return [
+        matched / len(job_skills) if job_skills else 0.0,
+        matched / union if union else 0.0,
+        float(matched),
+        float(len(job_skills) - matched),
+        float(len(job_skills)),
+        float(len(resume_skills)),
+        inputs["years_experience"],
+        inputs["required_years"],
+        inputs["years_experience"] - inputs["required_years"],
+        text_similarity,
+    ]
+
+
+def train(examples: Sequence[Dict], random_state: int = 42) -> Dict:
+    """
+    Fit the model on logged examples ({"inputs", "fit_score"}).
+
+    A TF-IDF vectorizer is fitted on all resume and job texts for the
+    similarity feature, and one gradient-boosted regressor per quantile in
+    QUANTILES gives the score and its interval. Needs scikit-learn.
+    """
+    import numpy as np
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(
+        sublinear_tf=True, min_df=2, max_features=50000, stop_words="english"
+    )
+    vectorizer.fit(
+        [example["inputs"]["resume_text"] for example in examples]
+        + [example["inputs"]["job_text"] for example in examples]
+    )
+    bundle = {
+        "vectorizer": vectorizer,
+        "feature_version": FEATURE_VERSION,
+        "trained_at": datetime.utcnow(),
+    }
+    features = np.array(_features(bundle, [example["inputs"] for example in examples]))
+    scores = np.array([example["fit_score"] for example in examples], dtype=float)
+
+    bundle["models"] = {
+        quantile: GradientBoostingRegressor(
+            loss="quantile",
+            alpha=quantile,
+            n_estimators=200,
+            max_depth=3,
+            learning_rate=0.05,
+            subsample=0.8,
+            random_state=random_state,
+        ).fit(features, scores)
+        for quantile in QUANTILES
+    }
+    bundle["examples"] = len(examples)
+    return bundle
+
+
+def predict(bundle: Dict, inputs: List[Dict]) -> List[Dict]:
+    """{score, lower, upper} per input, clipped to 0-100."""
+    import numpy as np
+
+    features = np.array(_features(bundle, inputs))
+    lower, score, upper = (
+        np.clip(bundle["models"][quantile].predict(features), 0, 100)
+        for quantile in QUANTILES
+    )
+    return [
+        # Independent quantile models can cross; keep the interval ordered
+        {"score": float(s), "lower": float(min(l, s)), "upper": float(max(u, s))}
+        for l, s, u in zip(lower, score, upper)
+    ]
+
+
+def _features(bundle: Dict, inputs: List[Dict]) -> List[List[float]]:
+    vectorizer = bundle["vectorizer"]
+    resumes = vectorizer.transform([item["resume_text"] for item in inputs])
+    jobs = vectorizer.transform([item["job_text"] for item in inputs])
+    # Rows are L2-normalized, so the row-wise dot product is the cosine similarity
+    similarities = resumes.multiply(jobs).sum(axis=1).A1
+    return [
+        feature_vector(item, float(similarity))
+        for item, similarity in zip(inputs, similarities)
+    ]
+
+
+def save(bundle: Dict, path: str) -> None:
+    import joblib
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    partial = f"{path}.part"
+    joblib.dump(bundle, partial)
+    # Serving workers reload on the file's mtime; never let them see half a file
+    os.replace(partial, path)
+
+
+class FitModel:
+    """
+    Triage with the locally trained fit-score model.
+
+    Pairs whose predicted interval lies entirely below
+    FIT_TRIAGE_REJECT_BELOW or entirely above FIT_TRIAGE_SHORTLIST_ABOVE are
+    settled without the LLM; everything else, and a FIT_TRIAGE_EXPLORE_RATE
+    sample of the confident pairs, still goes to it. Every LLM score is
+    logged as a training example for app.scripts.train_fit_model. The model
+    file is loaded on first use and reloaded when it changes on disk.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.FIT_MODEL_PATH
+        self._bundle = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        return get_collection(FIT_EXAMPLES_COLLECTION)
+
+    def _load(self) -> Optional[Dict]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self._bundle = None
+            self._mtime = None
+            return None
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime = mtime
+                try:
+                    import joblib
+
+                    bundle = joblib.load(self.path)
+                    if bundle.get("feature_version") != FEATURE_VERSION:
+                        raise ValueError(
+                            f"model has feature version {bundle.get('feature_version')}"
+                        )
+                    self._bundle = bundle
+                    logger.info(
+                        f"Loaded fit model trained on {bundle['examples']} examples at "
+                        f"{bundle['trained_at']}"
+                    )
+                except Exception as e:
+                    logger.error(f"Cannot use fit model {self.path}: {str(e)}")
+                    self._bundle = None
+        return self._bundle
+
+    def _triage_sync(self, resume_result: Dict, job_result: Dict) -> Optional[Dict]:
+        bundle = self._load()
+        if bundle is None:
+            return None
+        inputs = fit_inputs(resume_result, job_result)
+        prediction = predict(bundle, [inputs])[0]
+        if prediction["upper"] < settings.FIT_TRIAGE_REJECT_BELOW:
+            decision = "reject"
+        elif prediction["lower"] > settings.FIT_TRIAGE_SHORTLIST_ABOVE:
+            decision = "shortlist"
+        else:
+            decision = "llm"
+        return {"decision": decision, "prediction": prediction, "inputs": inputs}
+
+    async def triage(self, resume_result: Dict, job_result: Dict) -> Optional[Dict]:
+        """
+        The model's verdict on a pair: {decision, prediction, inputs}, with
+        decision "reject", "shortlist" or "llm". None without a usable model.
+        """
+        if not settings.FIT_TRIAGE_ENABLED:
+            return None
+        try:
+            triage = await asyncio.to_thread(
+                self._triage_sync, resume_result, job_result
+            )
+        except Exception as e:
+            logger.error(f"Fit model triage failed: {str(e)}")
+            return None
+        if (
+            triage
+            and triage["decision"] != "llm"
+            and random.random() < settings.FIT_TRIAGE_EXPLORE_RATE
+        ):
+            # Confident pairs must keep getting LLM labels, or the model never
+            # learns it was wrong
+            triage["decision"] = "llm"
+            triage["explored"] = True
+        return triage
+
+    def analysis_result(self, triage: Dict) -> Dict:
+        """
+        An analysis in the shape AnalysisService returns, built from the model's
+        prediction.
+        """
+        inputs, prediction = triage["inputs"], triage["prediction"]
+        score = round(prediction["score"])
+        job_skills = inputs["job_skills"]
+        resume_skills = set(inputs["resume_skills"])
+        matched = [skill for skill in job_skills if skill in resume_skills]
+        missing = [skill for skill in job_skills if skill not in resume_skills]
+        required = inputs["required_years"]
+        assessment = (
+            "Likely a strong fit"
+            if triage["decision"] == "shortlist"
+            else "Likely not a fit"
+        )
+        summary = (
+            f"{assessment}: predicted fit score {score} "
+            f"({prediction['lower']:.0f}-{prediction['upper']:.0f}) "
+            "by the local fit model, without a full LLM review."
+        )
+        return {
+            "overallFit": score,
+            "skillsMatch": (
+                round(100 * len(matched) / len(job_skills)) if job_skills else 0
+            ),
+            "experienceMatch": (
+                round(100 * min(inputs["years_experience"] / required, 1))
+                if required
+                else 100
+            ),
+            "recommendations": [summary],
+            "detailed_analysis": {
+                "executive_summary": summary,
+                "fit_analysis": {"overall_assessment": assessment, "fit_score": score},
+                "key_strengths": {"skills": [display_name(skill) for skill in matched]},
+                "areas_for_development": {
+                    "skills_gaps": [display_name(skill) for skill in missing]
+                },
+                "triage": {
+                    "source": "fit_model",
+                    "decision": triage["decision"],
+                    "score": prediction["score"],
+                    "interval": [prediction["lower"], prediction["upper"]],
+                },
+            },
+        }
+
+    async def log_example(
+        self,
+        resume_id: str,
+        job_description_id: str,
+        resume_result: Dict,
+        job_result: Dict,
+        analysis: Dict,
+        inputs: Optional[Dict] = None,
+    ) -> None:
+        """Record an LLM-scored pair as a training example; failures are only logged."""
+        if not settings.FIT_EXAMPLES_ENABLED or "error" in (
+            analysis.get("detailed_analysis") or {}
+        ):
+            return
+        try:
+            if inputs is None:
+                inputs = await asyncio.to_thread(fit_inputs, resume_result, job_result)
+            now = datetime.utcnow()
+            await self.collection.update_one(
+                {"resume_id": resume_id, "job_description_id": job_description_id},
+                {
+                    "$set": {
+                        "inputs": inputs,
+                        "feature_version": FEATURE_VERSION,
+                        "fit_score": analysis.get("overallFit"),
+                        "skills_match": analysis.get("skillsMatch"),
+                        "experience_match": analysis.get("experienceMatch"),
+                        "model": (analysis.get("detailed_analysis") or {}).get("model"),
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to log fit example for {resume_id} / "
+                f"{job_description_id}: {str(e)}"
+            )
+
+    async def load_examples(self, since: Optional[datetime] = None) -> List[Dict]:
+        query = {"feature_version": FEATURE_VERSION, "fit_score": {"$ne": None}}
+        if since is not None:
+            query["updated_at"] = {"$gte": since}
+        cursor = self.collection.find(query, {"inputs": 1, "fit_score": 1}).sort(
+            "_id", 1
+        )
+        return [example async for example in cursor]
+
+
+fit_model = FitModel()
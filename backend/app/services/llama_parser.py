@@ -1,4 +1,3 @@
-from llama_parse import LlamaParse
 from typing import List
 import os
 import logging
@@ -10,14 +9,16 @@ class LlamaParser:
     def __init__(self, api_key: str):
         if not api_key:
             raise ValueError("Llama Cloud API key is required")
-        
+
+        from llama_parse import LlamaParse
+
         self.parser = LlamaParse(
             api_key=api_key,
             result_type="markdown",
             verbose=True,
             num_workers=1
         )
-    
+
     def parse_document(self, file_path: str) -> str:
         """
         Parse a document file into markdown format
@@ -31,24 +32,24 @@ class LlamaParser:
         try:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"File not found: {file_path}")
-                
+
             # Parse document using LlamaParse
             logger.info(f"Starting parse for: {file_path}")
             documents = self.parser.load_data(file_path)
-            
+
             if not documents:
                 logger.error("No content extracted")
                 raise ValueError("Document parsing returned empty result")
-                
+
             logger.info(f"Successfully extracted {len(documents)} sections")
-            
+
             # Combine all document sections into one markdown string
             markdown_content = "\n\n".join([doc.text for doc in documents])
             logger.info(f"Generated markdown content length: {len(markdown_content)}")
-            
+
             return markdown_content
-            
+
         except Exception as e:
             logger.error(f"Error parsing document: {str(e)}")
             logger.error(f"Full error: {traceback.format_exc()}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,322 @@
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import json
+import logging
+import time
+import uuid
+from ..core.config import get_settings
+from .llm_client import llm_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def chat_request(custom_id: str, body: Dict) -> Dict:
+    """
+    One line of a batch input file: a chat completion request identified by `custom_id`.
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_ENDPOINT,
+        "body": body,
+    }
+
+
+def read_jsonl(text: str) -> List[Dict]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def completion_content(result: Dict) -> str:
+    """
+    The message content of a batch result line; raises ValueError for a failed request.
+    """
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        error = result.get("error") or (response.get("body") or {}).get("error") or {}
+        raise ValueError(
+            error.get("message")
+            or f"request failed with status {response.get('status_code')}"
+        )
+    return response["body"]["choices"][0]["message"]["content"]
+
+
+class BatchBackend(ABC):
+    """
+    A batch job interface: submit a JSONL file of requests, poll it, read its results.
+    """
+
+    @abstractmethod
+    async def submit(self, input_path: Path, metadata: Optional[Dict] = None) -> str:
+        """Start a batch of the requests in `input_path`; returns the batch id."""
+
+    @abstractmethod
+    async def status(self, batch_id: str) -> Dict:
+        """
+        The batch's {id, status, request_counts}; status is final once in
+        TERMINAL_STATUSES.
+        """
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> List[Dict]:
+        """The result lines of a finished batch, failed requests included."""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """
+    The OpenAI Batch API: results within LLM_BATCH_COMPLETION_WINDOW, at a
+    discount and against a separate rate limit from interactive calls.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or llm_client.client
+
+    async def submit(self, input_path: Path, metadata: Optional[Dict] = None) -> str:
+        with open(input_path, "rb") as handle:
+            uploaded = await self.client.files.create(file=handle, purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_COMPLETIONS_ENDPOINT,
+            completion_window=settings.LLM_BATCH_COMPLETION_WINDOW,
+            metadata=metadata,
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> Dict:
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.model_dump()
+
+    async def results(self, batch_id: str) -> List[Dict]:
+        batch = await self.client.batches.retrieve(batch_id)
+        lines = []
+        # Successful requests land in the output file and failed ones in the error file
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                lines.extend(read_jsonl(content.text))
+        return lines
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    A stand-in for the Batch API that answers each request in process,
+    through `responder` (by default the interactive LLMClient), and writes
+    results in the Batch API's format under `root`. A batch only makes
+    progress while the process that submitted it is running.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        responder: Optional[Callable[[Dict], Awaitable[Dict]]] = None,
+        concurrency: int = 4,
+    ):
+        self.root = Path(root or settings.LLM_BATCH_PATH) / "local"
+        self.responder = responder or self._chat
+        self.concurrency = concurrency
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    async def _chat(body: Dict) -> Dict:
+        completion = await llm_client.chat(task="batch", **body)
+        return completion.model_dump()
+
+    def _status_path(self, batch_id: str) -> Path:
+        return self.root / f"{batch_id}.json"
+
+    def _output_path(self, batch_id: str) -> Path:
+        return self.root / f"{batch_id}.output.jsonl"
+
+    def _write_status(self, batch: Dict) -> None:
+        self._status_path(batch["id"]).write_text(json.dumps(batch))
+
+    async def submit(self, input_path: Path, metadata: Optional[Dict] = None) -> str:
+        requests = read_jsonl(await asyncio.to_thread(Path(input_path).read_text))
+        batch = {
+            "id": f"batch_local_{uuid.uuid4().hex}",
+            "status": "in_progress",
+            "metadata": metadata,
+            "created_at": int(time.time()),
+            "request_counts": {"total": len(requests), "completed": 0, "failed": 0},
+        }
+        await asyncio.to_thread(self.root.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(self._write_status, batch)
+        self._tasks[batch["id"]] = asyncio.create_task(self._run(batch, requests))
+        return batch["id"]
+
+    async def _run(self, batch: Dict, requests: List[Dict]) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def answer(request: Dict) -> Dict:
+            async with semaphore:
+                try:
+                    body = await self.responder(request["body"])
+                    batch["request_counts"]["completed"] += 1
+                    return {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "body": body},
+                        "error": None,
+                    }
+                except Exception as e:
+                    batch["request_counts"]["failed"] += 1
+                    return {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": request["custom_id"],
+                        "response": None,
+                        "error": {"code": type(e).__name__, "message": str(e)},
+                    }
+
+        try:
+            lines = await asyncio.gather(*(answer(request) for request in requests))
+            output = "".join(json.dumps(line) + "\n" for line in lines)
+            await asyncio.to_thread(self._output_path(batch["id"]).write_text, output)
+            batch["status"] = "completed"
+        except Exception as e:
+            logger.error(f"Local batch {batch['id']} failed: {str(e)}")
+            batch["status"] = "failed"
+        finally:
+            await asyncio.to_thread(self._write_status, batch)
+            self._tasks.pop(batch["id"], None)
+
+    async def status(self, batch_id: str) -> Dict:
+        try:
+            return json.loads(
+                await asyncio.to_thread(self._status_path(batch_id).read_text)
+            )
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Batch not found: {batch_id}")
+
+    async def results(self, batch_id: str) -> List[Dict]:
+        # The status file says completed just before the task returns
+        task = self._tasks.get(batch_id)
+        if task is not None:
+            await task
+        output = self._output_path(batch_id)
+        if not await asyncio.to_thread(output.exists):
+            return []
+        return read_jsonl(await asyncio.to_thread(output.read_text))
+
+
+def create_batch_backend(name: Optional[str] = None) -> BatchBackend:
+    name = name or settings.LLM_BATCH_BACKEND
+    if name == "openai":
+        return OpenAIBatchBackend()
+    if name == "local":
+        return LocalBatchBackend()
+    raise ValueError(f"Unknown LLM_BATCH_BACKEND {name!r}; expected openai or local")
+
+
+class BatchRunner:
+    """
+    Runs chat completion requests as offline batch jobs.
+
+    Requests are written to JSONL input files under LLM_BATCH_PATH, split
+    so that none exceeds LLM_BATCH_MAX_REQUESTS lines or
+    LLM_BATCH_MAX_BYTES, and submitted to the backend; wait() polls every
+    LLM_BATCH_POLL_SECONDS until all batches are final, and results() maps
+    each request's custom_id to its result line.
+    """
+
+    def __init__(
+        self, backend: Optional[BatchBackend] = None, root: Optional[str] = None
+    ):
+        self.backend = backend or create_batch_backend()
+        self.root = Path(root or settings.LLM_BATCH_PATH)
+        self.max_requests = settings.LLM_BATCH_MAX_REQUESTS
+        self.max_bytes = settings.LLM_BATCH_MAX_BYTES
+
+    def write_inputs(self, requests: Iterable[Dict], name: str) -> List[Path]:
+        """Write the requests to as many input files as the limits call for."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        paths, handle, lines, size = [], None, 0, 0
+        try:
+            for request in requests:
+                line = (json.dumps(request) + "\n").encode("utf-8")
+                if (
+                    handle is None
+                    or lines >= self.max_requests
+                    or size + len(line) > self.max_bytes
+                ):
+                    if handle is not None:
+                        handle.close()
+                    paths.append(self.root / f"{name}-{len(paths):03d}.jsonl")
+                    handle = open(paths[-1], "wb")
+                    lines, size = 0, 0
+                handle.write(line)
+                lines += 1
+                size += len(line)
+        finally:
+            if handle is not None:
+                handle.close()
+        return paths
+
+    async def submit(
+        self, requests: Iterable[Dict], name: Optional[str] = None
+    ) -> List[str]:
+        """Submit the requests; returns the batch ids."""
+        name = name or f"batch-{datetime.utcnow():%Y%m%d-%H%M%S}"
+        paths = await asyncio.to_thread(self.write_inputs, requests, name)
+        batch_ids = []
+        for path in paths:
+            batch_id = await self.backend.submit(
+                path, {"name": name, "input": path.name}
+            )
+            logger.info(f"Submitted {path.name} as batch {batch_id}")
+            batch_ids.append(batch_id)
+        return batch_ids
+
+    async def wait(
+        self,
+        batch_ids: List[str],
+        poll_seconds: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Dict]:
+        """Poll until every batch is final; returns the final status per batch id."""
+        poll_seconds = (
+            settings.LLM_BATCH_POLL_SECONDS if poll_seconds is None else poll_seconds
+        )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        final: Dict[str, Dict] = {}
+        while True:
+            for batch_id in batch_ids:
+                if batch_id not in final:
+                    status = await self.backend.status(batch_id)
+                    if status["status"] in TERMINAL_STATUSES:
+                        logger.info(
+                            f"Batch {batch_id} {status['status']}: "
+                            f"{status.get('request_counts')}"
+                        )
+                        final[batch_id] = status
+            if len(final) == len(batch_ids):
+                return final
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"{len(batch_ids) - len(final)} batch(es) still running"
+                )
+            await asyncio.sleep(poll_seconds)
+
+    async def results(self, batch_ids: List[str]) -> Dict[str, Dict]:
+        """Result lines by custom_id; requests a batch never answered are absent."""
+        results = {}
+        for batch_id in batch_ids:
+            for line in await self.backend.results(batch_id):
+                results[line["custom_id"]] = line
+        return results
+
+    async def run(
+        self, requests: Iterable[Dict], name: Optional[str] = None, **wait
+    ) -> Dict[str, Dict]:
+        batch_ids = await self.submit(requests, name)
+        await self.wait(batch_ids, **wait)
+        return await self.results(batch_ids)
@@ -0,0 +1,282 @@
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import logging
+import threading
+import time
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+# Model tiers that routing rules can name instead of a model
+TIERS = {"default": "OPENAI_MODEL", "large": "OPENAI_LARGE_MODEL"}
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """
+    Prompt tokens of chat messages, at about four characters per token plus framing.
+    """
+    return sum(len(message.get("content") or "") // 4 + 4 for message in messages)
+
+
+def prompt_usage(completion) -> Dict[str, int]:
+    """
+    Prompt and cached prompt tokens reported by a completion; zeros when it has no
+    usage.
+    """
+    usage = getattr(completion, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+    }
+
+
+class LatencyTracker:
+    """The most recent call latencies per key, for percentile deadlines."""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(
+        self, key: str, percent: float, min_samples: int = 1
+    ) -> Optional[float]:
+        """
+        The `percent` percentile of recent latencies, or None with fewer than
+        `min_samples`.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(key, ()))
+        if len(latencies) < max(min_samples, 1):
+            return None
+        return latencies[min(int(len(latencies) * percent / 100), len(latencies) - 1)]
+
+    def count(self, key: str) -> int:
+        return len(self._latencies.get(key, ()))
+
+    def keys(self):
+        with self._lock:
+            return list(self._latencies)
+
+
+class HedgeBudget:
+    """
+    Caps hedges to a share of requests: every request earns `ratio` of a
+    token, every hedge spends a whole one, and at most `burst` are saved up.
+    """
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class LLMClient:
+    """
+    The shared path for OpenAI chat completions: one AsyncOpenAI client
+    (and connection pool) per process, with model routing and optional
+    request hedging.
+
+    Calls name their task (summarize, parse or score). Unless a call names
+    its model, the first rule in LLM_ROUTES[task] whose limits hold picks
+    it: `max_prompt_tokens` on the estimated prompt size, `max_in_flight`
+    on this process's open calls to the rule's model and `max_p95_seconds`
+    on that model's recent latency for the task. A rule names a `model` or
+    a `tier` ("default" is OPENAI_MODEL, "large" OPENAI_LARGE_MODEL); with
+    no rule left, OPENAI_MODEL is used.
+
+    With LLM_HEDGING_ENABLED, a call that has not returned by the
+    LLM_HEDGE_PERCENTILE latency of recent calls with the same task and
+    model gets a duplicate request; the first to succeed is returned and
+    the other is cancelled. LLM_HEDGE_BUDGET caps hedges to a share of
+    calls, so a slow provider never gets much more than the usual load.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._client = None
+        self.latencies = LatencyTracker(settings.LLM_LATENCY_WINDOW)
+        self.budget = HedgeBudget(settings.LLM_HEDGE_BUDGET)
+        self.in_flight: Dict[str, int] = {}
+        self.counters = {"calls": 0, "hedges": 0, "hedges_won": 0}
+        self.usage: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            api_key = (self.api_key or settings.OPENAI_API_KEY).strip()
+            if not api_key:
+                raise ValueError("OpenAI API key not found in settings")
+            # Imported here to keep the openai package out of API startup
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=settings.LLM_MAX_RETRIES,
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    async def chat(
+        self, task: str = "chat", hedge: Optional[bool] = None, **request: Any
+    ):
+        """
+        Create a chat completion with the keyword arguments of
+        `chat.completions.create`; `model` is optional and routed by `task`
+        when left out. `hedge` overrides LLM_HEDGING_ENABLED.
+        """
+        self.counters["calls"] += 1
+        if not request.get("model"):
+            prompt_tokens = estimate_tokens(request.get("messages") or [])
+            request["model"], rule = self.route(task, prompt_tokens)
+            logger.info(
+                f"LLM {task} call routed to {request['model']} by rule {rule}: "
+                f"~{prompt_tokens} prompt tokens, "
+                f"{self.in_flight.get(request['model'], 0)} in flight"
+            )
+        key = f"{task}:{request['model']}"
+        if not (settings.LLM_HEDGING_ENABLED if hedge is None else hedge):
+            return await self._timed(key, request)
+        return await self._hedged(key, request)
+
+    def route(self, task: str, prompt_tokens: int) -> Tuple[str, Optional[int]]:
+        """
+        The model for a call and the index of the rule that chose it (None for the
+        fallback).
+        """
+        for index, rule in enumerate(settings.LLM_ROUTES.get(task) or []):
+            model = rule.get("model") or getattr(
+                settings, TIERS[rule.get("tier", "default")]
+            )
+            if prompt_tokens > rule.get("max_prompt_tokens", float("inf")):
+                continue
+            if self.in_flight.get(model, 0) >= rule.get("max_in_flight", float("inf")):
+                continue
+            if "max_p95_seconds" in rule:
+                p95 = self.latencies.percentile(
+                    f"{task}:{model}", 95, settings.LLM_HEDGE_MIN_SAMPLES
+                )
+                if p95 is not None and p95 > rule["max_p95_seconds"]:
+                    continue
+            return model, index
+        return settings.OPENAI_MODEL, None
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """
+        Seconds to wait before hedging a call, or None until enough latencies are known.
+        """
+        deadline = self.latencies.percentile(
+            key, settings.LLM_HEDGE_PERCENTILE, settings.LLM_HEDGE_MIN_SAMPLES
+        )
+        if deadline is None:
+            return None
+        return max(deadline, settings.LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    async def _timed(self, key: str, request: Dict):
+        model = request["model"]
+        self.in_flight[model] = self.in_flight.get(model, 0) + 1
+        started = time.monotonic()
+        try:
+            completion = await self.client.chat.completions.create(**request)
+        finally:
+            self.in_flight[model] -= 1
+        self.latencies.record(key, time.monotonic() - started)
+        self._record_usage(key, completion)
+        return completion
+
+    def _record_usage(self, key: str, completion) -> None:
+        usage = prompt_usage(completion)
+        if not usage["prompt_tokens"]:
+            return
+        totals = self.usage.setdefault(
+            key, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        )
+        totals["calls"] += 1
+        totals["prompt_tokens"] += usage["prompt_tokens"]
+        totals["cached_tokens"] += usage["cached_tokens"]
+        logger.info(
+            f"LLM {key} call used {usage['prompt_tokens']} prompt tokens, "
+            f"{usage['cached_tokens']} cached"
+        )
+
+    async def _hedged(self, key: str, request: Dict):
+        self.budget.earn()
+        delay = self.hedge_delay(key)
+        started = time.monotonic()
+        primary = asyncio.create_task(self._timed(key, request))
+        hedge = None
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self.budget.try_spend():
+                return await primary
+
+            self.counters["hedges"] += 1
+            logger.info(f"Hedging {key} after {delay:.1f}s")
+            hedge = asyncio.create_task(self._timed(key, request))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedges_won"] += 1
+                            # The primary's true latency is at least this long;
+                            # recording
+                            # it keeps the tail in the window that sets the deadline
+                            self.latencies.record(key, time.monotonic() - started)
+                        return task.result()
+            # Both failed; report the original request's error
+            return primary.result()
+        finally:
+            # The loser, or both requests if the caller was cancelled
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict:
+        """
+        Call and hedge counts, calls in flight, and latency percentiles and
+        prompt token totals (cached ones included) per task and model.
+        """
+        return {
+            **self.counters,
+            "in_flight": dict(self.in_flight),
+            "usage": {key: dict(totals) for key, totals in self.usage.items()},
+            "latency": {
+                key: {
+                    "samples": self.latencies.count(key),
+                    **{
+                        f"p{p}": self.latencies.percentile(key, p) for p in (50, 95, 99)
+                    },
+                }
+                for key in self.latencies.keys()
+            },
+        }
+
+
+llm_client = LLMClient()
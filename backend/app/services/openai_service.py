@@ -1,28 +1,30 @@
-from openai import OpenAI
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 from ..utils.prompting_instructions import (
     JOB_DESCRIPTION_PARSER_SYSTEM_PROMPT,
     RESUME_PARSER_SYSTEM_PROMPT,
-    FIT_SCORE_SYSTEM_PROMPT
 )
+from .analysis_service import fit_score_messages
+from .llm_client import LLMClient
 
 class OpenAIService:
-    def __init__(self, api_key: str, model: str = "gpt-4-1106-preview"):
+
+    def __init__(self, api_key: str, model: Optional[str] = None):
         if not api_key:
             raise ValueError("OpenAI API key is required")
-            
-        self.client = OpenAI(api_key=api_key)
+
+        self.client = LLMClient(api_key)
+        # None lets the client route each call by task and size
         self.model = model
-    
+
     async def parse_job_description(self, content: str) -> Dict[str, Any]:
         """Parse job description using standardized prompt"""
         return await self.process_with_prompt(content, JOB_DESCRIPTION_PARSER_SYSTEM_PROMPT)
-    
+
     async def parse_resume(self, content: str) -> Dict[str, Any]:
         """Parse resume using standardized prompt"""
         return await self.process_with_prompt(content, RESUME_PARSER_SYSTEM_PROMPT)
-    
+
     async def calculate_fit_score(
         self, 
         resume_json: Dict[str, Any], 
@@ -30,32 +32,24 @@ class OpenAIService:
     ) -> Dict[str, Any]:
         """Calculate fit score using standardized prompt"""
         try:
-            input_content = {
-                "job_description": job_desc_json,
-                "resume": resume_json
-            }
-            
-            completion = await self.client.chat.completions.create(
+            # Sorted keys keep the job description's bytes, and so the cached
+            # prompt prefix, stable
+            completion = await self.client.chat(
+                task="score",
                 model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": FIT_SCORE_SYSTEM_PROMPT
-                    },
-                    {
-                        "role": "user",
-                        "content": json.dumps(input_content)
-                    }
-                ],
+                messages=fit_score_messages(
+                    json.dumps(job_desc_json, sort_keys=True),
+                    json.dumps(resume_json, sort_keys=True),
+                ),
                 temperature=0.3,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
             )
-            
+
             return json.loads(completion.choices[0].message.content)
-            
+
         except Exception as e:
             raise Exception(f"Error calculating fit score: {str(e)}")
-    
+
     async def process_with_prompt(self, content: str, system_prompt: str) -> Dict[str, Any]:
         """
         Process content with OpenAI using a specific system prompt
@@ -68,25 +62,25 @@ class OpenAIService:
             Dict[str, Any]: Processed JSON response
         """
         try:
-            completion = await self.client.chat.completions.create(
+            completion = await self.client.chat(
+                task="parse",
                 model=self.model,
                 response_format={"type": "json_object"},
                 messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
+                    {"role": "system", "content": system_prompt},
                     {
                         "role": "user",
-                        "content": f"Parse this content into structured JSON:\n\n{content}"
-                    }
+                        "content": (
+                            "Parse this content into structured JSON:\n\n" f"{content}"
+                        ),
+                    },
                 ],
                 temperature=0.3,
-                seed=42
+                seed=42,
             )
-            
+
             # Parse the response
             return json.loads(completion.choices[0].message.content)
-            
+
         except Exception as e:
-            raise Exception(f"Error processing with OpenAI: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error processing with OpenAI: {str(e)}")
@@ -0,0 +1,88 @@
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import binascii
+from bson import json_util
+from pymongo import ASCENDING
+
+# A sort specification as passed to pymongo: [(field, ASCENDING | DESCENDING), ...].
+# The last field must be unique (normally `_id`) so that the order is total.
+SortSpec = List[Tuple[str, int]]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort-key values of the last returned document as an opaque token."""
+    raw = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    """Decode a token produced by encode_cursor back into sort-key values."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error) as e:
+        raise InvalidCursorError(f"Invalid cursor: {token}") from e
+    if not isinstance(values, list):
+        raise InvalidCursorError(f"Invalid cursor: {token}")
+    return values
+
+
+def cursor_for(document: Dict, sort: SortSpec) -> str:
+    """Build the cursor that resumes pagination right after `document`."""
+    return encode_cursor([document.get(field) for field, _ in sort])
+
+
+def keyset_filter(sort: SortSpec, token: str) -> Dict:
+    """
+    Translate a cursor into a query matching only documents after it in `sort` order.
+
+    For sort keys (a, b, _id) this yields
+    {"$or": [{a > va}, {a == va, b > vb}, {a == va, b == vb, _id > vid}]},
+    with > swapped for < on descending keys, so no page skips over all the
+    previous ones. Only sorts on stored, indexed fields make this an index
+    range scan; computed keys such as the skill coverage or the text score
+    are filtered after the search stages, on every matching document.
+    """
+    values = decode_cursor(token)
+    if len(values) != len(sort):
+        raise InvalidCursorError(f"Cursor does not match sort order: {token}")
+
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def page_response(
+    results: List[Dict],
+    sort: SortSpec,
+    limit: int,
+    total: Optional[int],
+    page: Optional[int] = None,
+    total_at_least: Optional[int] = None,
+    facets: Optional[Dict] = None,
+) -> Dict:
+    """
+    Shape a page of results, adding `next_cursor` when more results may follow.
+
+    `total` is None on cursor pages, which skip counting; clients keep the
+    total and facets from the first page. It is also None when counting
+    stopped early, and `total_at_least` then holds the capped count.
+    """
+    next_cursor = cursor_for(results[-1], sort) if len(results) == limit else None
+    return {
+        "results": results,
+        "total": total,
+        "total_at_least": total_at_least,
+        "page": page,
+        "limit": limit,
+        "pages": (total + limit - 1) // limit if total is not None else None,
+        "next_cursor": next_cursor,
+        "facets": facets,
+    }
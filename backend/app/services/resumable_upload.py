@@ -0,0 +1,287 @@
+from typing import AsyncIterator, Dict, Optional, Set
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from ..core.config import get_settings
+from .storage_service import StorageService
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: uploads are only locked against other requests in this process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class OffsetMismatch(ValueError):
+    """A chunk was sent for another offset than the one the upload has reached."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UploadBusy(RuntimeError):
+    """Another request is appending to the same upload."""
+
+
+class IncompleteUpload(ValueError):
+    pass
+
+
+class DigestMismatch(ValueError):
+    pass
+
+
+class ResumableUploadService:
+    """
+    Chunked uploads that survive dropped connections, in the style of tus.
+
+    create() opens an upload of a declared size; append() writes a chunk
+    at the offset the upload has reached, so a client that lost its
+    connection asks for the offset (status()) and resends only the rest;
+    finalize() verifies the SHA-256 digest of the assembled file and hands
+    it to StorageService. Chunks are written straight to a file under
+    RESUMABLE_UPLOAD_PATH, which is the only state: its size is the offset,
+    and a JSON sidecar holds the declared metadata. Every worker on a host
+    (or on a shared volume) can therefore serve any request of an upload.
+    """
+
+    def __init__(
+        self, root: Optional[str] = None, storage: Optional[StorageService] = None
+    ):
+        self.root = Path(root or settings.RESUMABLE_UPLOAD_PATH)
+        self.storage = storage or StorageService()
+        self.max_size = settings.RESUMABLE_UPLOAD_MAX_SIZE
+        self.expiry = timedelta(hours=settings.RESUMABLE_UPLOAD_EXPIRY_HOURS)
+        self._held: Set[str] = set()
+        self._held_lock = threading.Lock()
+
+    def _path(self, upload_id: str) -> Path:
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            raise FileNotFoundError(f"Upload not found: {upload_id}")
+        return self.root / f"{upload_id}.part"
+
+    def _info_path(self, upload_id: str) -> Path:
+        return self._path(upload_id).with_suffix(".json")
+
+    @asynccontextmanager
+    async def _exclusive(self, upload_id: str, handle=None):
+        """
+        Hold the upload against other requests: an flock on the open file,
+        which also covers other workers, or an in-process lock without fcntl.
+        """
+        if fcntl is not None:
+            if handle is None:
+                raise ValueError("Locking an upload needs its open file")
+            try:
+                # Released when the handle is closed
+                await asyncio.to_thread(
+                    fcntl.flock, handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB
+                )
+            except BlockingIOError:
+                raise UploadBusy(
+                    f"Upload {upload_id} is being written by another request"
+                )
+            yield
+            return
+
+        with self._held_lock:
+            if upload_id in self._held:
+                raise UploadBusy(
+                    f"Upload {upload_id} is being written by another request"
+                )
+            self._held.add(upload_id)
+        try:
+            yield
+        finally:
+            with self._held_lock:
+                self._held.discard(upload_id)
+
+    async def create(
+        self,
+        filename: str,
+        size: int,
+        content_type: Optional[str] = None,
+        digest: Optional[str] = None,
+    ) -> Dict:
+        """
+        Start an upload of `size` bytes; `digest` is the client's SHA-256, checked on
+        finalize.
+        """
+        if size < 0 or size > self.max_size:
+            raise UploadTooLarge(f"Uploads are limited to {self.max_size} bytes")
+        upload_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        info = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "digest": digest.lower() if digest else None,
+            "created_at": now.isoformat(),
+            "expires_at": (now + self.expiry).isoformat(),
+        }
+        await asyncio.to_thread(self.root.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(self._path(upload_id).touch)
+        await asyncio.to_thread(self._info_path(upload_id).write_text, json.dumps(info))
+        logger.info(
+            f"Created resumable upload {upload_id} for {filename} ({size} bytes)"
+        )
+        return {**info, "offset": 0}
+
+    async def status(self, upload_id: str) -> Dict:
+        """The upload's declared metadata and the offset it has reached."""
+        try:
+            info = json.loads(
+                await asyncio.to_thread(self._info_path(upload_id).read_text)
+            )
+            offset = (await asyncio.to_thread(self._path(upload_id).stat)).st_size
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Upload not found: {upload_id}")
+        return {**info, "offset": offset}
+
+    async def append(
+        self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]
+    ) -> Dict:
+        """
+        Write a chunk that starts at `offset`. Bytes that arrive before the
+        connection drops are kept, so the next attempt resumes after them.
+        """
+        info = await self.status(upload_id)
+        handle = await asyncio.to_thread(open, self._path(upload_id), "ab")
+        try:
+            # Held for the whole request; a second writer would interleave bytes
+            async with self._exclusive(upload_id, handle):
+                current = await asyncio.to_thread(os.fstat, handle.fileno())
+                if offset != current.st_size:
+                    raise OffsetMismatch(current.st_size)
+
+                written = current.st_size
+                async for chunk in chunks:
+                    if written + len(chunk) > info["size"]:
+                        raise UploadTooLarge(
+                            f"Upload {upload_id} is declared as {info['size']} bytes"
+                        )
+                    await asyncio.to_thread(handle.write, chunk)
+                    written += len(chunk)
+                await asyncio.to_thread(handle.flush)
+        finally:
+            await asyncio.to_thread(handle.close)
+        return {**info, "offset": written}
+
+    async def finalize(self, upload_id: str) -> Dict:
+        """
+        Verify a complete upload and store it. Returns StorageService.store's
+        result together with the upload's filename.
+        """
+        info = await self.status(upload_id)
+        if info["offset"] != info["size"]:
+            raise IncompleteUpload(
+                f"Upload is at offset {info['offset']} of {info['size']} bytes"
+            )
+
+        assembled = await asyncio.to_thread(open, self._path(upload_id), "rb")
+        try:
+            async with self._exclusive(upload_id, assembled):
+                digest = await asyncio.to_thread(self._sha256, assembled)
+                if info["digest"] and info["digest"] != digest:
+                    await self._remove(upload_id)
+                    raise DigestMismatch(
+                        f"Upload digest is {digest}, expected {info['digest']}"
+                    )
+                stored = await self.storage.store_spooled(
+                    assembled,
+                    digest,
+                    info["size"],
+                    info["filename"],
+                    info["content_type"],
+                )
+                await self._remove(upload_id)
+        finally:
+            await asyncio.to_thread(assembled.close)
+
+        logger.info(
+            f"Finalized resumable upload {upload_id} as file {stored['file_id']}"
+        )
+        return {**stored, "filename": info["filename"]}
+
+    async def abort(self, upload_id: str) -> None:
+        """
+        Discard an upload. Raises FileNotFoundError for an unknown upload and
+        UploadBusy while another request is writing or finalizing it.
+        """
+        await self.status(upload_id)
+        # The in-process lock needs no handle, and Windows cannot delete open files
+        handle = None
+        if fcntl is not None:
+            try:
+                handle = await asyncio.to_thread(open, self._path(upload_id), "rb")
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Upload not found: {upload_id}")
+        try:
+            async with self._exclusive(upload_id, handle):
+                await self._remove(upload_id)
+        finally:
+            if handle is not None:
+                await asyncio.to_thread(handle.close)
+
+    async def _remove(self, upload_id: str) -> None:
+        """Delete an upload's files; the caller holds the upload or it is orphaned."""
+        for path in (self._path(upload_id), self._info_path(upload_id)):
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+
+    async def expire(self) -> int:
+        """Remove uploads past their expiry; returns how many."""
+        if not await asyncio.to_thread(self.root.exists):
+            return 0
+        now = datetime.utcnow()
+        expired = 0
+        for info_path in await asyncio.to_thread(
+            lambda: list(self.root.glob("*.json"))
+        ):
+            try:
+                info = json.loads(await asyncio.to_thread(info_path.read_text))
+            except (FileNotFoundError, ValueError):
+                continue
+            if datetime.fromisoformat(info["expires_at"]) <= now:
+                try:
+                    await self.abort(info["upload_id"])
+                except UploadBusy:
+                    # Still being written; the next run removes it
+                    continue
+                except FileNotFoundError:
+                    # Metadata left behind without its data
+                    await self._remove(info["upload_id"])
+                expired += 1
+        if expired:
+            logger.info(f"Removed {expired} expired resumable upload(s)")
+        return expired
+
+    def _sha256(self, handle) -> str:
+        digest = hashlib.sha256()
+        while True:
+            chunk = handle.read(self.storage.backend.chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+resumable_uploads = ResumableUploadService()
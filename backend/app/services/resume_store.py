@@ -0,0 +1,316 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import logging
+import os
+import re
+from pymongo import ReturnDocument, UpdateOne
+from ..core.config import get_settings
+from ..db.mongodb import get_collection, RESUMES_COLLECTION, ANALYSES_COLLECTION
+from ..utils.skills import canonicalize_skills, display_name
+from .skill_extractor import skill_extractor
+from .skill_index import skill_index, SKILL_INDEX_PROJECTION
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _parse_year_month(value: Optional[str]) -> Optional[datetime]:
+    """Parse a YYYY-MM (or YYYY) date as used in ResumeOutput; "Present" means now."""
+    if not value:
+        return None
+    if value.strip().lower() == "present":
+        return datetime.utcnow()
+    for fmt in ("%Y-%m", "%Y"):
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def total_experience_years(experience: List[Dict]) -> float:
+    """Sum the duration of all work experience entries, in years."""
+    months = 0
+    for entry in experience:
+        dates = entry.get("dates") or {}
+        start = _parse_year_month(dates.get("start"))
+        end = _parse_year_month(dates.get("end")) or start
+        if start and end and end >= start:
+            months += (end.year - start.year) * 12 + (end.month - start.month)
+    return round(months / 12, 1)
+
+
+_YEARS = re.compile(
+    r"(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years?|yrs?)\b", re.IGNORECASE
+)
+# A "Location: ..." or "Address: ..." line, as resumes and the summary report write them
+_LOCATION = re.compile(
+    r"^[\s>*_#-]*(?:location|address|based in)[*_]*\s*[:\-][*_\s]*"
+    r"(?P<location>[^\n|]+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def mentioned_years(text: str) -> float:
+    """The largest "N years" in a text, capped at 50 to ignore dates and typos."""
+    years = [int(match) for match in _YEARS.findall(text or "")]
+    return float(max([year for year in years if year <= 50], default=0))
+
+
+def mentioned_location(text: str) -> Optional[str]:
+    """The first labelled location or address line in a text, if any."""
+    for match in _LOCATION.finditer(text or ""):
+        location = match.group("location").strip(" .,*_")
+        if location and location.lower() not in ("not provided", "n/a", "none"):
+            return location
+    return None
+
+
+def build_resume_document(file_id: str, filename: str, parsed: Dict) -> Dict:
+    """
+    Map a parse result onto the ResumeInDB shape.
+
+    `parsed` is either the dict returned by ParserService.parse_document or a
+    ResumeOutput dump. ParserService results keep any structured resume under
+    `structured_data` (currently always empty); location and experience then
+    come from the document text. Runs spaCy, so call it in a worker thread.
+    """
+    if "structured_data" in parsed or "markdown_content" in parsed:
+        structured = parsed.get("structured_data") or {}
+    else:
+        structured = parsed
+    text = "\n\n".join(
+        part
+        for part in (parsed.get("markdown_content"), parsed.get("original_text"))
+        if part
+    )
+    contact_info = structured.get("contact_info") or {}
+    experience = structured.get("work_experience") or structured.get("experience") or []
+    education = structured.get("education") or []
+    markdown_content = parsed.get("markdown_content")
+    skills = structured.get("skills") or []
+    # Skills named by the LLM plus every taxonomy skill mentioned in the document,
+    # so resumes that skipped the structured parse are still searchable by skill
+    canonical_skills = canonicalize_skills([*skills, *skill_extractor.extract(text)])
+
+    return {
+        "file_id": file_id,
+        "title": contact_info.get("name") or filename,
+        "file_path": filename,
+        "file_type": os.path.splitext(filename)[1].lstrip(".").lower(),
+        "status": "processed",
+        # Clears the error of an earlier failed parse
+        "error": None,
+        "processed_data": {
+            "summary": parsed.get("original_text") or structured.get("summary"),
+            "markdown_content": markdown_content,
+            "structured_data": structured,
+        },
+        "skills": skills or [display_name(skill) for skill in canonical_skills],
+        # Precomputed canonical keys for exact, index-backed matching in SearchService
+        "skills_normalized": canonical_skills,
+        "experience": experience,
+        "education": education,
+        "location": structured.get("location")
+        or contact_info.get("address")
+        or mentioned_location(text),
+        "total_experience": total_experience_years(experience) or mentioned_years(text),
+    }
+
+
+def _resume_upsert(document: Dict) -> Tuple[Dict, Dict]:
+    """Filter and update document for upserting a resume."""
+    now = datetime.utcnow()
+    return (
+        {"file_id": document["file_id"]},
+        {
+            "$set": {**document, "updated_at": now},
+            "$setOnInsert": {"created_at": now},
+        },
+    )
+
+
+def _analysis_upsert(
+    resume_id: str, job_description_id: str, analysis: Dict
+) -> Tuple[Dict, Dict]:
+    """Filter and update document for upserting an analysis."""
+    now = datetime.utcnow()
+    return (
+        {"resume_id": resume_id, "job_description_id": job_description_id},
+        {
+            "$set": {
+                "analysis_results": analysis,
+                "fit_score": analysis.get("overallFit"),
+                "updated_at": now,
+            },
+            "$setOnInsert": {"created_at": now},
+        },
+    )
+
+
+class ResumeStore:
+    """Writes parsed resumes and their analyses to MongoDB."""
+
+    @property
+    def resume_collection(self):
+        return get_collection(RESUMES_COLLECTION)
+
+    @property
+    def analyses_collection(self):
+        return get_collection(ANALYSES_COLLECTION)
+
+    async def upsert_resume(self, document: Dict) -> None:
+        """Insert or update a single parsed resume, keyed by its file_id."""
+        stored = await self.resume_collection.find_one_and_update(
+            *_resume_upsert(document),
+            projection=SKILL_INDEX_PROJECTION,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        skill_index.upsert(stored)
+        logger.info(f"Upserted resume {document['file_id']}")
+
+    async def mark_failed(self, file_id: str, filename: str, error: str) -> None:
+        """Record that a stored file could not be parsed, keeping any earlier parse."""
+        now = datetime.utcnow()
+        await self.resume_collection.update_one(
+            {"file_id": file_id},
+            {
+                "$set": {"status": "failed", "error": error, "updated_at": now},
+                "$setOnInsert": {
+                    "title": filename,
+                    "file_path": filename,
+                    "file_type": os.path.splitext(filename)[1].lstrip(".").lower(),
+                    "created_at": now,
+                },
+            },
+            upsert=True,
+        )
+        logger.info(f"Marked resume {file_id} as failed")
+
+    async def bulk_upsert_resumes(
+        self, documents: Iterable[Dict], batch_size: Optional[int] = None
+    ) -> Dict:
+        """Upsert many parsed resumes with unordered bulk_write calls."""
+        documents = list(documents)
+        ops = [
+            UpdateOne(*_resume_upsert(document), upsert=True) for document in documents
+        ]
+        totals = await self._bulk_write(self.resume_collection, ops, batch_size)
+        await self._refresh_skill_index([document["file_id"] for document in documents])
+        return totals
+
+    async def save_analysis(
+        self, resume_id: str, job_description_id: str, analysis: Dict
+    ) -> None:
+        """Insert or update the analysis of one resume against one job description."""
+        await self.analyses_collection.update_one(
+            *_analysis_upsert(resume_id, job_description_id, analysis), upsert=True
+        )
+        logger.info(f"Saved analysis for resume {resume_id} / job {job_description_id}")
+
+    async def bulk_save_analyses(
+        self, analyses: Iterable[Dict], batch_size: Optional[int] = None
+    ) -> Dict:
+        """
+        Save many analyses at once. Each item holds `resume_id`,
+        `job_description_id` and `analysis`.
+        """
+        ops = [
+            UpdateOne(
+                *_analysis_upsert(
+                    item["resume_id"], item["job_description_id"], item["analysis"]
+                ),
+                upsert=True,
+            )
+            for item in analyses
+        ]
+        return await self._bulk_write(self.analyses_collection, ops, batch_size)
+
+    async def recanonicalize_skills(self, batch_size: Optional[int] = None) -> Dict:
+        """
+        Recompute skills_normalized for every stored resume.
+
+        Run after the skill taxonomy changes so stored keys match the ones
+        search queries are canonicalized to.
+        """
+        batch_size = batch_size or settings.MONGODB_BULK_BATCH_SIZE
+        totals = {"matched": 0, "modified": 0, "upserted": 0}
+        ops = []
+        cursor = self.resume_collection.find(
+            {},
+            {
+                **SKILL_INDEX_PROJECTION,
+                "processed_data.structured_data.skills": 1,
+                "processed_data.markdown_content": 1,
+                "processed_data.summary": 1,
+            },
+        ).batch_size(batch_size)
+
+        async for resume in cursor:
+            processed_data = resume.get("processed_data") or {}
+            # `skills` may itself have been extracted from the text; start from
+            # the parsed list
+            listed = (processed_data.get("structured_data") or {}).get("skills") or []
+            text = "\n\n".join(
+                part
+                for part in (
+                    processed_data.get("markdown_content"),
+                    processed_data.get("summary"),
+                )
+                if part
+            )
+            extracted = await asyncio.to_thread(skill_extractor.extract, text)
+            canonical_skills = canonicalize_skills([*listed, *extracted])
+            ops.append(
+                UpdateOne(
+                    {"_id": resume["_id"]},
+                    {
+                        "$set": {
+                            "skills": listed
+                            or [display_name(skill) for skill in canonical_skills],
+                            "skills_normalized": canonical_skills,
+                        }
+                    },
+                )
+            )
+            skill_index.upsert({**resume, "skills_normalized": canonical_skills})
+            if len(ops) >= batch_size:
+                result = await self._bulk_write(self.resume_collection, ops, batch_size)
+                for key in totals:
+                    totals[key] += result[key]
+                ops = []
+
+        if ops:
+            result = await self._bulk_write(self.resume_collection, ops, batch_size)
+            for key in totals:
+                totals[key] += result[key]
+        return totals
+
+    async def _refresh_skill_index(self, file_ids: List[str]) -> None:
+        """Load the stored state of freshly written resumes into the skill index."""
+        cursor = self.resume_collection.find(
+            {"file_id": {"$in": file_ids}}, SKILL_INDEX_PROJECTION
+        )
+        async for resume in cursor:
+            skill_index.upsert(resume)
+
+    async def _bulk_write(
+        self, collection, ops: List[UpdateOne], batch_size: Optional[int]
+    ) -> Dict:
+        batch_size = batch_size or settings.MONGODB_BULK_BATCH_SIZE
+        totals = {"matched": 0, "modified": 0, "upserted": 0}
+        for start in range(0, len(ops), batch_size):
+            result = await collection.bulk_write(
+                ops[start : start + batch_size], ordered=False
+            )
+            totals["matched"] += result.matched_count
+            totals["modified"] += result.modified_count
+            totals["upserted"] += result.upserted_count
+        logger.info(f"Bulk write to {collection.name}: {totals}")
+        return totals
+
+
+# Create a singleton instance
+resume_store = ResumeStore()
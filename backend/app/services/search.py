@@ -1,12 +1,68 @@
 from typing import List, Dict, Optional
+from bisect import bisect_right
+from pymongo import ASCENDING, DESCENDING
+from ..core.config import get_settings
 from ..db.mongodb import get_collection, RESUMES_COLLECTION, USERS_COLLECTION
+from .pagination import (
+    InvalidCursorError,
+    SortSpec,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    page_response,
+)
+from .skill_index import skill_index
+from ..utils.skills import canonicalize_skill, canonicalize_skills
 from bson import ObjectId
 
+settings = get_settings()
+
+# Stable sort orders used for both page-number and cursor pagination
+TEXT_SCORE_SORT: SortSpec = [("score", DESCENDING), ("_id", ASCENDING)]
+SKILL_RANK_SORT: SortSpec = [
+    ("coverage", DESCENDING),
+    ("match_count", DESCENDING),
+    ("_id", ASCENDING),
+]
+
+# Upper bounds of the years-of-experience buckets shown in the filter sidebar
+EXPERIENCE_BUCKETS = [0, 2, 5, 10, 15]
+
+# $facet sub-pipelines computing the filter sidebar counts for resume searches
+RESUME_FACETS = {
+    "skills": [
+        {"$unwind": "$skills_normalized"},
+        {"$sortByCount": "$skills_normalized"},
+        {"$limit": settings.SEARCH_FACET_SIZE},
+    ],
+    "location": [
+        {"$match": {"location": {"$type": "string"}}},
+        {"$sortByCount": "$location"},
+        {"$limit": settings.SEARCH_FACET_SIZE},
+    ],
+    "experience": [
+        {"$match": {"total_experience": {"$type": "number"}}},
+        {
+            "$bucket": {
+                "groupBy": "$total_experience",
+                "boundaries": EXPERIENCE_BUCKETS,
+                "default": f"{EXPERIENCE_BUCKETS[-1]}+",
+                "output": {"count": {"$sum": 1}},
+            }
+        },
+    ],
+}
+
 
 class SearchService:
-    def __init__(self):
-        self.resume_collection = get_collection(RESUMES_COLLECTION)
-        self.users_collection = get_collection(USERS_COLLECTION)
+
+    @property
+    def resume_collection(self):
+        return get_collection(RESUMES_COLLECTION)
+
+    @property
+    def users_collection(self):
+        return get_collection(USERS_COLLECTION)
 
     async def search_by_skills(
         self,
@@ -14,11 +70,48 @@ class SearchService:
         location: Optional[str] = None,
         experience_years: Optional[int] = None,
         page: int = 1,
-        limit: int = 10
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        must_have: Optional[List[str]] = None,
+        min_match: int = 1,
+        skill_weights: Optional[Dict[str, float]] = None,
     ) -> Dict:
-        """Search resumes by skills and other criteria."""
-        skip = (page - 1) * limit
-        query = {"skills": {"$in": skills}}
+        """
+        Search resumes by skills and other criteria, best matches first.
+
+        Results are ranked by weighted skill coverage, then by the number of
+        matched skills. `must_have` skills are required, `min_match` sets the
+        minimum number of matched skills and `skill_weights` overrides the
+        default weight of 1.0 per skill.
+
+        Pass the `next_cursor` of a previous response as `cursor` to page by
+        key instead of by page number; `page` is ignored in that case.
+        """
+        # Canonicalize query skills the same way resumes are at ingest
+        must_have = canonicalize_skills(must_have or [])
+        wanted = canonicalize_skills([*skills, *must_have])
+        weights = {
+            canonicalize_skill(skill): weight
+            for skill, weight in (skill_weights or {}).items()
+        }
+
+        if settings.SKILL_INDEX_ENABLED and skill_index.ready:
+            return await self._search_skill_index(
+                wanted,
+                weights,
+                must_have,
+                min_match,
+                location,
+                experience_years,
+                page,
+                limit,
+                cursor,
+            )
+
+        query = {"skills_normalized": {"$in": wanted}}
+
+        if must_have:
+            query["skills_normalized"]["$all"] = must_have
 
         if location:
             query["location"] = location
@@ -26,45 +119,147 @@ class SearchService:
         if experience_years:
             query["total_experience"] = {"$gte": experience_years}
 
-        cursor = self.resume_collection.find(query).skip(skip).limit(limit)
-        total = await self.resume_collection.count_documents(query)
-        results = await cursor.to_list(length=limit)
+        return await self._search(
+            self.resume_collection,
+            query,
+            SKILL_RANK_SORT,
+            page,
+            limit,
+            cursor,
+            facets=RESUME_FACETS,
+            score_stages=self._skill_rank_stages(wanted, weights, min_match),
+        )
 
-        return {
-            "results": results,
-            "total": total,
-            "page": page,
-            "limit": limit,
-            "pages": (total + limit - 1) // limit
-        }
+    @staticmethod
+    def _skill_rank_stages(
+        wanted: List[str], weights: Dict[str, float], min_match: int
+    ) -> List[Dict]:
+        """
+        Aggregation stages adding match_count and weighted coverage to each resume.
+        """
+        total_weight = sum(weights.get(skill, 1.0) for skill in wanted) or 1.0
+        weighted_matches = [
+            {
+                "$cond": [
+                    {"$in": [{"$literal": skill}, "$matched_skills"]},
+                    weights.get(skill, 1.0),
+                    0,
+                ]
+            }
+            for skill in wanted
+        ]
+        return [
+            {
+                "$addFields": {
+                    "matched_skills": {
+                        "$setIntersection": ["$skills_normalized", {"$literal": wanted}]
+                    }
+                }
+            },
+            {
+                "$addFields": {
+                    "match_count": {"$size": "$matched_skills"},
+                    # Rounded so cursor values compare equal on the next page
+                    "coverage": {
+                        "$round": [
+                            {"$divide": [{"$add": weighted_matches}, total_weight]},
+                            6,
+                        ]
+                    },
+                }
+            },
+            {"$match": {"match_count": {"$gte": min_match}}},
+        ]
+
+    async def _search_skill_index(
+        self,
+        wanted: List[str],
+        weights: Dict[str, float],
+        must_have: List[str],
+        min_match: int,
+        location: Optional[str],
+        experience_years: Optional[int],
+        page: int,
+        limit: int,
+        cursor: Optional[str],
+    ) -> Dict:
+        """
+        Answer a skill search from the in-process SkillIndex.
+
+        Ranking, filtering, totals and facets are computed in memory with the
+        same semantics as the aggregation path; MongoDB is only asked for the
+        documents on the requested page.
+        """
+        ranked = skill_index.rank(
+            wanted, weights, must_have, min_match, location, experience_years
+        )
+
+        if cursor:
+            values = decode_cursor(cursor)
+            # (coverage, match_count, _id), compared with the ranked sort keys
+            if (
+                len(values) != len(SKILL_RANK_SORT)
+                or not all(
+                    isinstance(value, (int, float)) and not isinstance(value, bool)
+                    for value in values[:2]
+                )
+                or not isinstance(values[2], ObjectId)
+            ):
+                raise InvalidCursorError(f"Cursor does not match sort order: {cursor}")
+            start = bisect_right(
+                [item.sort_key for item in ranked], (-values[0], -values[1], values[2])
+            )
+            total, facets, page = None, None, None
+        else:
+            start = (page - 1) * limit
+            total = len(ranked)
+            facets = skill_index.facets(
+                [item.id for item in ranked],
+                settings.SEARCH_FACET_SIZE,
+                EXPERIENCE_BUCKETS,
+            )
+        page_items = ranked[start : start + limit]
+
+        # Hydrate the page, keeping the ranked order
+        documents = await self.resume_collection.find(
+            {"_id": {"$in": [item.id for item in page_items]}}
+        ).to_list(length=limit)
+        by_id = {document["_id"]: document for document in documents}
+        results = []
+        for item in page_items:
+            document = by_id.get(item.id)
+            if document is None:
+                continue
+            skills = document.get("skills_normalized") or []
+            document.update(
+                matched_skills=[skill for skill in wanted if skill in skills],
+                match_count=item.match_count,
+                coverage=item.coverage,
+            )
+            results.append(document)
+
+        response = page_response(
+            results, SKILL_RANK_SORT, limit, total, page, facets=facets
+        )
+        # Resumes deleted since they were indexed must not end the pagination early
+        last = page_items[-1] if len(page_items) == limit else None
+        response["next_cursor"] = (
+            encode_cursor([last.coverage, last.match_count, last.id]) if last else None
+        )
+        return response
 
     async def search_professionals(
         self,
         query: str,
         filters: Dict = None,
         page: int = 1,
-        limit: int = 10
+        limit: int = 10,
+        cursor: Optional[str] = None,
     ) -> Dict:
         """Search for professionals based on various criteria."""
-        skip = (page - 1) * limit
-        search_query = {
-            "$text": {"$search": query}
-        }
-
-        if filters:
-            search_query.update(filters)
-
-        cursor = self.users_collection.find(search_query).skip(skip).limit(limit)
-        total = await self.users_collection.count_documents(search_query)
-        results = await cursor.to_list(length=limit)
-
-        return {
-            "results": results,
-            "total": total,
-            "page": page,
-            "limit": limit,
-            "pages": (total + limit - 1) // limit
-        }
+        return await self._text_search(
+            self.users_collection, query, filters, page, limit, cursor
+        )
 
     async def get_similar_profiles(
         self,
@@ -76,10 +271,16 @@ class SearchService:
         if not profile:
             return []
 
-        similar_profiles = await self.resume_collection.find({
-            "_id": {"$ne": ObjectId(profile_id)},
-            "skills": {"$in": profile.get("skills", [])}
-        }).limit(limit).to_list(length=limit)
+        similar_profiles = (
+            await self.resume_collection.find(
+                {
+                    "_id": {"$ne": ObjectId(profile_id)},
+                    "skills_normalized": {"$in": profile.get("skills_normalized", [])},
+                }
+            )
+            .limit(limit)
+            .to_list(length=limit)
+        )
 
         return similar_profiles
 
@@ -89,12 +290,101 @@ class SearchService:
         collection_name: str,
         filters: Dict = None,
         page: int = 1,
-        limit: int = 10
+        limit: int = 10,
+        cursor: Optional[str] = None,
     ) -> Dict:
         """Generic text search across specified collection."""
-        skip = (page - 1) * limit
         collection = get_collection(collection_name)
+        facets = RESUME_FACETS if collection_name == RESUMES_COLLECTION else None
+        return await self._text_search(
+            collection, text, filters, page, limit, cursor, facets
+        )
+
+    async def _search(
+        self,
+        collection,
+        query: Dict,
+        sort: SortSpec,
+        page: int,
+        limit: int,
+        cursor: Optional[str],
+        facets: Optional[Dict[str, List[Dict]]] = None,
+        score_stages: Optional[List[Dict]] = None,
+    ) -> Dict:
+        """
+        Run a search as a single aggregation.
 
+        The first page (or any page-number request) returns the results, the
+        total and the requested facet counts from one $facet round trip.
+        Counting stops after SEARCH_EXACT_TOTAL_LIMIT matches: larger result
+        sets get `total_at_least` instead of `total`. This caps the counting,
+        not the scan; the facets still see every matching document.
+        Cursor pages only fetch the next slice of results by key.
+        """
+        pipeline = [{"$match": query}, *(score_stages or [])]
+
+        if cursor:
+            pipeline += [
+                {"$match": keyset_filter(sort, cursor)},
+                {"$sort": dict(sort)},
+                {"$limit": limit},
+            ]
+            results = await collection.aggregate(pipeline).to_list(length=limit)
+            return page_response(results, sort, limit, None)
+
+        count_limit = settings.SEARCH_EXACT_TOTAL_LIMIT
+        pipeline.append(
+            {
+                "$facet": {
+                    "results": [
+                        {"$sort": dict(sort)},
+                        {"$skip": (page - 1) * limit},
+                        {"$limit": limit},
+                    ],
+                    # Stop counting past the limit; larger totals are only known
+                    # as a lower bound
+                    "total": [{"$limit": count_limit + 1}, {"$count": "count"}],
+                    **(facets or {}),
+                }
+            }
+        )
+        output = (await collection.aggregate(pipeline).to_list(length=1))[0]
+
+        counted = output["total"][0]["count"] if output["total"] else 0
+        facet_counts = (
+            {
+                name: [
+                    {"value": bucket["_id"], "count": bucket["count"]}
+                    for bucket in output[name]
+                ]
+                for name in facets
+            }
+            if facets
+            else None
+        )
+
+        capped = counted > count_limit
+        return page_response(
+            output["results"],
+            sort,
+            limit,
+            None if capped else counted,
+            page,
+            total_at_least=counted if capped else None,
+            facets=facet_counts,
+        )
+
+    async def _text_search(
+        self,
+        collection,
+        text: str,
+        filters: Optional[Dict],
+        page: int,
+        limit: int,
+        cursor: Optional[str],
+        facets: Optional[Dict[str, List[Dict]]] = None,
+    ) -> Dict:
+        """Run a $text search ordered by relevance, then _id."""
         search_query = {
             "$text": {"$search": text}
         }
@@ -102,18 +392,18 @@ class SearchService:
         if filters:
             search_query.update(filters)
 
-        cursor = collection.find(search_query).skip(skip).limit(limit)
-        total = await collection.count_documents(search_query)
-        results = await cursor.to_list(length=limit)
-
-        return {
-            "results": results,
-            "total": total,
-            "page": page,
-            "limit": limit,
-            "pages": (total + limit - 1) // limit
-        }
+        # textScore has to be projected before it can be sorted or paged on
+        return await self._search(
+            collection,
+            search_query,
+            TEXT_SCORE_SORT,
+            page,
+            limit,
+            cursor,
+            facets=facets,
+            score_stages=[{"$addFields": {"score": {"$meta": "textScore"}}}],
+        )
 
 
 # Create a singleton instance
-search_service = SearchService() 
\ No newline at end of file
+search_service = SearchService()
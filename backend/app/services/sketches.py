@@ -0,0 +1,352 @@
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+from datetime import datetime, timedelta
+import hashlib
+import heapq
+import logging
+import math
+import zlib
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+from ..db.mongodb import get_collection, ANALYTICS_SKETCHES_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d"
+SYNC_SKEW_SECONDS = 30
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters summary (Metwally et al.) over at most `capacity` keys.
+
+    Every count is an overestimate by at most its recorded error, and any key
+    whose true count exceeds N / capacity is guaranteed to be tracked. Updates
+    are amortized O(log capacity); summaries are mergeable, so per-day
+    summaries combine into arbitrary windows.
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        # key -> [count, error, last_seen]
+        self._counters: Dict[str, list] = {}
+        # Min-heap of (count, key); entries go stale as counts grow and are skipped
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def add(
+        self, key: str, count: int = 1, timestamp: Optional[datetime] = None
+    ) -> None:
+        counter = self._counters.get(key)
+        if counter is None:
+            if len(self._counters) < self.capacity:
+                counter = self._counters[key] = [0, 0, None]
+            else:
+                # Replace the minimum: the newcomer inherits its count as error
+                min_count, min_key = self._pop_min()
+                del self._counters[min_key]
+                counter = self._counters[key] = [min_count, min_count, None]
+        counter[0] += count
+        if timestamp is not None and (counter[2] is None or timestamp > counter[2]):
+            counter[2] = timestamp
+        heapq.heappush(self._heap, (counter[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c[0], k) for k, c in self._counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            counter = self._counters.get(key)
+            if counter is not None and counter[0] == count:
+                return count, key
+
+    def _floor(self) -> int:
+        """Upper bound on the count of any key not tracked here."""
+        if len(self._counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self._counters.values())
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Combine two summaries into a new one with this summary's capacity."""
+        floors = (self._floor(), other._floor())
+        combined = {}
+        for key in set(self._counters) | set(other._counters):
+            count = error = 0
+            last_seen = None
+            for summary, floor in zip((self, other), floors):
+                counter = summary._counters.get(key)
+                if counter is None:
+                    count += floor
+                    error += floor
+                else:
+                    count += counter[0]
+                    error += counter[1]
+                    if counter[2] is not None and (
+                        last_seen is None or counter[2] > last_seen
+                    ):
+                        last_seen = counter[2]
+            combined[key] = [count, error, last_seen]
+
+        merged = SpaceSaving(self.capacity)
+        for key, counter in heapq.nlargest(
+            self.capacity, combined.items(), key=lambda item: item[1][0]
+        ):
+            merged._counters[key] = counter
+        merged._heap = [(c[0], k) for k, c in merged._counters.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+    def top(self, k: int) -> List[Dict]:
+        """The k keys with the highest estimated counts."""
+        return [
+            {
+                "_id": key,
+                "count": counter[0],
+                "error": counter[1],
+                "last_seen": counter[2],
+            }
+            for key, counter in heapq.nlargest(
+                k, self._counters.items(), key=lambda item: item[1][0]
+            )
+        ]
+
+    def to_document(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "counters": [[key, *counter] for key, counter in self._counters.items()],
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict) -> "SpaceSaving":
+        summary = cls(document["capacity"])
+        for key, count, error, last_seen in document["counters"]:
+            summary._counters[key] = [count, error, last_seen]
+        summary._heap = [(c[0], k) for k, c in summary._counters.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch (Flajolet et al.) with 2**precision registers.
+
+    The standard error is about 1.04 / sqrt(2**precision), 0.8% at the
+    default precision of 14, in 16 KB however many values are added.
+    Merging takes the register-wise maximum, so the union of any set of
+    sketches estimates the distinct count of the combined streams.
+    """
+
+    def __init__(self, precision: int = 14, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError(
+                f"HyperLogLog precision must be between 4 and 16, got {precision}"
+            )
+        self.precision = precision
+        self.registers = (
+            registers if registers is not None else bytearray(1 << precision)
+        )
+
+    def add(self, value: str) -> None:
+        hashed = int.from_bytes(
+            hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+        )
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        # Position of the leftmost 1 bit in the remaining 64 - precision bits
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        import numpy as np
+
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        estimate = alpha * m * m / float(np.exp2(-registers.astype(np.float64)).sum())
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        import numpy as np
+
+        merged = np.maximum(
+            np.frombuffer(self.registers, dtype=np.uint8),
+            np.frombuffer(other.registers, dtype=np.uint8),
+        )
+        return HyperLogLog(self.precision, bytearray(merged.tobytes()))
+
+    def to_document(self) -> Dict:
+        # Registers of sparse days are mostly zero and compress well
+        return {
+            "precision": self.precision,
+            "registers": Binary(zlib.compress(bytes(self.registers))),
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict) -> "HyperLogLog":
+        return cls(
+            document["precision"], bytearray(zlib.decompress(document["registers"]))
+        )
+
+
+S = TypeVar("S")
+
+
+class DailySketches(Generic[S]):
+    """
+    One mergeable sketch per UTC day, shared across workers through MongoDB.
+
+    Each process adds into in-memory `delta` sketches. checkpoint() merges the
+    deltas into the stored sketch of each day (optimistic concurrency on a
+    version number, so concurrent workers never lose each other's updates)
+    and reloads every stored sketch changed since the previous checkpoint as
+    the local `base`. Reads combine base and delta, so they reflect other
+    workers' events up to the last checkpoint.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        factory: Callable[[], S],
+        load: Callable[[Dict], S],
+        retention_days: int = 90,
+    ):
+        self.kind = kind
+        self.factory = factory
+        self.load = load
+        self.retention_days = retention_days
+        self._base: Dict[str, S] = {}
+        self._delta: Dict[str, S] = {}
+        self._synced_at: Optional[datetime] = None
+
+    @property
+    def collection(self):
+        return get_collection(ANALYTICS_SKETCHES_COLLECTION)
+
+    def _doc_id(self, date: str) -> str:
+        return f"{self.kind}:{date}"
+
+    def sketch_for(self, timestamp: datetime) -> S:
+        """The local delta sketch to add events of `timestamp` to."""
+        date = timestamp.strftime(DATE_FORMAT)
+        sketch = self._delta.get(date)
+        if sketch is None:
+            sketch = self._delta[date] = self.factory()
+        return sketch
+
+    def day(self, date: str) -> Optional[S]:
+        """Base and delta of one day combined, or None if nothing was recorded."""
+        parts = [
+            part
+            for part in (self._base.get(date), self._delta.get(date))
+            if part is not None
+        ]
+        if not parts:
+            return None
+        merged = parts[0]
+        for part in parts[1:]:
+            merged = merged.merge(part)
+        return merged
+
+    def window(self, days: int, now: Optional[datetime] = None) -> List[Tuple[str, S]]:
+        """
+        (date, sketch) pairs for the last `days` days, today included, oldest first.
+        """
+        now = now or datetime.utcnow()
+        result = []
+        for offset in range(days - 1, -1, -1):
+            date = (now - timedelta(days=offset)).strftime(DATE_FORMAT)
+            sketch = self.day(date)
+            if sketch is not None:
+                result.append((date, sketch))
+        return result
+
+    def merged(self, days: int) -> Optional[S]:
+        """All sketches of the last `days` days merged into one."""
+        merged = None
+        for _, sketch in self.window(days):
+            merged = sketch if merged is None else merged.merge(sketch)
+        return merged
+
+    async def load_recent(self, days: Optional[int] = None) -> None:
+        """Load the stored sketches of the last `days` days as the local base."""
+        days = days or self.retention_days
+        start = (datetime.utcnow() - timedelta(days=days - 1)).strftime(DATE_FORMAT)
+        await self._load({"date": {"$gte": start}})
+        logger.info(f"Loaded {len(self._base)} {self.kind} sketches")
+
+    async def _load(self, query: Dict) -> None:
+        # Allow for clock skew between the workers stamping updated_at
+        synced_at = datetime.utcnow() - timedelta(seconds=SYNC_SKEW_SECONDS)
+        async for document in self.collection.find({"kind": self.kind, **query}):
+            self._base[document["date"]] = self.load(document["sketch"])
+        self._synced_at = synced_at
+
+    async def checkpoint(self) -> None:
+        """Merge local deltas into the stored sketches and drop expired days."""
+        deltas, self._delta = self._delta, {}
+        for date, delta in deltas.items():
+            try:
+                self._base[date] = await self._merge_into_store(date, delta)
+            except Exception as e:
+                # Keep the delta so the next checkpoint retries it
+                existing = self._delta.get(date)
+                self._delta[date] = delta if existing is None else delta.merge(existing)
+                logger.error(
+                    f"Failed to checkpoint {self.kind} sketch for {date}: {str(e)}"
+                )
+
+        cutoff = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime(
+            DATE_FORMAT
+        )
+        for date in [date for date in self._base if date < cutoff]:
+            del self._base[date]
+        await self.collection.delete_many({"kind": self.kind, "date": {"$lt": cutoff}})
+
+        # Pick up days other workers have written to
+        if self._synced_at is not None:
+            await self._load(
+                {"date": {"$gte": cutoff}, "updated_at": {"$gte": self._synced_at}}
+            )
+
+    async def _merge_into_store(self, date: str, delta: S, attempts: int = 5) -> S:
+        doc_id = self._doc_id(date)
+        for _ in range(attempts):
+            stored = await self.collection.find_one({"_id": doc_id})
+            if stored is None:
+                try:
+                    await self.collection.insert_one(
+                        {
+                            "_id": doc_id,
+                            "kind": self.kind,
+                            "date": date,
+                            "version": 1,
+                            "updated_at": datetime.utcnow(),
+                            "sketch": delta.to_document(),
+                        }
+                    )
+                    return delta
+                except DuplicateKeyError:
+                    continue
+            merged = self.load(stored["sketch"]).merge(delta)
+            result = await self.collection.update_one(
+                {"_id": doc_id, "version": stored["version"]},
+                {
+                    "$set": {
+                        "sketch": merged.to_document(),
+                        "updated_at": datetime.utcnow(),
+                    },
+                    "$inc": {"version": 1},
+                },
+            )
+            if result.modified_count:
+                return merged
+        raise RuntimeError(f"Too many concurrent updates to sketch {doc_id}")
@@ -0,0 +1,93 @@
+from typing import List, Optional
+import logging
+import threading
+from ..utils.skill_taxonomy import (
+    SKILL_TAXONOMY,
+    CASE_SENSITIVE_SYNONYMS,
+    TEXT_AMBIGUOUS_SYNONYMS,
+)
+from ..utils.skills import normalize_skill
+
+logger = logging.getLogger(__name__)
+
+
+class SkillExtractor:
+    """
+    Extracts canonical skills from free text with spaCy PhraseMatchers.
+
+    All taxonomy names and synonyms are compiled into two matchers, one
+    case-insensitive and one exact-case for ambiguous words like "R" or "C";
+    short forms that are usually not skills in prose are left out.
+    Only the tokenizer runs, so extraction is linear in the length of the
+    text. The spaCy pipeline is built on first use.
+    """
+
+    def __init__(self):
+        self._nlp = None
+        self._matchers = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._matchers is not None:
+                return
+            import spacy
+            from spacy.matcher import PhraseMatcher
+
+            nlp = spacy.blank("en")
+            lower_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+            exact_matcher = PhraseMatcher(nlp.vocab, attr="ORTH")
+
+            for display_name, synonyms in SKILL_TAXONOMY.items():
+                canonical = normalize_skill(display_name)
+                names = [
+                    name
+                    for name in (display_name, *synonyms)
+                    if name not in TEXT_AMBIGUOUS_SYNONYMS
+                ]
+                lower_names = [
+                    name for name in names if name not in CASE_SENSITIVE_SYNONYMS
+                ]
+                exact_names = [
+                    name for name in names if name in CASE_SENSITIVE_SYNONYMS
+                ]
+                if lower_names:
+                    lower_matcher.add(
+                        canonical, [nlp.make_doc(name) for name in lower_names]
+                    )
+                if exact_names:
+                    exact_matcher.add(
+                        canonical, [nlp.make_doc(name) for name in exact_names]
+                    )
+
+            self._nlp = nlp
+            self._matchers = (lower_matcher, exact_matcher)
+            logger.info(f"Compiled skill matcher for {len(SKILL_TAXONOMY)} skills")
+
+    def extract(self, text: Optional[str]) -> List[str]:
+        """
+        Return the canonical skills mentioned in `text`, in order of first mention.
+        """
+        if not text:
+            return []
+        if self._matchers is None:
+            self._load()
+
+        from spacy.util import filter_spans
+
+        doc = self._nlp.make_doc(text)
+        spans = []
+        for matcher in self._matchers:
+            spans.extend(matcher(doc, as_spans=True))
+
+        # Prefer the longest match where phrases overlap
+        # ("GitHub Actions" over "GitHub")
+        skills = []
+        for span in filter_spans(spans):
+            if span.label_ not in skills:
+                skills.append(span.label_)
+        return skills
+
+
+# Create a singleton instance
+skill_extractor = SkillExtractor()
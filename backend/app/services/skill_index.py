@@ -0,0 +1,233 @@
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+import logging
+import time
+from bson import ObjectId
+from ..db.mongodb import get_collection, RESUMES_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Fields the index keeps for each resume
+SKILL_INDEX_PROJECTION = {"skills_normalized": 1, "location": 1, "total_experience": 1}
+
+
+class IndexedResume(NamedTuple):
+    skills: FrozenSet[str]
+    location: Optional[str]
+    total_experience: Optional[float]
+
+
+class RankedResume(NamedTuple):
+    coverage: float
+    match_count: int
+    id: ObjectId
+
+    @property
+    def sort_key(self) -> Tuple[float, int, ObjectId]:
+        """
+        Key matching SearchService.SKILL_RANK_SORT (coverage desc, match_count desc, _id
+        asc).
+        """
+        return (-self.coverage, -self.match_count, self.id)
+
+
+class SkillIndex:
+    """
+    In-memory inverted index from canonical skill to a sorted list of resume ids.
+
+    Built from the resumes collection at startup and kept current by
+    ResumeStore as resumes are upserted. It also keeps each resume's location
+    and total experience, so skill searches with filters and facets can be
+    answered without MongoDB; only the final page is hydrated from the database.
+    The index is per process; other workers' writes show up on the next
+    periodic rebuild.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, List[ObjectId]] = {}
+        self._resumes: Dict[ObjectId, IndexedResume] = {}
+        self._pending: Optional[List[Tuple[ObjectId, Optional[Dict]]]] = None
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._resumes)
+
+    async def build(self) -> None:
+        """(Re)build the index from the resumes collection."""
+        started = time.perf_counter()
+        # Writes that land while the collection is being scanned are replayed afterwards
+        self._pending = []
+        postings: Dict[str, List[ObjectId]] = {}
+        resumes: Dict[ObjectId, IndexedResume] = {}
+        try:
+            cursor = get_collection(RESUMES_COLLECTION).find({}, SKILL_INDEX_PROJECTION)
+            async for resume in cursor:
+                entry = self._entry(resume)
+                resumes[resume["_id"]] = entry
+                for skill in entry.skills:
+                    postings.setdefault(skill, []).append(resume["_id"])
+            for ids in postings.values():
+                ids.sort()
+
+            pending, self._pending = self._pending, None
+            self._postings, self._resumes = postings, resumes
+            for resume_id, resume in pending:
+                self._apply(resume_id, resume)
+        finally:
+            self._pending = None
+
+        self.ready = True
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"Built skill index: {len(resumes)} resumes, "
+            f"{len(postings)} skills in {elapsed:.0f} ms"
+        )
+
+    def upsert(self, resume: Dict) -> None:
+        """Add or refresh one resume; `resume` needs _id and skills_normalized."""
+        if self._pending is not None:
+            self._pending.append((resume["_id"], resume))
+        self._apply(resume["_id"], resume)
+
+    def remove(self, resume_id: ObjectId) -> None:
+        if self._pending is not None:
+            self._pending.append((resume_id, None))
+        self._apply(resume_id, None)
+
+    def _apply(self, resume_id: ObjectId, resume: Optional[Dict]) -> None:
+        old = self._resumes.pop(resume_id, None)
+        new = self._entry(resume) if resume is not None else None
+        old_skills = old.skills if old else frozenset()
+        new_skills = new.skills if new else frozenset()
+
+        for skill in old_skills - new_skills:
+            ids = self._postings.get(skill, [])
+            position = bisect_left(ids, resume_id)
+            if position < len(ids) and ids[position] == resume_id:
+                del ids[position]
+            if not ids:
+                self._postings.pop(skill, None)
+        for skill in new_skills - old_skills:
+            insort(self._postings.setdefault(skill, []), resume_id)
+        if new is not None:
+            self._resumes[resume_id] = new
+
+    @staticmethod
+    def _entry(resume: Dict) -> IndexedResume:
+        return IndexedResume(
+            skills=frozenset(resume.get("skills_normalized") or []),
+            location=resume.get("location"),
+            total_experience=resume.get("total_experience"),
+        )
+
+    def match_all(self, skills: Iterable[str]) -> List[ObjectId]:
+        """Ids of resumes having every skill (AND), in id order."""
+        lists = sorted(
+            (self._postings.get(skill, []) for skill in set(skills)), key=len
+        )
+        if not lists:
+            return []
+        result = lists[0]
+        for ids in lists[1:]:
+            result = [resume_id for resume_id in result if _contains(ids, resume_id)]
+            if not result:
+                break
+        return list(result)
+
+    def match_any(self, skills: Iterable[str]) -> List[ObjectId]:
+        """Ids of resumes having at least one of the skills (OR), in id order."""
+        return self.match_at_least(skills, 1)
+
+    def match_at_least(self, skills: Iterable[str], k: int) -> List[ObjectId]:
+        """Ids of resumes having at least `k` of the skills, in id order."""
+        counts = self._match_counts(set(skills))
+        return sorted(resume_id for resume_id, count in counts.items() if count >= k)
+
+    def _match_counts(self, skills: Iterable[str]) -> Counter:
+        counts = Counter()
+        for skill in skills:
+            counts.update(self._postings.get(skill, ()))
+        return counts
+
+    def rank(
+        self,
+        wanted: List[str],
+        weights: Dict[str, float],
+        must_have: List[str],
+        min_match: int = 1,
+        location: Optional[str] = None,
+        experience_years: Optional[int] = None,
+    ) -> List[RankedResume]:
+        """
+        Rank resumes the same way SearchService's aggregation does: weighted
+        coverage of `wanted`, then matched-skill count, then id.
+        """
+        total_weight = sum(weights.get(skill, 1.0) for skill in wanted) or 1.0
+        candidates = self.match_all(must_have) if must_have else self.match_any(wanted)
+
+        ranked = []
+        for resume_id in candidates:
+            resume = self._resumes[resume_id]
+            if location and resume.location != location:
+                continue
+            if experience_years and (resume.total_experience or 0) < experience_years:
+                continue
+            matched = [skill for skill in wanted if skill in resume.skills]
+            if len(matched) < min_match:
+                continue
+            coverage = round(
+                sum(weights.get(skill, 1.0) for skill in matched) / total_weight, 6
+            )
+            ranked.append(RankedResume(coverage, len(matched), resume_id))
+
+        ranked.sort(key=lambda item: item.sort_key)
+        return ranked
+
+    def facets(
+        self, resume_ids: Iterable[ObjectId], size: int, experience_buckets: List[float]
+    ) -> Dict[str, List[Dict]]:
+        """Facet counts over `resume_ids`, shaped like SearchService's $facet output."""
+        skills, locations, experience = Counter(), Counter(), Counter()
+        for resume_id in resume_ids:
+            resume = self._resumes[resume_id]
+            skills.update(resume.skills)
+            if isinstance(resume.location, str):
+                locations[resume.location] += 1
+            if isinstance(resume.total_experience, (int, float)):
+                experience[_bucket(resume.total_experience, experience_buckets)] += 1
+
+        return {
+            "skills": [
+                {"value": value, "count": count}
+                for value, count in skills.most_common(size)
+            ],
+            "location": [
+                {"value": value, "count": count}
+                for value, count in locations.most_common(size)
+            ],
+            "experience": [
+                {"value": value, "count": experience[value]}
+                for value in [*experience_buckets[:-1], f"{experience_buckets[-1]}+"]
+                if experience[value]
+            ],
+        }
+
+
+def _contains(ids: List[ObjectId], resume_id: ObjectId) -> bool:
+    position = bisect_left(ids, resume_id)
+    return position < len(ids) and ids[position] == resume_id
+
+
+def _bucket(value: float, boundaries: List[float]):
+    """
+    Lower bound of the $bucket `value` falls into; the default bucket past the last
+    bound.
+    """
+    if value < boundaries[0] or value >= boundaries[-1]:
+        return f"{boundaries[-1]}+"
+    return boundaries[bisect_right(boundaries, value) - 1]
+
+
+# Create a singleton instance
+skill_index = SkillIndex()
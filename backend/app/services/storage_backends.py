@@ -0,0 +1,529 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Tuple
+from pathlib import Path
+from urllib.parse import quote, unquote
+import asyncio
+import io
+import json
+import logging
+import mmap
+import os
+import uuid
+from ..db.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+# Default size of the chunks files are written and streamed in
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class StoredFile:
+    """
+    A stored file handed to parsers without copying it.
+
+    `buffer` is a read-only memoryview: over the backend's own bytes for the
+    memory backend, over a memory map of the file for local disk (the page
+    cache is the only copy) and over one downloaded buffer otherwise. `path`
+    is set when the file is on local disk. Use as a context manager, or
+    call close(), to release the mapping.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        size: int,
+        content_type: Optional[str] = None,
+        buffer: Optional[memoryview] = None,
+        path: Optional[str] = None,
+    ):
+        self.filename = filename
+        self.size = size
+        self.content_type = content_type
+        self.path = path
+        self._buffer = buffer
+        self._mmap: Optional[mmap.mmap] = None
+
+    @property
+    def buffer(self) -> memoryview:
+        if self._buffer is None:
+            if self.path is None:
+                raise ValueError(f"{self.filename} has neither a buffer nor a path")
+            if self.size == 0:
+                self._buffer = memoryview(b"")
+            else:
+                with open(self.path, "rb") as handle:
+                    self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+                self._buffer = memoryview(self._mmap)
+        return self._buffer
+
+    def reader(self) -> io.BufferedReader:
+        """A binary file object reading from `buffer`, for APIs that want file-likes."""
+        return io.BufferedReader(_BufferRaw(self))
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._buffer.release()
+            self._mmap.close()
+            self._buffer = None
+            self._mmap = None
+
+    def __enter__(self) -> "StoredFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _BufferRaw(io.RawIOBase):
+    """
+    Raw stream over a StoredFile's buffer; reads copy only what the caller asks for.
+    """
+
+    def __init__(self, stored: StoredFile):
+        self._stored = stored
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        buffer = self._stored.buffer
+        count = min(len(target), len(buffer) - self._position)
+        if count <= 0:
+            return 0
+        target[:count] = buffer[self._position : self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {
+            io.SEEK_SET: 0,
+            io.SEEK_CUR: self._position,
+            io.SEEK_END: self._stored.size,
+        }[whence]
+        self._position = max(base + offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded files live. Files are written from and read back as
+    streams of byte chunks, so no backend needs a whole file in memory.
+
+    metadata() returns {"filename", "size", "content_type"}; every read
+    raises FileNotFoundError for an unknown file id.
+    """
+
+    # Whether every worker and node sees the same files
+    shared = True
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    @abstractmethod
+    async def save(
+        self,
+        file_id: str,
+        filename: str,
+        chunks: AsyncIterator[bytes],
+        content_type: Optional[str] = None,
+    ) -> int:
+        """Store the chunks under `file_id`. Returns the number of bytes written."""
+
+    @abstractmethod
+    def open(self, file_id: str) -> AsyncIterator[bytes]:
+        """Stream a stored file in chunks of at most `chunk_size` bytes."""
+
+    @abstractmethod
+    async def metadata(self, file_id: str) -> Dict:
+        pass
+
+    @abstractmethod
+    async def delete(self, file_id: str) -> None:
+        pass
+
+    async def exists(self, file_id: str) -> bool:
+        try:
+            await self.metadata(file_id)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def read(self, file_id: str) -> Tuple[str, bytes]:
+        """
+        The whole file as (filename, content), for consumers that need it in one piece.
+        """
+        metadata = await self.metadata(file_id)
+        content = b"".join([chunk async for chunk in self.open(file_id)])
+        return metadata["filename"], content
+
+    async def open_buffer(self, file_id: str) -> StoredFile:
+        """
+        The whole file as a StoredFile. Remote backends download it once into
+        a buffer preallocated to the file's size.
+        """
+        metadata = await self.metadata(file_id)
+        content = bytearray(metadata["size"])
+        offset = 0
+        async for chunk in self.open(file_id):
+            content[offset : offset + len(chunk)] = chunk
+            offset += len(chunk)
+        del content[offset:]
+        return StoredFile(
+            metadata["filename"],
+            offset,
+            metadata["content_type"],
+            buffer=memoryview(content).toreadonly(),
+        )
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryStorageBackend(StorageBackend):
+    """
+    Files in this process's memory. Only for development and tests with one worker.
+    """
+
+    shared = False
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self._files: Dict[str, Tuple[Dict, bytes]] = {}
+
+    async def save(self, file_id, filename, chunks, content_type=None) -> int:
+        content = b"".join([chunk async for chunk in chunks])
+        self._files[file_id] = (
+            {"filename": filename, "size": len(content), "content_type": content_type},
+            content,
+        )
+        return len(content)
+
+    async def open(self, file_id: str) -> AsyncIterator[bytes]:
+        _, content = self._get(file_id)
+        for start in range(0, len(content), self.chunk_size):
+            yield content[start : start + self.chunk_size]
+
+    async def metadata(self, file_id: str) -> Dict:
+        return dict(self._get(file_id)[0])
+
+    async def read(self, file_id: str) -> Tuple[str, bytes]:
+        metadata, content = self._get(file_id)
+        return metadata["filename"], content
+
+    async def open_buffer(self, file_id: str) -> StoredFile:
+        metadata, content = self._get(file_id)
+        return StoredFile(
+            metadata["filename"],
+            metadata["size"],
+            metadata["content_type"],
+            buffer=memoryview(content),
+        )
+
+    async def delete(self, file_id: str) -> None:
+        self._files.pop(file_id, None)
+
+    def _get(self, file_id: str) -> Tuple[Dict, bytes]:
+        if file_id not in self._files:
+            raise FileNotFoundError(f"File not found: {file_id}")
+        return self._files[file_id]
+
+
+class LocalDiskStorageBackend(StorageBackend):
+    """
+    Files under a local directory, with a JSON metadata sidecar per file.
+
+    Shared by all workers on one host, or across hosts on a shared volume.
+    Writes go to a temporary name and are renamed into place, so readers
+    never see a partial file.
+    """
+
+    def __init__(self, root: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, file_id: str) -> Path:
+        # Ids are generated uuids; reject anything that could escape the root
+        if not file_id or "/" in file_id or "\\" in file_id or file_id.startswith("."):
+            raise FileNotFoundError(f"File not found: {file_id}")
+        return self.root / file_id[:2] / file_id
+
+    def _metadata_path(self, file_id: str) -> Path:
+        return self._path(file_id).with_suffix(".json")
+
+    async def save(self, file_id, filename, chunks, content_type=None) -> int:
+        path = self._path(file_id)
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        size = 0
+        handle = await asyncio.to_thread(open, partial, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(handle.write, chunk)
+                size += len(chunk)
+        except BaseException:
+            handle.close()
+            partial.unlink(missing_ok=True)
+            raise
+        await asyncio.to_thread(handle.close)
+
+        metadata = json.dumps(
+            {"filename": filename, "size": size, "content_type": content_type}
+        )
+        await asyncio.to_thread(self._metadata_path(file_id).write_text, metadata)
+        await asyncio.to_thread(os.replace, partial, path)
+        return size
+
+    async def open(self, file_id: str) -> AsyncIterator[bytes]:
+        path = self._path(file_id)
+        try:
+            handle = await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_id}")
+        try:
+            while True:
+                chunk = await asyncio.to_thread(handle.read, self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            handle.close()
+
+    async def metadata(self, file_id: str) -> Dict:
+        if not await asyncio.to_thread(self._path(file_id).exists):
+            raise FileNotFoundError(f"File not found: {file_id}")
+        try:
+            return json.loads(
+                await asyncio.to_thread(self._metadata_path(file_id).read_text)
+            )
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_id}")
+
+    async def open_buffer(self, file_id: str) -> StoredFile:
+        metadata = await self.metadata(file_id)
+        # Mapped lazily by StoredFile.buffer; callers that can use the path never map it
+        return StoredFile(
+            metadata["filename"],
+            metadata["size"],
+            metadata["content_type"],
+            path=str(self._path(file_id)),
+        )
+
+    async def delete(self, file_id: str) -> None:
+        for path in (self._path(file_id), self._metadata_path(file_id)):
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+
+
+class GridFSStorageBackend(StorageBackend):
+    """Files in MongoDB GridFS, using the application's connection pool."""
+
+    def __init__(
+        self, bucket_name: str = "uploads", chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        super().__init__(chunk_size)
+        self.bucket_name = bucket_name
+        self._bucket = None
+        self._bucket_db = None
+
+    @property
+    def bucket(self):
+        # Created lazily and recreated if the app reconnects
+        if self._bucket is None or self._bucket_db is not db.db:
+            from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+            if db.db is None:
+                raise RuntimeError("MongoDB is not connected")
+            self._bucket = AsyncIOMotorGridFSBucket(
+                db.db,
+                bucket_name=self.bucket_name,
+                chunk_size_bytes=min(self.chunk_size, 255 * 1024),
+            )
+            self._bucket_db = db.db
+        return self._bucket
+
+    async def save(self, file_id, filename, chunks, content_type=None) -> int:
+        # Replace any existing file with this id, as the other backends do
+        await self.delete(file_id)
+        stream = self.bucket.open_upload_stream_with_id(
+            file_id, filename, metadata={"content_type": content_type}
+        )
+        size = 0
+        try:
+            async for chunk in chunks:
+                await stream.write(chunk)
+                size += len(chunk)
+        except BaseException:
+            await stream.abort()
+            raise
+        await stream.close()
+        return size
+
+    async def open(self, file_id: str) -> AsyncIterator[bytes]:
+        from gridfs.errors import NoFile
+
+        try:
+            stream = await self.bucket.open_download_stream(file_id)
+        except NoFile:
+            raise FileNotFoundError(f"File not found: {file_id}")
+        while True:
+            chunk = await stream.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def metadata(self, file_id: str) -> Dict:
+        files = db.db[f"{self.bucket_name}.files"]
+        document = await files.find_one({"_id": file_id})
+        if document is None:
+            raise FileNotFoundError(f"File not found: {file_id}")
+        return {
+            "filename": document["filename"],
+            "size": document["length"],
+            "content_type": (document.get("metadata") or {}).get("content_type"),
+        }
+
+    async def delete(self, file_id: str) -> None:
+        from gridfs.errors import NoFile
+
+        try:
+            await self.bucket.delete(file_id)
+        except NoFile:
+            pass
+
+
+class AzureBlobStorageBackend(StorageBackend):
+    """
+    Files as block blobs in an Azure Storage container.
+
+    Works against the Azurite emulator with the connection string
+    "UseDevelopmentStorage=true". The container is created on first use.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        container: str = "uploads",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        super().__init__(chunk_size)
+        if not connection_string:
+            raise ValueError(
+                "AZURE_STORAGE_CONNECTION_STRING is required for the azure "
+                "storage backend"
+            )
+        self.connection_string = connection_string
+        self.container_name = container
+        self._service = None
+        self._container = None
+
+    async def _get_container(self):
+        if self._container is None:
+            from azure.core.exceptions import ResourceExistsError
+            from azure.storage.blob.aio import BlobServiceClient
+
+            self._service = BlobServiceClient.from_connection_string(
+                self.connection_string,
+                max_single_get_size=self.chunk_size,
+                max_chunk_get_size=self.chunk_size,
+            )
+            container = self._service.get_container_client(self.container_name)
+            try:
+                await container.create_container()
+            except ResourceExistsError:
+                pass
+            self._container = container
+        return self._container
+
+    async def save(self, file_id, filename, chunks, content_type=None) -> int:
+        from azure.storage.blob import ContentSettings
+
+        container = await self._get_container()
+        size = 0
+
+        async def counted():
+            nonlocal size
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+
+        await container.upload_blob(
+            file_id,
+            counted(),
+            overwrite=True,
+            # Blob metadata travels in HTTP headers, which only allow ASCII
+            metadata={"filename": quote(filename or "")},
+            content_settings=ContentSettings(content_type=content_type),
+            max_concurrency=2,
+        )
+        return size
+
+    async def open(self, file_id: str) -> AsyncIterator[bytes]:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        container = await self._get_container()
+        try:
+            downloader = await container.download_blob(file_id)
+        except ResourceNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_id}")
+        async for chunk in downloader.chunks():
+            yield chunk
+
+    async def metadata(self, file_id: str) -> Dict:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        container = await self._get_container()
+        try:
+            properties = await container.get_blob_client(file_id).get_blob_properties()
+        except ResourceNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_id}")
+        return {
+            "filename": unquote(properties.metadata.get("filename", "")),
+            "size": properties.size,
+            "content_type": properties.content_settings.content_type,
+        }
+
+    async def delete(self, file_id: str) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        container = await self._get_container()
+        try:
+            await container.delete_blob(file_id)
+        except ResourceNotFoundError:
+            pass
+
+    async def close(self) -> None:
+        if self._service is not None:
+            await self._service.close()
+            self._service = None
+            self._container = None
+
+
+BACKENDS = ("memory", "local", "gridfs", "azure")
+
+
+def create_backend(settings) -> StorageBackend:
+    """Build the backend selected by STORAGE_BACKEND."""
+    name = settings.STORAGE_BACKEND
+    chunk_size = settings.STORAGE_CHUNK_SIZE
+    if name == "memory":
+        return MemoryStorageBackend(chunk_size)
+    if name == "local":
+        return LocalDiskStorageBackend(settings.STORAGE_LOCAL_PATH, chunk_size)
+    if name == "gridfs":
+        return GridFSStorageBackend(settings.STORAGE_GRIDFS_BUCKET, chunk_size)
+    if name == "azure":
+        return AzureBlobStorageBackend(
+            settings.AZURE_STORAGE_CONNECTION_STRING,
+            settings.AZURE_STORAGE_CONTAINER,
+            chunk_size,
+        )
+    raise ValueError(
+        f"Unknown STORAGE_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}"
+    )
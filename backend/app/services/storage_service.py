@@ -1,15 +1,30 @@
-import os
 import uuid
+import asyncio
+import hashlib
 import logging
+import tempfile
+from datetime import datetime, timedelta
 from fastapi import UploadFile
-from typing import Dict, Tuple
+from typing import AsyncIterator, Dict, Optional, Tuple
 import traceback
+from ..core.config import get_settings
+from .storage_backends import StorageBackend, StoredFile, create_backend
+from .upload_catalog import UploadCatalog, create_catalog
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 class StorageService:
+    """
+    Uploaded files, kept in the backend selected by STORAGE_BACKEND
+    (memory, local, gridfs or azure). All instances share one backend.
+
+    Storage is content-addressed: every upload gets its own file id, but
+    uploads with the same SHA-256 digest share one blob in the backend.
+    The catalog counts each blob's references and collect_garbage()
+    deletes blobs that have gone unreferenced for STORAGE_GC_GRACE_SECONDS.
+    """
     _instance = None
-    _files = {}  # Single storage for all instances
 
     def __new__(cls):
         if cls._instance is None:
@@ -20,64 +35,205 @@ class StorageService:
         # Initialize only once
         if not hasattr(self, 'initialized'):
             self.initialized = True
-            logger.info("Initializing StorageService")
+            self.backend: StorageBackend = create_backend(settings)
+            self.catalog: UploadCatalog = create_catalog(settings)
+            logger.info(
+                f"Initializing StorageService with {type(self.backend).__name__} "
+                f"and {type(self.catalog).__name__}"
+            )
 
-    async def store_file(self, file: UploadFile) -> str:
-        """Store a file in memory and return its ID."""
+    async def store(self, file: UploadFile) -> Dict:
+        """
+        Store an upload and return {file_id, digest, size, deduplicated}.
+
+        The upload is hashed while it is spooled (in memory up to
+        STORAGE_SPOOL_MAX_MEMORY, then on disk); its content is only written
+        to the backend when no blob with the same digest exists yet.
+        """
         try:
             logger.info(f"[1] Starting to store file: {file.filename}, content_type: {file.content_type}")
-            
-            content = await file.read()
-            logger.info(f"[2] Successfully read {len(content)} bytes from file")
-            
-            file_id = str(uuid.uuid4())
-            logger.info(f"[3] Generated file_id: {file_id}")
-            
-            # Store in class variable
-            StorageService._files[file_id] = (file.filename, content)
-            logger.info(f"[4] Stored in memory: {file_id} -> ({file.filename}, {len(content)} bytes)")
-            
-            return file_id
+
+            with self.new_spool() as spool:
+                digest, size = await self._spool_upload(file, spool)
+                logger.info(
+                    f"[2] Hashed {file.filename}: sha256 {digest}, {size} bytes"
+                )
+                return await self.store_spooled(
+                    spool, digest, size, file.filename, file.content_type
+                )
 
         except Exception as e:
             logger.error(f"Error storing file: {str(e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
+    def new_spool(self):
+        """A temporary file for content on its way into storage."""
+        return tempfile.SpooledTemporaryFile(max_size=settings.STORAGE_SPOOL_MAX_MEMORY)
+
+    async def store_spooled(
+        self,
+        spool,
+        digest: str,
+        size: int,
+        filename: str,
+        content_type: Optional[str] = None,
+    ) -> Dict:
+        """
+        Store content that is already spooled and hashed, for callers that
+        assemble it themselves. `digest` is the SHA-256 hex digest of the
+        spool's content, which is read from the start.
+        """
+        blob = await self.catalog.add_reference(digest, size)
+        file_id = str(uuid.uuid4())
+        await self.catalog.add_file(
+            {
+                "_id": file_id,
+                "digest": digest,
+                "filename": filename,
+                "content_type": content_type,
+                "size": size,
+                "created_at": datetime.utcnow(),
+            }
+        )
+        deduplicated = blob["ready"]
+        if not deduplicated:
+            try:
+                await asyncio.to_thread(spool.seek, 0)
+                await self.backend.save(
+                    blob["blob"], digest, self._iter_spool(spool), content_type
+                )
+                await self.catalog.mark_ready(digest)
+            except BaseException:
+                # Releases the reference; the blob is collected if nothing else holds it
+                await self.catalog.remove_file(file_id)
+                raise
+
+        logger.info(
+            f"Stored: {file_id} -> ({filename}, {digest}, deduplicated={deduplicated})"
+        )
+        return {
+            "file_id": file_id,
+            "digest": digest,
+            "size": size,
+            "deduplicated": deduplicated,
+        }
+
+    async def store_file(self, file: UploadFile) -> str:
+        """Store an uploaded file and return its ID."""
+        return (await self.store(file))["file_id"]
+
+    async def _spool_upload(self, file: UploadFile, spool) -> Tuple[str, int]:
+        digest = hashlib.sha256()
+        size = 0
+        async for chunk in self._iter_upload(file):
+            digest.update(chunk)
+            size += len(chunk)
+            await asyncio.to_thread(spool.write, chunk)
+        return digest.hexdigest(), size
+
+    async def _iter_spool(self, spool) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await asyncio.to_thread(spool.read, self.backend.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def _iter_upload(self, file: UploadFile) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await file.read(self.backend.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def _resolve(self, file_id: str) -> Tuple[str, Dict]:
+        """
+        The backend key of a file and its metadata (filename, size, content_type,
+        digest).
+        """
+        record = await self.catalog.get_file(file_id)
+        if record is None:
+            # Files stored before deduplication live in the backend under their own id
+            metadata = await self.backend.metadata(file_id)
+            return file_id, {**metadata, "digest": None}
+        return record["blob"], {
+            "filename": record["filename"],
+            "size": record["size"],
+            "content_type": record["content_type"],
+            "digest": record["digest"],
+        }
+
     async def get_file(self, file_id: str) -> Tuple[str, bytes]:
-        """Get file from storage"""
+        """Get a whole file from storage as (filename, content)."""
         try:
             logger.info(f"[1] Attempting to get file: {file_id}")
-            
-            # Log available files for debugging
-            logger.info(f"Available files: {list(StorageService._files.keys())}")
-            
-            if file_id not in StorageService._files:
-                logger.error(f"[2] File not found: {file_id}")
-                raise FileNotFoundError(f"File not found: {file_id}")
-                
-            return StorageService._files[file_id]
-            
+            key, metadata = await self._resolve(file_id)
+            _, content = await self.backend.read(key)
+            return metadata["filename"], content
+
+        except FileNotFoundError:
+            logger.error(f"[2] File not found: {file_id}")
+            raise
         except Exception as e:
             logger.error(f"Error retrieving file: {str(e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
+    async def open_file(self, file_id: str) -> StoredFile:
+        """
+        Get a file as a StoredFile (memoryview and, on local disk, a path)
+        without copying it into new bytes. Close it when done.
+        """
+        logger.info(f"Opening file: {file_id}")
+        key, metadata = await self._resolve(file_id)
+        stored = await self.backend.open_buffer(key)
+        stored.filename = metadata["filename"]
+        stored.content_type = metadata["content_type"]
+        return stored
+
+    async def get_metadata(self, file_id: str) -> Dict:
+        """Filename, size, content type and digest of a stored file."""
+        _, metadata = await self._resolve(file_id)
+        return metadata
+
+    async def exists(self, file_id: str) -> bool:
+        try:
+            await self._resolve(file_id)
+            return True
+        except FileNotFoundError:
+            return False
+
     async def cleanup_file(self, file_id: str) -> None:
-        """Remove file from storage"""
+        """
+        Remove a file. Its blob stays while other files reference it and is
+        deleted by collect_garbage() once unreferenced.
+        """
         try:
-            if file_id in StorageService._files:
-                del StorageService._files[file_id]
-                logger.info(f"File cleaned up: {file_id}")
+            if not await self.catalog.remove_file(file_id):
+                await self.backend.delete(file_id)
+            logger.info(f"File cleaned up: {file_id}")
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
             raise
 
-    async def cleanup_all(self) -> None:
-        """Clear all files from storage"""
-        try:
-            StorageService._files.clear()
-            logger.info("Cleared all files from memory")
-        except Exception as e:
-            logger.error(f"Error during cleanup: {str(e)}")
-            raise
\ No newline at end of file
+    async def collect_garbage(self) -> int:
+        """
+        Delete blobs unreferenced for longer than the grace period; returns how many.
+        """
+        older_than = datetime.utcnow() - timedelta(
+            seconds=settings.STORAGE_GC_GRACE_SECONDS
+        )
+        keys = await self.catalog.claim_unreferenced(older_than)
+        for key in keys:
+            try:
+                await self.backend.delete(key)
+            except Exception as e:
+                # The record is already gone, so the blob is orphaned rather
+                # than reachable
+                logger.error(f"Failed to delete unreferenced blob {key}: {str(e)}")
+        if keys:
+            logger.info(f"Collected {len(keys)} unreferenced upload blob(s)")
+        return len(keys)
+
+    async def close(self) -> None:
+        await self.backend.close()
@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from datetime import datetime
+import logging
+import uuid
+from pymongo import ReturnDocument
+from ..db.mongodb import (
+    get_collection,
+    UPLOAD_FILES_COLLECTION,
+    UPLOAD_BLOBS_COLLECTION,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UploadCatalog(ABC):
+    """
+    Maps upload file ids to content-addressed blobs and counts references.
+
+    Each distinct content digest has one blob record: {_id: digest, blob,
+    refs, ready, zero_since}. `blob` is the storage key, generated when the
+    record is created, so a blob that is being garbage-collected never
+    shares its key with a re-upload of the same content. Blobs are deleted
+    only by the garbage-collection sweep, once they have had no references
+    for a grace period; claim_unreferenced() removes the record before the
+    blob itself is deleted, which makes the record deletion the commit point.
+    """
+
+    @abstractmethod
+    async def add_reference(self, digest: str, size: int) -> Dict:
+        """Count one more reference to `digest`; returns the blob record."""
+
+    @abstractmethod
+    async def mark_ready(self, digest: str) -> None:
+        """Record that the blob's content has been written."""
+
+    @abstractmethod
+    async def add_file(self, file: Dict) -> None:
+        """Store a file record: _id, digest, filename, content_type, size."""
+
+    @abstractmethod
+    async def get_file(self, file_id: str) -> Optional[Dict]:
+        """The file record joined with its blob's storage key (`blob`), or None."""
+
+    @abstractmethod
+    async def remove_file(self, file_id: str) -> bool:
+        """Delete a file record and release its reference. Returns False if unknown."""
+
+    @abstractmethod
+    async def claim_unreferenced(self, older_than: datetime) -> List[str]:
+        """
+        Remove blob records unreferenced since before `older_than`; returns their
+        storage keys.
+        """
+
+    @staticmethod
+    def _new_blob(digest: str, size: int) -> Dict:
+        return {
+            "_id": digest,
+            "blob": uuid.uuid4().hex,
+            "size": size,
+            "refs": 0,
+            "ready": False,
+            "zero_since": None,
+        }
+
+
+class MemoryUploadCatalog(UploadCatalog):
+    """Catalog in process memory; pairs with the memory storage backend."""
+
+    def __init__(self):
+        self._files: Dict[str, Dict] = {}
+        self._blobs: Dict[str, Dict] = {}
+
+    async def add_reference(self, digest: str, size: int) -> Dict:
+        blob = self._blobs.setdefault(digest, self._new_blob(digest, size))
+        blob["refs"] += 1
+        blob["zero_since"] = None
+        return dict(blob)
+
+    async def mark_ready(self, digest: str) -> None:
+        if digest in self._blobs:
+            self._blobs[digest]["ready"] = True
+
+    async def add_file(self, file: Dict) -> None:
+        self._files[file["_id"]] = dict(file)
+
+    async def get_file(self, file_id: str) -> Optional[Dict]:
+        file = self._files.get(file_id)
+        blob = self._blobs.get(file["digest"]) if file else None
+        if blob is None or not blob["ready"]:
+            return None
+        return {**file, "blob": blob["blob"]}
+
+    async def remove_file(self, file_id: str) -> bool:
+        file = self._files.pop(file_id, None)
+        if file is None:
+            return False
+        blob = self._blobs.get(file["digest"])
+        if blob is not None:
+            blob["refs"] -= 1
+            if blob["refs"] <= 0:
+                blob["zero_since"] = datetime.utcnow()
+        return True
+
+    async def claim_unreferenced(self, older_than: datetime) -> List[str]:
+        claimed = [
+            digest
+            for digest, blob in self._blobs.items()
+            if blob["refs"] <= 0
+            and blob["zero_since"] is not None
+            and blob["zero_since"] <= older_than
+        ]
+        return [self._blobs.pop(digest)["blob"] for digest in claimed]
+
+
+class MongoUploadCatalog(UploadCatalog):
+    """
+    Catalog in MongoDB, shared by every worker and node; updates are single-document
+    atomic.
+    """
+
+    @property
+    def files(self):
+        return get_collection(UPLOAD_FILES_COLLECTION)
+
+    @property
+    def blobs(self):
+        return get_collection(UPLOAD_BLOBS_COLLECTION)
+
+    async def add_reference(self, digest: str, size: int) -> Dict:
+        new = self._new_blob(digest, size)
+        return await self.blobs.find_one_and_update(
+            {"_id": digest},
+            {
+                "$inc": {"refs": 1},
+                "$set": {"zero_since": None},
+                "$setOnInsert": {"blob": new["blob"], "size": size, "ready": False},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def mark_ready(self, digest: str) -> None:
+        await self.blobs.update_one({"_id": digest}, {"$set": {"ready": True}})
+
+    async def add_file(self, file: Dict) -> None:
+        await self.files.insert_one(file)
+
+    async def get_file(self, file_id: str) -> Optional[Dict]:
+        file = await self.files.find_one({"_id": file_id})
+        if file is None:
+            return None
+        blob = await self.blobs.find_one(
+            {"_id": file["digest"], "ready": True}, {"blob": 1}
+        )
+        if blob is None:
+            return None
+        return {**file, "blob": blob["blob"]}
+
+    async def remove_file(self, file_id: str) -> bool:
+        file = await self.files.find_one_and_delete({"_id": file_id})
+        if file is None:
+            return False
+        blob = await self.blobs.find_one_and_update(
+            {"_id": file["digest"]},
+            {"$inc": {"refs": -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if blob is not None and blob["refs"] <= 0:
+            await self.blobs.update_one(
+                {"_id": file["digest"], "refs": {"$lte": 0}},
+                {"$set": {"zero_since": datetime.utcnow()}},
+            )
+        return True
+
+    async def claim_unreferenced(self, older_than: datetime) -> List[str]:
+        claimed = []
+        cursor = self.blobs.find(
+            {"refs": {"$lte": 0}, "zero_since": {"$ne": None, "$lte": older_than}}
+        )
+        async for blob in cursor:
+            # Only the worker whose delete succeeds owns the blob; a concurrent
+            # upload that re-referenced it in the meantime makes the delete miss
+            result = await self.blobs.delete_one(
+                {"_id": blob["_id"], "refs": {"$lte": 0}, "blob": blob["blob"]}
+            )
+            if result.deleted_count:
+                claimed.append(blob["blob"])
+        return claimed
+
+
+def create_catalog(settings) -> UploadCatalog:
+    name = settings.STORAGE_CATALOG or (
+        "memory" if settings.STORAGE_BACKEND == "memory" else "mongo"
+    )
+    if name == "memory":
+        return MemoryUploadCatalog()
+    if name == "mongo":
+        return MongoUploadCatalog()
+    raise ValueError(f"Unknown STORAGE_CATALOG {name!r}; expected memory or mongo")
@@ -0,0 +1,174 @@
+"""
+Skill taxonomy used to canonicalize free-text skills.
+
+Each entry maps the display name of a canonical skill to its synonyms. The
+canonical key stored in MongoDB is the normalized display name (see
+app.utils.skills.canonicalize_skill). Synonyms listed in CASE_SENSITIVE_SYNONYMS
+are ordinary words in lower case ("go", "r", "c") and are only matched in
+running text when the casing is exact. Synonyms in TEXT_AMBIGUOUS_SYNONYMS
+are canonicalized in skill lists but never matched in running text.
+"""
+
+SKILL_TAXONOMY = {
+    # Programming languages
+    "Python": ["Python3", "Python 3", "Py"],
+    "JavaScript": ["JS", "Javascript", "ECMAScript", "ES6", "ES2015", "Vanilla JS"],
+    "TypeScript": ["TS", "Typescript"],
+    "Java": ["Java SE", "Java EE", "J2EE", "Core Java"],
+    "Kotlin": [],
+    "Scala": [],
+    "C": [],
+    "C++": ["CPP", "C plus plus"],
+    "C#": ["CSharp", "C Sharp"],
+    "Go": ["Golang"],
+    "Rust": [],
+    "Ruby": [],
+    "PHP": [],
+    "Swift": [],
+    "Objective-C": ["ObjC", "Objective C"],
+    "R": ["R programming", "RStudio"],
+    "MATLAB": ["Matlab"],
+    "SQL": ["Structured Query Language"],
+    "Bash": ["Shell scripting", "Shell", "Bash scripting"],
+    # Web frameworks and front end
+    "React": ["React.js", "ReactJS", "React JS"],
+    "Angular": ["Angular.js", "AngularJS", "Angular 2+"],
+    "Vue.js": ["Vue", "VueJS", "Vue JS"],
+    "Next.js": ["NextJS", "Next JS"],
+    "Node.js": ["Node", "NodeJS", "Node JS"],
+    "Express.js": ["Express", "ExpressJS"],
+    "HTML": ["HTML5"],
+    "CSS": ["CSS3"],
+    "Tailwind CSS": ["Tailwind", "TailwindCSS"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": ["Fast API"],
+    "Spring Boot": ["Spring", "SpringBoot", "Spring Framework"],
+    "Ruby on Rails": ["Rails", "RoR"],
+    ".NET": ["dotnet", "ASP.NET", ".NET Core", "dot net"],
+    "GraphQL": [],
+    "REST APIs": ["REST", "RESTful", "REST API", "RESTful APIs"],
+    # Data and machine learning
+    "Machine Learning": ["ML"],
+    "Deep Learning": ["DL"],
+    "Natural Language Processing": ["NLP"],
+    "Computer Vision": ["CV"],
+    "Data Analysis": ["Data Analytics"],
+    "Data Engineering": [],
+    "Data Visualization": ["Data Viz"],
+    "Statistics": ["Statistical Analysis"],
+    "pandas": ["Pandas"],
+    "NumPy": ["Numpy"],
+    "scikit-learn": ["sklearn", "Scikit Learn", "scikit learn"],
+    "TensorFlow": ["Tensorflow", "TF"],
+    "PyTorch": ["Pytorch", "Torch"],
+    "Keras": [],
+    "spaCy": ["Spacy"],
+    "Apache Spark": ["Spark", "PySpark"],
+    "Apache Kafka": ["Kafka"],
+    "Apache Airflow": ["Airflow"],
+    "Hadoop": ["Apache Hadoop", "HDFS"],
+    "dbt": ["data build tool"],
+    "ETL": ["ELT", "ETL pipelines"],
+    "Large Language Models": ["LLM", "LLMs"],
+    "Tableau": [],
+    "Power BI": ["PowerBI"],
+    "Excel": ["Microsoft Excel", "MS Excel"],
+    # Databases
+    "PostgreSQL": ["Postgres", "Postgresql"],
+    "MySQL": ["Mysql"],
+    "MongoDB": ["Mongo", "Mongodb"],
+    "Redis": [],
+    "Elasticsearch": ["Elastic Search", "ElasticSearch", "ELK"],
+    "Snowflake": [],
+    "BigQuery": ["Big Query", "Google BigQuery"],
+    "Oracle Database": ["Oracle DB", "Oracle"],
+    "Microsoft SQL Server": ["SQL Server", "MSSQL", "MS SQL"],
+    "DynamoDB": ["Dynamo DB"],
+    # Cloud and DevOps
+    "Amazon Web Services": ["AWS"],
+    "Microsoft Azure": ["Azure"],
+    "Google Cloud Platform": ["GCP", "Google Cloud"],
+    "Docker": ["Containerization"],
+    "Kubernetes": ["K8s", "k8s"],
+    "Terraform": [],
+    "Ansible": [],
+    "CI/CD": [
+        "CICD",
+        "Continuous Integration",
+        "Continuous Delivery",
+        "Continuous Deployment",
+    ],
+    "Jenkins": [],
+    "GitHub Actions": [],
+    "Git": ["Version Control"],
+    "GitHub": [],
+    "GitLab": [],
+    "Linux": ["Unix"],
+    "Microservices": ["Microservice Architecture", "Micro services"],
+    # Practices and soft skills
+    "Agile": ["Agile Methodologies", "Agile Methodology"],
+    "Scrum": [],
+    "Project Management": ["PM"],
+    "Product Management": [],
+    "Leadership": ["Team Leadership", "People Management"],
+    "Communication": ["Communication Skills"],
+    "Stakeholder Management": [],
+    "UX Design": ["UX", "User Experience"],
+    "UI Design": ["UI", "User Interface Design"],
+    "Figma": [],
+}
+
+# Synonyms and canonical names that are also common words or single letters
+CASE_SENSITIVE_SYNONYMS = {
+    "C",
+    "R",
+    "Go",
+    "Rust",
+    "Swift",
+    "Spark",
+    "Shell",
+    "Node",
+    "Express",
+    "Spring",
+    "Rails",
+    "Torch",
+    "Oracle",
+    "UI",
+    "UX",
+    "PM",
+    "ML",
+    "DL",
+    "CV",
+    "TF",
+    "TS",
+    "Py",
+    "Git",
+    "Excel",
+    "Communication",
+    "Leadership",
+    "Statistics",
+    "Agile",
+}
+
+# Names that are a skill in a skill list ("Spring", "Node", "Go") but are
+# usually something else in prose: a résumé ("CV"), a company ("Shell",
+# "Oracle", "American Express"), a season, a time ("PM") or an everyday
+# word, capitalized at the start of a sentence ("React to", "Go to market",
+# "Swift delivery", "Rust belt"). The skill extractor only matches the
+# longer forms ("Oracle DB", "shell scripting", "Golang", "ReactJS")
+TEXT_AMBIGUOUS_SYNONYMS = {
+    "CV",
+    "Shell",
+    "Oracle",
+    "PM",
+    "Node",
+    "Spring",
+    "UI",
+    "UX",
+    "Express",
+    "React",
+    "Go",
+    "Rust",
+    "Swift",
+}
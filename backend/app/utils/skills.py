@@ -0,0 +1,59 @@
+from typing import Dict, Iterable, List
+import re
+from .skill_taxonomy import SKILL_TAXONOMY
+
+_WHITESPACE = re.compile(r"\s+")
+# Parenthesized qualifiers and trailing versions, as in "JavaScript (ES6)" or
+# "Python 3.11"
+_QUALIFIERS = re.compile(r"\([^)]*\)|\s+v?\d+(\.\d+)*\+?$")
+
+
+def normalize_skill(skill: str) -> str:
+    """Normalize a free-text skill name for exact matching."""
+    return _WHITESPACE.sub(" ", skill).strip().lower()
+
+
+def _build_synonym_index() -> Dict[str, str]:
+    index = {}
+    for skill_name, synonyms in SKILL_TAXONOMY.items():
+        canonical = normalize_skill(skill_name)
+        for name in [skill_name, *synonyms]:
+            index.setdefault(normalize_skill(name), canonical)
+    return index
+
+
+# normalized synonym -> canonical key
+SYNONYM_INDEX = _build_synonym_index()
+# canonical key -> display name
+DISPLAY_NAMES = {normalize_skill(name): name for name in SKILL_TAXONOMY}
+
+
+def canonicalize_skill(skill: str) -> str:
+    """
+    Map a free-text skill onto its canonical key.
+
+    "JS", "Javascript" and "JavaScript (ES6)" all become "javascript". Skills
+    missing from the taxonomy fall back to their normalized form.
+    """
+    normalized = normalize_skill(skill)
+    if normalized in SYNONYM_INDEX:
+        return SYNONYM_INDEX[normalized]
+    stripped = normalize_skill(_QUALIFIERS.sub(" ", normalized))
+    return SYNONYM_INDEX.get(stripped, normalized)
+
+
+def canonicalize_skills(skills: Iterable[str]) -> List[str]:
+    """
+    Canonicalize a list of skills, dropping blanks and duplicates but keeping order.
+    """
+    canonical = []
+    for skill in skills:
+        value = canonicalize_skill(skill) if isinstance(skill, str) else ""
+        if value and value not in canonical:
+            canonical.append(value)
+    return canonical
+
+
+def display_name(canonical: str) -> str:
+    """Human-readable name for a canonical skill key."""
+    return DISPLAY_NAMES.get(canonical, canonical)
@@ -0,0 +1,44 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1.endpoints import analysis
+
+
+class FakeFile:
+    def __init__(self, filename):
+        self.filename = filename
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+
+class FakeStorage:
+    def __init__(self):
+        self.opened = []
+
+    async def exists(self, file_id):
+        return True
+
+    async def open_file(self, file_id):
+        if file_id == "gone":
+            raise FileNotFoundError(f"File not found: {file_id}")
+        self.opened.append(FakeFile(f"{file_id}.pdf"))
+        return self.opened[-1]
+
+
+def test_first_file_is_closed_when_the_second_cannot_be_opened(monkeypatch):
+    storage = FakeStorage()
+    monkeypatch.setattr(analysis, "storage_service", storage)
+    monkeypatch.setattr(analysis, "ParserService", lambda: None)
+    app = FastAPI()
+    app.include_router(analysis.router)
+
+    response = TestClient(app).post(
+        "/", json={"resume_id": "cv", "job_description_id": "gone"}
+    )
+
+    assert response.status_code == 404
+    assert [file.closed for file in storage.opened] == [True]
@@ -0,0 +1,44 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1.endpoints import analytics as endpoint
+from app.db.mongodb import ANALYTICS_COLLECTION, INDEXES
+from app.services.analytics import ACTIVITY_SORT
+
+USER_ID = "5f43a1b2c3d4e5f6a7b8c9d0"
+
+
+def test_activity_sort_is_backed_by_an_index():
+    # An equality on user_id followed by the sort keys lets MongoDB skip the
+    # in-memory sort
+    keys = [
+        list(index.document["key"].items()) for index in INDEXES[ANALYTICS_COLLECTION]
+    ]
+    assert [("user_id", 1), *ACTIVITY_SORT] in keys
+
+
+def test_export_is_capped_by_default(monkeypatch):
+    calls = []
+
+    async def iter_user_activity(
+        user_id, start_date, end_date, max_events=None, batch_size=None
+    ):
+        calls.append(max_events)
+        yield {"_id": "e1", "event_type": "search", "event_data": {"query": "python"}}
+
+    monkeypatch.setattr(
+        endpoint.analytics_service, "iter_user_activity", iter_user_activity
+    )
+    app = FastAPI()
+    app.include_router(endpoint.router)
+    client = TestClient(app)
+
+    response = client.get(f"/users/{USER_ID}/activity/export")
+    assert response.status_code == 200
+    assert calls == [endpoint.settings.ANALYTICS_EXPORT_MAX_EVENTS]
+    too_many = endpoint.settings.ANALYTICS_EXPORT_MAX_EVENTS + 1
+    assert (
+        client.get(
+            f"/users/{USER_ID}/activity/export?max_events={too_many}"
+        ).status_code
+        == 422
+    )
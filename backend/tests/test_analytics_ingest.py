@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from app.api.v1.endpoints import analytics as endpoint
+from app.services import analytics
+from app.services.sketches import SpaceSaving
+
+USER_ID = "5f43a1b2c3d4e5f6a7b8c9d0"
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+
+    async def insert_one(self, document):
+        self.inserted.append(document)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(
+        analytics.AnalyticsService, "collection", property(lambda self: collection)
+    )
+    monkeypatch.setattr(analytics.settings, "ANALYTICS_SKETCHES_ENABLED", True)
+    monkeypatch.setattr(
+        analytics,
+        "skill_trends",
+        analytics.DailySketches(
+            "skill_trends",
+            factory=lambda: SpaceSaving(10),
+            load=SpaceSaving.from_document,
+        ),
+    )
+    return collection
+
+
+def test_bulk_events_with_utc_offsets_are_stored_as_naive_utc(collection):
+    app = FastAPI()
+    app.include_router(endpoint.router)
+    now = datetime.utcnow().replace(microsecond=0)
+    lines = [
+        {
+            "user_id": USER_ID,
+            "event_type": "search",
+            "event_data": {"skills": ["python"]},
+            "timestamp": now.isoformat() + "Z",
+        },
+        {
+            "user_id": USER_ID,
+            "event_type": "search",
+            "event_data": {"skills": ["python"]},
+            "timestamp": (now - timedelta(hours=1)).isoformat(),
+        },
+        # A client clock far behind or ahead is clamped to the accepted window
+        {
+            "user_id": USER_ID,
+            "event_type": "profile_view",
+            "timestamp": "2001-01-01T00:00:00+02:00",
+        },
+        {
+            "user_id": USER_ID,
+            "event_type": "profile_view",
+            "timestamp": (now + timedelta(days=3)).isoformat(),
+        },
+    ]
+
+    response = TestClient(app).post(
+        "/events/bulk", content="\n".join(json.dumps(line) for line in lines)
+    )
+
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 4
+    timestamps = [event["timestamp"] for event in collection.inserted]
+    assert all(timestamp.tzinfo is None for timestamp in timestamps)
+    assert timestamps[0] == now
+    assert timestamps[2] >= now - timedelta(
+        hours=endpoint.settings.ANALYTICS_CLIENT_TIMESTAMP_MAX_AGE_HOURS
+    )
+    assert timestamps[3] <= datetime.utcnow() + endpoint.MAX_CLIENT_CLOCK_SKEW
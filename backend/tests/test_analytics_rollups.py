@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+import pytest
+from app.services import analytics_rollups as rollups
+from app.services.analytics_rollups import (
+    AnalyticsRollups,
+    ceil_hour,
+    floor_hour,
+    split_window,
+)
+
+
+class FakeState:
+    def __init__(self, document=None):
+        self.document = document
+
+    async def find_one(self, query):
+        return self.document
+
+    async def update_one(self, query, update, upsert=False):
+        self.document = {**(self.document or {}), **update["$set"]}
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    calls = {"rolled": [], "daily": []}
+    state = FakeState()
+    monkeypatch.setattr(AnalyticsRollups, "state", property(lambda self: state))
+
+    async def roll(self, start, end):
+        calls["rolled"].append((start, end))
+
+    async def refresh_daily(self, start_day, end_day):
+        calls["daily"].append((start_day, end_day))
+
+    monkeypatch.setattr(AnalyticsRollups, "_roll", roll)
+    monkeypatch.setattr(AnalyticsRollups, "_refresh_daily", refresh_daily)
+    return calls, state
+
+
+def test_split_window_reads_rolled_hours_and_raw_edges():
+    start = datetime(2024, 5, 1, 9, 30)
+    watermark = datetime(2024, 5, 1, 14)
+
+    raw, rolled = split_window(start, watermark, ceil_hour, floor_hour)
+
+    assert rolled == (datetime(2024, 5, 1, 10), watermark)
+    assert raw == [(start, datetime(2024, 5, 1, 10)), (watermark, None)]
+    assert split_window(start, None, ceil_hour, floor_hour) == ([(start, None)], None)
+
+
+@pytest.mark.asyncio
+async def test_hours_with_late_events_are_rolled_up_again(runs, monkeypatch):
+    calls, state = runs
+    now = datetime.utcnow()
+    watermark = floor_hour(now) - timedelta(hours=1)
+    received_through = now - timedelta(minutes=30)
+    state.document = {"watermark": watermark, "received_through": received_through}
+    late_hour = watermark - timedelta(hours=5)
+
+    async def late_hours(self, before, received_from, received_to):
+        assert (before, received_from) == (watermark, received_through)
+        return [late_hour]
+
+    monkeypatch.setattr(AnalyticsRollups, "_late_hours", late_hours)
+    monkeypatch.setattr(rollups.settings, "ANALYTICS_ROLLUP_LAG_SECONDS", 0)
+
+    new_watermark = await AnalyticsRollups().run()
+
+    assert calls["rolled"] == [
+        (late_hour, late_hour + timedelta(hours=1)),
+        (watermark, floor_hour(now)),
+    ]
+    assert calls["daily"][0] == (
+        late_hour.replace(hour=0),
+        late_hour.replace(hour=0) + timedelta(days=1),
+    )
+    assert new_watermark == state.document["watermark"] == floor_hour(now)
+    assert state.document["received_through"] > received_through
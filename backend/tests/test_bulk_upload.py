@@ -0,0 +1,136 @@
+import io
+import tarfile
+import zipfile
+import pytest
+from fastapi import UploadFile
+from app.services.bulk_upload import BulkUploadService
+from app.services.storage_backends import MemoryStorageBackend
+from app.services.storage_service import StorageService
+from app.services.upload_catalog import MemoryUploadCatalog
+
+
+@pytest.fixture
+def service(monkeypatch):
+    storage = StorageService()
+    monkeypatch.setattr(storage, "backend", MemoryStorageBackend())
+    monkeypatch.setattr(storage, "catalog", MemoryUploadCatalog())
+    bulk = BulkUploadService(storage)
+    bulk.concurrency = 2
+    return bulk
+
+
+def zip_upload(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return UploadFile(file=buffer, filename="export.zip")
+
+
+def tar_upload(entries):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in entries.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return UploadFile(file=buffer, filename="export.tar.gz")
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_stores_files_and_archive_entries(service):
+    manifest = await service.upload(
+        [
+            UploadFile(file=io.BytesIO(b"resume a"), filename="a.pdf"),
+            zip_upload(
+                {
+                    "cvs/b.docx": b"resume b",
+                    "cvs/notes.xlsx": b"x",
+                    "__MACOSX/cvs/._b.docx": b"x",
+                }
+            ),
+            tar_upload({"c.pdf": b"resume c", "cvs/a-again.pdf": b"resume a"}),
+        ]
+    )
+
+    assert [(f["filename"], f["source"]) for f in manifest["files"]] == [
+        ("a.pdf", None),
+        ("cvs/b.docx", "export.zip"),
+        ("c.pdf", "export.tar.gz"),
+        ("cvs/a-again.pdf", "export.tar.gz"),
+    ]
+    assert manifest["files"][3]["digest"] == manifest["files"][0]["digest"]
+    assert manifest["files"][3]["deduplicated"]
+    assert {s["reason"] for s in manifest["skipped"]} == {
+        "unsupported file type",
+        "hidden file",
+    }
+    assert manifest["failed"] == []
+    assert await service.storage.get_file(manifest["files"][1]["file_id"]) == (
+        "b.docx",
+        b"resume b",
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_limits(service):
+    service.max_files = 1
+    service.max_file_size = 4
+    manifest = await service.upload(
+        [
+            zip_upload({"big.pdf": b"too large", "ok.pdf": b"ok"}),
+            UploadFile(file=io.BytesIO(b"ok"), filename="late.pdf"),
+            UploadFile(file=io.BytesIO(b"not a zip"), filename="broken.zip"),
+        ]
+    )
+
+    assert [f["filename"] for f in manifest["files"]] == ["ok.pdf"]
+    assert [f["filename"] for f in manifest["skipped"]] == ["late.pdf"]
+    assert [f["filename"] for f in manifest["failed"]] == ["big.pdf", "broken.zip"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_caps_reported_skips(service):
+    service.max_reported_skipped = 2
+    manifest = await service.upload(
+        [zip_upload({f"notes-{i}.xlsx": b"x" for i in range(5)})]
+    )
+
+    assert len(manifest["skipped"]) == 2
+    assert manifest["skipped_count"] == 5
+
+
+class FakeResumeStore:
+    def __init__(self):
+        self.failed = {}
+
+    async def mark_failed(self, file_id, filename, error):
+        self.failed[file_id] = (filename, error)
+
+
+@pytest.mark.asyncio
+async def test_parse_resumes_marks_files_failed_without_parser(service, monkeypatch):
+    from app.services import parser_service, resume_store
+
+    def no_parser():
+        raise ValueError("LLAMA_PARSE_API_KEY is not set")
+
+    store = FakeResumeStore()
+    monkeypatch.setattr(parser_service, "ParserService", no_parser)
+    monkeypatch.setattr(resume_store, "resume_store", store)
+
+    await service.parse_resumes(
+        [
+            {"file_id": "1", "filename": "cvs/a.pdf", "digest": "d1"},
+            {"file_id": "2", "filename": "a-again.pdf", "digest": "d1"},
+            {"file_id": "3", "filename": "b.pdf", "digest": "d2"},
+        ]
+    )
+
+    assert store.failed == {
+        "1": ("a.pdf", "LLAMA_PARSE_API_KEY is not set"),
+        "2": ("a-again.pdf", "LLAMA_PARSE_API_KEY is not set"),
+        "3": ("b.pdf", "LLAMA_PARSE_API_KEY is not set"),
+    }
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from pymongo.errors import BulkWriteError
+from app.services import event_buffer as event_buffer_module
+from app.services.event_buffer import EventBuffer
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+        self.batches = []
+        self.fail_next = 0
+
+    async def insert_many(self, batch, ordered=True):
+        self.batches.append(list(batch))
+        if self.fail_next:
+            self.fail_next -= 1
+            raise ConnectionError("server selection timed out")
+        inserted, errors = 0, []
+        for index, document in enumerate(batch):
+            if document.get("invalid"):
+                errors.append(
+                    {
+                        "index": index,
+                        "code": 121,
+                        "errmsg": "Document failed validation",
+                    }
+                )
+            elif document["_id"] in self.documents:
+                errors.append(
+                    {
+                        "index": index,
+                        "code": 11000,
+                        "errmsg": "E11000 duplicate key error",
+                    }
+                )
+            else:
+                self.documents[document["_id"]] = document
+                inserted += 1
+        if errors:
+            raise BulkWriteError(
+                {"nInserted": inserted, "writeErrors": errors, "writeConcernErrors": []}
+            )
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(event_buffer_module, "get_collection", lambda name: collection)
+    return collection
+
+
+async def started(**options):
+    buffer = EventBuffer("analytics", **options)
+    await buffer.start()
+    return buffer
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_a_batch_is_full(collection):
+    buffer = await started(max_batch_size=3, flush_interval=60)
+    for i in range(7):
+        await buffer.put({"_id": i})
+    await asyncio.sleep(0.05)
+
+    assert [len(batch) for batch in collection.batches] == [3, 3]
+    assert len(buffer) == 1
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_the_interval(collection):
+    buffer = await started(max_batch_size=100, flush_interval=0.05)
+    await buffer.put({"_id": 1})
+    assert collection.batches == []
+    await asyncio.sleep(0.15)
+
+    assert list(collection.documents) == [1]
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_the_buffer(collection):
+    buffer = await started(max_batch_size=2, flush_interval=0.1)
+    # The first write fails and is requeued; stop() still writes everything
+    collection.fail_next = 1
+    await buffer.put({"_id": 1})
+    await buffer.put({"_id": 2})
+    await asyncio.sleep(0.05)
+    await buffer.put({"_id": 3})
+    await buffer.stop()
+
+    assert sorted(collection.documents) == [1, 2, 3]
+    assert buffer.stats["failed_flushes"] == 1
+    assert not buffer.running and len(buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_counted_and_other_write_errors_logged(collection, caplog):
+    collection.documents[1] = {"_id": 1}
+    buffer = await started(max_batch_size=10, flush_interval=60)
+    for event in ({"_id": 1}, {"_id": 2}, {"_id": 3, "invalid": True}):
+        await buffer.put(event)
+    await buffer.stop()
+
+    assert buffer.stats["written"] == 1
+    assert buffer.stats["duplicates"] == 1
+    assert buffer.stats["dropped"] == 1
+    errors = [
+        record.getMessage() for record in caplog.records if record.levelname == "ERROR"
+    ]
+    assert len(errors) == 1 and "Document failed validation" in errors[0]
@@ -0,0 +1,61 @@
+import pytest
+from app.services.fit_model import (
+    FEATURE_NAMES,
+    feature_vector,
+    fit_inputs,
+    mentioned_years,
+    predict,
+    train,
+)
+
+
+RESUME = {
+    "markdown_content": "Data engineer, 6 years of Python, Spark and AWS.",
+    "original_text": "Built Airflow pipelines.",
+    "structured_data": {},
+}
+JOB = {
+    "markdown_content": (
+        "Senior Data Engineer. Requires 5+ years with Python, Spark, Kafka and AWS."
+    ),
+    "structured_data": {"skills": ["Kafka"]},
+}
+
+
+def test_fit_inputs_and_features():
+    inputs = fit_inputs(RESUME, JOB)
+
+    assert {"python", "apache spark", "amazon web services"} <= set(
+        inputs["resume_skills"]
+    )
+    assert (
+        "apache kafka" in inputs["job_skills"]
+        and "apache kafka" not in inputs["resume_skills"]
+    )
+    assert (inputs["years_experience"], inputs["required_years"]) == (6.0, 5.0)
+
+    features = dict(zip(FEATURE_NAMES, feature_vector(inputs, 0.4)))
+    assert features["missing_skills"] == 1
+    assert 0 < features["skill_coverage"] < 1
+    assert features["experience_gap"] == 1.0
+    assert features["text_similarity"] == 0.4
+
+
+def test_mentioned_years_ignores_dates():
+    assert mentioned_years("2015 - 2021, 3-5 years preferred, 10+ yrs total") == 10.0
+    assert mentioned_years("") == 0.0
+
+
+def test_train_predicts_ordered_interval():
+    pytest.importorskip("sklearn")
+    examples = [
+        {"inputs": fit_inputs(RESUME, JOB), "fit_score": 85},
+        {
+            "inputs": fit_inputs({"markdown_content": "Pastry chef, 2 years"}, JOB),
+            "fit_score": 10,
+        },
+    ] * 20
+    bundle = train(examples)
+    strong, weak = predict(bundle, [examples[0]["inputs"], examples[1]["inputs"]])
+    assert strong["lower"] <= strong["score"] <= strong["upper"]
+    assert strong["score"] > weak["score"]
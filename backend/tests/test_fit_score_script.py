@@ -0,0 +1,53 @@
+import importlib
+import json
+import pytest
+from app.services.llm_batch import BatchRunner, LocalBatchBackend
+
+fit_score = importlib.import_module("app.scripts.02-fit-score")
+
+
+async def respond(body):
+    resume = json.loads(body["messages"][-1]["content"].split("\n\n", 1)[1])
+    return {
+        "choices": [
+            {
+                "message": {
+                    "role": "assistant",
+                    "content": json.dumps({"score": resume["score"]}),
+                }
+            }
+        ]
+    }
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    for name in ("JOB_DESC_DIR", "RESUME_DIR", "OUTPUT_DIR", "MANIFEST_DIR"):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setattr(fit_score, name, str(path))
+    (tmp_path / "job_desc_dir" / "jd.json").write_text(
+        json.dumps({"title": "Data Engineer"})
+    )
+    for score in (1, 2):
+        (tmp_path / "resume_dir" / f"r{score}.json").write_text(
+            json.dumps({"score": score})
+        )
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_local_batch_is_collected_through_its_runner(dirs):
+    runner = BatchRunner(LocalBatchBackend(str(dirs), respond), str(dirs))
+    manifest = await fit_score.submit_batch(
+        fit_score.fit_score_pairs(["jd.json"]), "m", "local", runner
+    )
+
+    # A fresh backend never sees the batch make progress
+    with pytest.raises(ValueError, match="local batch"):
+        await fit_score.collect_batch(manifest, poll_seconds=0.01)
+
+    await fit_score.collect_batch(manifest, poll_seconds=0.01, runner=runner)
+    for score in (1, 2):
+        output = dirs / "output_dir" / f"fit_score_r{score}.json"
+        assert json.loads(output.read_text()) == {"score": score}
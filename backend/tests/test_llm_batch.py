@@ -0,0 +1,43 @@
+import json
+import pytest
+from app.services.llm_batch import (
+    BatchRunner,
+    LocalBatchBackend,
+    chat_request,
+    completion_content,
+)
+
+
+async def respond(body):
+    content = body["messages"][-1]["content"]
+    if content == "fail":
+        raise RuntimeError("model unavailable")
+    return {
+        "choices": [
+            {"message": {"role": "assistant", "content": json.dumps({"echo": content})}}
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_local_batch_splits_polls_and_fans_out(tmp_path, monkeypatch):
+    runner = BatchRunner(LocalBatchBackend(str(tmp_path), respond), str(tmp_path))
+    monkeypatch.setattr(runner, "max_requests", 2)
+    requests = [
+        chat_request(
+            f"pair-{index}",
+            {"model": "m", "messages": [{"role": "user", "content": content}]},
+        )
+        for index, content in enumerate(["a", "fail", "c"])
+    ]
+
+    results = await runner.run(requests, "fit-score", poll_seconds=0.01, timeout=5)
+
+    assert sorted(path.name for path in tmp_path.glob("fit-score-*.jsonl")) == [
+        "fit-score-000.jsonl",
+        "fit-score-001.jsonl",
+    ]
+    assert set(results) == {"pair-0", "pair-1", "pair-2"}
+    assert json.loads(completion_content(results["pair-2"])) == {"echo": "c"}
+    with pytest.raises(ValueError, match="model unavailable"):
+        completion_content(results["pair-1"])
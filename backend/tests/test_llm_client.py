@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.services.llm_client import HedgeBudget, LatencyTracker, LLMClient
+
+
+class FakeCompletions:
+    """Answers each call after the next delay in `delays`."""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.started = 0
+        self.cancelled = 0
+
+    async def create(self, **request):
+        call = self.started
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delays[call])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"completion {call}"
+
+
+def client_with(delays, samples=0, latency=0.05, budget=1.0):
+    client = LLMClient("test-key")
+    completions = FakeCompletions(delays)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    client.budget = HedgeBudget(budget)
+    for _ in range(samples):
+        client.latencies.record("score:m", latency)
+    return client, completions
+
+
+@pytest.fixture(autouse=True)
+def hedge_settings(monkeypatch):
+    from app.services import llm_client
+
+    monkeypatch.setattr(llm_client.settings, "LLM_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(llm_client.settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.0)
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_and_primary_is_cancelled():
+    client, completions = client_with([1.0, 0.01], samples=10)
+    assert await client.chat(task="score", hedge=True, model="m") == "completion 1"
+    await asyncio.sleep(0)
+    assert completions.cancelled == 1
+    assert client.counters["hedges"] == client.counters["hedges_won"] == 1
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_latency_history_or_budget():
+    client, completions = client_with([0.1], samples=2)
+    assert await client.chat(task="score", hedge=True, model="m") == "completion 0"
+
+    client, completions = client_with([0.1], samples=10, budget=0.0)
+    assert await client.chat(task="score", hedge=True, model="m") == "completion 0"
+    assert completions.started == 1 and client.counters["hedges"] == 0
+
+
+def test_latency_percentile_and_budget():
+    latencies = LatencyTracker(window=100)
+    for seconds in range(1, 201):
+        latencies.record("k", seconds)
+    assert latencies.percentile("k", 95) == 196
+    assert latencies.percentile("k", 95, min_samples=101) is None
+
+    budget = HedgeBudget(0.5)
+    budget.earn()
+    assert not budget.try_spend()
+    budget.earn()
+    assert budget.try_spend() and not budget.try_spend()
+
+
+def test_route_by_prompt_size_and_load(monkeypatch):
+    from app.services import llm_client
+
+    monkeypatch.setattr(llm_client.settings, "OPENAI_MODEL", "small")
+    monkeypatch.setattr(llm_client.settings, "OPENAI_LARGE_MODEL", "large")
+    monkeypatch.setattr(
+        llm_client.settings,
+        "LLM_ROUTES",
+        {
+            "score": [
+                {"tier": "default", "max_prompt_tokens": 1000},
+                {"tier": "large", "max_in_flight": 2, "max_p95_seconds": 10},
+            ],
+            "parse": [{"model": "parser"}],
+        },
+    )
+    client = LLMClient("test-key")
+    assert client.route("score", 500) == ("small", 0)
+    assert client.route("score", 5000) == ("large", 1)
+    assert client.route("parse", 5000) == ("parser", 0)
+    assert client.route("unknown", 10) == ("small", None)
+
+    client.in_flight["large"] = 2
+    assert client.route("score", 5000) == ("small", None)
+    client.in_flight["large"] = 0
+    for _ in range(10):
+        client.latencies.record("score:large", 30.0)
+    assert client.route("score", 5000) == ("small", None)
+
+
+def test_prompt_prefix_is_shared_and_cached_tokens_recorded():
+    from app.services.analysis_service import (
+        fit_score_messages,
+        job_description_text,
+        resume_text,
+    )
+
+    job = {
+        "markdown_content": "# Data Engineer\r\nSpark  \r\n",
+        "original_text": "summary v1",
+    }
+    reparsed_job = {**job, "original_text": "summary v2"}
+    first = fit_score_messages(
+        job_description_text(job), resume_text({"markdown_content": "Ada"})
+    )
+    second = fit_score_messages(
+        job_description_text(reparsed_job), resume_text({"markdown_content": "Bob"})
+    )
+    assert first[:-1] == second[:-1]
+    assert first[1]["content"] == "Job description:\n\n# Data Engineer\nSpark"
+    assert first[-1]["content"] == "Resume:\n\nAda"
+
+    client = LLMClient("test-key")
+    usage = SimpleNamespace(
+        prompt_tokens=2000, prompt_tokens_details=SimpleNamespace(cached_tokens=1536)
+    )
+    client._record_usage("score:m", SimpleNamespace(usage=usage))
+    client._record_usage("score:m", SimpleNamespace(usage=None))
+    assert client.stats()["usage"] == {
+        "score:m": {"calls": 1, "prompt_tokens": 2000, "cached_tokens": 1536}
+    }
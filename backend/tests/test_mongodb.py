@@ -0,0 +1,94 @@
+import asyncio
+import json
+import pytest
+from app.db import mongodb
+
+
+class FakeAdmin:
+    def __init__(self, client):
+        self.client = client
+
+    async def command(self, name):
+        self.client.active += 1
+        self.client.most_active = max(self.client.most_active, self.client.active)
+        await asyncio.sleep(0.01)
+        self.client.active -= 1
+        if self.client.error:
+            raise self.client.error
+        return {"ok": 1}
+
+
+class FakeClient:
+    def __init__(self, url, **options):
+        self.url = url
+        self.options = options
+        self.admin = FakeAdmin(self)
+        self.active = 0
+        self.most_active = 0
+        self.error = None
+        self.closed = False
+
+    def __getitem__(self, name):
+        return {"name": name}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for field in ("client", "db", "healthy", "last_ping", "last_ping_ms", "last_error"):
+        monkeypatch.setattr(mongodb.db, field, getattr(mongodb.MongoDB, field))
+    monkeypatch.setattr(mongodb, "AsyncIOMotorClient", FakeClient)
+    monkeypatch.setattr(mongodb.settings, "MONGODB_WARMUP_CONNECTIONS", 4)
+    monkeypatch.setattr(mongodb.settings, "MONGODB_SOCKET_TIMEOUT_MS", 0)
+    return mongodb.db
+
+
+@pytest.mark.asyncio
+async def test_connect_configures_the_pool_and_warms_it_up(client):
+    await mongodb.connect_to_mongo()
+
+    options = client.client.options
+    assert options["maxPoolSize"] == mongodb.settings.MONGODB_MAX_CONNECTIONS
+    assert (
+        options["serverSelectionTimeoutMS"]
+        == mongodb.settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS
+    )
+    # 0 means no socket timeout, which the driver spells None
+    assert options["socketTimeoutMS"] is None
+    assert client.client.most_active == 4
+    assert client.healthy and client.last_ping_ms is not None
+    assert client.db == {"name": mongodb.settings.MONGODB_DB_NAME}
+
+
+@pytest.mark.asyncio
+async def test_ping_records_failures_without_raising(client):
+    await mongodb.connect_to_mongo()
+    client.client.error = ConnectionError("no servers available")
+
+    assert await mongodb.ping() is False
+    assert mongodb.health()["last_error"] == "no servers available"
+
+    client.client.error = None
+    assert await mongodb.ping() is True
+    assert mongodb.health()["last_error"] is None
+
+
+@pytest.mark.asyncio
+async def test_ready_reports_mongodb_state(client):
+    from app.main import readiness_check
+
+    await mongodb.connect_to_mongo()
+    ready = await readiness_check()
+    assert ready.status_code == 200
+
+    await mongodb.close_mongo_connection()
+    unavailable = await readiness_check()
+    assert unavailable.status_code == 503
+    assert json.loads(unavailable.body)["status"] == "unavailable"
+
+
+def test_collections_need_a_connection(client):
+    with pytest.raises(RuntimeError):
+        mongodb.get_collection("resumes")
@@ -0,0 +1,38 @@
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from app.services.pagination import (
+    InvalidCursorError,
+    cursor_for,
+    decode_cursor,
+    keyset_filter,
+)
+import pytest
+
+
+def test_cursor_round_trip_keeps_bson_types():
+    doc = {"_id": ObjectId(), "score": 1.5}
+    sort = [("score", DESCENDING), ("_id", ASCENDING)]
+
+    assert decode_cursor(cursor_for(doc, sort)) == [1.5, doc["_id"]]
+
+
+def test_keyset_filter_expands_to_lexicographic_or():
+    oid = ObjectId()
+    sort = [("score", DESCENDING), ("_id", ASCENDING)]
+    token = cursor_for({"_id": oid, "score": 2.0}, sort)
+
+    assert keyset_filter(sort, token) == {
+        "$or": [
+            {"score": {"$lt": 2.0}},
+            {"score": 2.0, "_id": {"$gt": oid}},
+        ]
+    }
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(InvalidCursorError):
+        keyset_filter(
+            [("_id", ASCENDING)], cursor_for({"_id": 1, "x": 2}, [("x", 1), ("_id", 1)])
+        )
@@ -0,0 +1,35 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.services.parser_service import ParserService
+
+
+class FakeLlamaParse:
+    async def aload_data(self, file, extra_info=None):
+        await asyncio.sleep(0)
+        return [SimpleNamespace(text=f"# {extra_info['file_name']}\n\nPython, Spark")]
+
+
+class FakeLLM:
+    async def chat(self, task, **request):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="summary"))]
+        )
+
+
+@pytest.mark.asyncio
+async def test_parses_on_the_running_loop_without_patching_it():
+    parser = ParserService.__new__(ParserService)
+    parser.llama_parser = FakeLlamaParse()
+    parser.client = FakeLLM()
+
+    result = await parser.parse_document(("cv.pdf", b"%PDF-1.7"), is_resume=True)
+
+    assert result == {
+        "filename": "cv.pdf",
+        "original_text": "summary",
+        "markdown_content": "# cv.pdf\n\nPython, Spark",
+        "structured_data": {},
+    }
+    # nest_asyncio marks the loops it patches; uvloop loops cannot be patched at all
+    assert not getattr(asyncio.get_running_loop(), "_nest_patched", False)
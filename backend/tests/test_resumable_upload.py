@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import pytest
+from app.services.resumable_upload import (
+    DigestMismatch,
+    IncompleteUpload,
+    OffsetMismatch,
+    ResumableUploadService,
+    UploadBusy,
+    UploadTooLarge,
+)
+from app.services import resumable_upload
+from app.services.storage_backends import MemoryStorageBackend
+from app.services.storage_service import StorageService
+from app.services.upload_catalog import MemoryUploadCatalog
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    storage = StorageService()
+    monkeypatch.setattr(storage, "backend", MemoryStorageBackend())
+    monkeypatch.setattr(storage, "catalog", MemoryUploadCatalog())
+    return ResumableUploadService(str(tmp_path), storage)
+
+
+@pytest.mark.asyncio
+async def test_resumes_from_reached_offset(uploads):
+    content = b"%PDF-1.7 scanned pages"
+    upload = await uploads.create(
+        "scan.pdf", len(content), "application/pdf", hashlib.sha256(content).hexdigest()
+    )
+
+    await uploads.append(upload["upload_id"], 0, chunks(content[:5], content[5:9]))
+    # A retry of the first chunk is refused with the offset to resume from
+    with pytest.raises(OffsetMismatch) as mismatch:
+        await uploads.append(upload["upload_id"], 0, chunks(content[:9]))
+    assert mismatch.value.offset == 9
+    with pytest.raises(IncompleteUpload):
+        await uploads.finalize(upload["upload_id"])
+    with pytest.raises(UploadTooLarge):
+        await uploads.append(upload["upload_id"], 9, chunks(content[9:] + b"extra"))
+
+    assert (await uploads.status(upload["upload_id"]))["offset"] == 9
+    await uploads.append(upload["upload_id"], 9, chunks(content[9:]))
+    stored = await uploads.finalize(upload["upload_id"])
+
+    assert await uploads.storage.get_file(stored["file_id"]) == ("scan.pdf", content)
+    with pytest.raises(FileNotFoundError):
+        await uploads.status(upload["upload_id"])
+
+
+@pytest.mark.asyncio
+async def test_digest_mismatch_discards_upload(uploads):
+    upload = await uploads.create("cv.pdf", 3, digest="0" * 64)
+    await uploads.append(upload["upload_id"], 0, chunks(b"abc"))
+    with pytest.raises(DigestMismatch):
+        await uploads.finalize(upload["upload_id"])
+    with pytest.raises(FileNotFoundError):
+        await uploads.status(upload["upload_id"])
+    with pytest.raises(FileNotFoundError):
+        await uploads.status("../../etc/passwd")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("has_fcntl", [True, False])
+async def test_concurrent_append_is_refused(uploads, monkeypatch, has_fcntl):
+    if not has_fcntl:
+        # As on Windows
+        monkeypatch.setattr(resumable_upload, "fcntl", None)
+    upload = await uploads.create("cv.pdf", 6)
+    release = asyncio.Event()
+
+    async def slow_chunks():
+        yield b"abc"
+        await release.wait()
+        yield b"def"
+
+    first = asyncio.create_task(uploads.append(upload["upload_id"], 0, slow_chunks()))
+    await asyncio.sleep(0.05)
+    with pytest.raises(UploadBusy):
+        await uploads.append(upload["upload_id"], 0, chunks(b"abcdef"))
+    release.set()
+    await first
+
+    stored = await uploads.finalize(upload["upload_id"])
+    assert await uploads.storage.get_file(stored["file_id"]) == ("cv.pdf", b"abcdef")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("has_fcntl", [True, False])
+async def test_abort_and_expiry_wait_for_writers(uploads, monkeypatch, has_fcntl):
+    if not has_fcntl:
+        monkeypatch.setattr(resumable_upload, "fcntl", None)
+    uploads.expiry = -uploads.expiry
+    upload = await uploads.create("cv.pdf", 6)
+    release = asyncio.Event()
+
+    async def slow_chunks():
+        yield b"abc"
+        await release.wait()
+
+    writer = asyncio.create_task(uploads.append(upload["upload_id"], 0, slow_chunks()))
+    await asyncio.sleep(0.05)
+    with pytest.raises(UploadBusy):
+        await uploads.abort(upload["upload_id"])
+    assert await uploads.expire() == 0
+    release.set()
+    await writer
+
+    assert await uploads.expire() == 1
+    with pytest.raises(FileNotFoundError):
+        await uploads.abort(upload["upload_id"])
+
+
+def test_aborting_an_unknown_upload_is_404(uploads, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.v1.endpoints import uploads as endpoint
+
+    monkeypatch.setattr(endpoint, "resumable_uploads", uploads)
+    app = FastAPI()
+    app.include_router(endpoint.router)
+
+    assert TestClient(app).delete(f"/resumable/{'0' * 32}").status_code == 404
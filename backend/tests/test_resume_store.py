@@ -0,0 +1,54 @@
+from app.services.resume_store import build_resume_document, mentioned_location
+
+MARKDOWN = """# Jane Smith
+**Location:** Bangkok, Thailand | jane@example.com
+
+## Experience
+Senior Data Engineer, Acme (2018 - Present)
+Built Apache Spark and Kafka pipelines on AWS.
+"""
+
+SUMMARY = """### Candidate Summary Report
+#### **Name**: Jane Smith
+### **Professional Summary**
+Data engineer with 7 years of experience in Python and Spark.
+"""
+
+
+def test_parser_service_result_maps_to_searchable_fields():
+    parsed = {
+        "filename": "jane.pdf",
+        "original_text": SUMMARY,
+        "markdown_content": MARKDOWN,
+        "structured_data": {},
+    }
+
+    document = build_resume_document("file-1", "jane.pdf", parsed)
+
+    assert document["location"] == "Bangkok, Thailand"
+    assert document["total_experience"] == 7.0
+    assert {"apache spark", "apache kafka", "python"} <= set(
+        document["skills_normalized"]
+    )
+    # The parse result itself is not mistaken for structured data
+    assert document["processed_data"]["structured_data"] == {}
+    assert document["processed_data"]["markdown_content"] == MARKDOWN
+
+
+def test_resume_output_dump_keeps_its_structured_fields():
+    parsed = {
+        "contact_info": {"name": "Jane Smith", "address": "Chiang Mai"},
+        "work_experience": [{"dates": {"start": "2019-01", "end": "2021-01"}}],
+        "skills": ["Python"],
+    }
+
+    document = build_resume_document("file-2", "jane.json", parsed)
+
+    assert document["title"] == "Jane Smith"
+    assert document["location"] == "Chiang Mai"
+    assert document["total_experience"] == 2.0
+
+
+def test_unknown_locations_are_not_stored():
+    assert mentioned_location("📍 **Address**: Not Provided") is None
+    assert mentioned_location("no labelled location here") is None
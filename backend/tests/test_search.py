@@ -0,0 +1,103 @@
+import pytest
+from bson import ObjectId
+from app.services import search
+from app.services.pagination import InvalidCursorError, encode_cursor
+from app.services.search import SKILL_RANK_SORT, SearchService
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return self.documents
+
+
+class FakeCollection:
+    def __init__(self, output):
+        self.output = output
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeCursor([self.output])
+
+
+async def run_search(output, limit=10):
+    collection = FakeCollection(output)
+    response = await SearchService()._search(
+        collection, {}, SKILL_RANK_SORT, 1, limit, None
+    )
+    return collection.pipelines[0][-1]["$facet"], response
+
+
+@pytest.mark.asyncio
+async def test_total_is_exact_below_count_limit(monkeypatch):
+    monkeypatch.setattr(search.settings, "SEARCH_EXACT_TOTAL_LIMIT", 100)
+    facet, response = await run_search({"results": [], "total": [{"count": 42}]})
+
+    assert facet["total"] == [{"$limit": 101}, {"$count": "count"}]
+    assert response["total"] == 42
+    assert response["total_at_least"] is None
+    assert response["pages"] == 5
+
+
+@pytest.mark.asyncio
+async def test_capped_count_is_reported_as_lower_bound(monkeypatch):
+    monkeypatch.setattr(search.settings, "SEARCH_EXACT_TOTAL_LIMIT", 100)
+    _, response = await run_search({"results": [], "total": [{"count": 101}]})
+
+    assert response["total"] is None
+    assert response["total_at_least"] == 101
+    assert response["pages"] is None
+
+
+@pytest.mark.asyncio
+async def test_no_matches_counts_zero():
+    _, response = await run_search({"results": [], "total": []})
+
+    assert response["total"] == 0
+    assert response["total_at_least"] is None
+
+
+@pytest.mark.asyncio
+async def test_skill_search_ranks_by_weighted_coverage(monkeypatch):
+    collection = FakeCollection(
+        {"results": [], "total": [], "skills": [], "location": [], "experience": []}
+    )
+    monkeypatch.setattr(
+        SearchService, "resume_collection", property(lambda self: collection)
+    )
+    monkeypatch.setattr(search.skill_index, "ready", False)
+
+    await SearchService().search_by_skills(
+        ["Python", "ReactJS"],
+        must_have=["Golang"],
+        min_match=2,
+        skill_weights={"python": 3},
+    )
+    pipeline = collection.pipelines[0]
+
+    assert pipeline[0] == {
+        "$match": {
+            "skills_normalized": {"$in": ["python", "react", "go"], "$all": ["go"]}
+        }
+    }
+    coverage = pipeline[2]["$addFields"]["coverage"]["$round"][0]["$divide"]
+    assert [term["$cond"][1] for term in coverage[0]["$add"]] == [3, 1.0, 1.0]
+    assert coverage[1] == 5.0
+    assert pipeline[3] == {"$match": {"match_count": {"$gte": 2}}}
+    assert pipeline[-1]["$facet"]["results"][0] == {"$sort": dict(SKILL_RANK_SORT)}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "values",
+    [["0.5", 1, ObjectId()], [0.5, None, ObjectId()], [0.5, 1, "id"], [0.5, 1]],
+)
+async def test_skill_index_rejects_malformed_cursors(monkeypatch, values):
+    monkeypatch.setattr(search.skill_index, "ready", True)
+    monkeypatch.setattr(search.skill_index, "rank", lambda *args: [])
+
+    with pytest.raises(InvalidCursorError):
+        await SearchService().search_by_skills(["Python"], cursor=encode_cursor(values))
@@ -0,0 +1,80 @@
+from datetime import timedelta
+import time
+import pytest
+from app.core import security
+from app.core.security import TokenCache
+
+
+def test_token_cache_respects_exp():
+    cache = TokenCache(max_size=10, ttl=300)
+    cache.put("live", {"sub": "a", "exp": time.time() + 60})
+    cache.put("expired", {"sub": "b", "exp": time.time() - 1})
+
+    assert cache.get("live")["sub"] == "a"
+    assert cache.get("expired") is None
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2, ttl=300)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_verify_token_caches_payload(monkeypatch):
+    monkeypatch.setattr(security.settings, "JWT_SECRET_KEY", "test-secret-" + "x" * 20)
+    security.token_cache.clear()
+    token = security.create_access_token({"sub": "user"}, timedelta(minutes=5))
+
+    assert security.verify_token(token)["sub"] == "user"
+    assert len(security.token_cache) == 1
+    assert security.verify_token(token + "x") is None
+    assert len(security.token_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_password_helpers():
+    hashed = await security.get_password_hash_async("s3cret")
+    assert await security.verify_password_async("s3cret", hashed)
+    assert not await security.verify_password_async("wrong", hashed)
+
+
+def test_tokens_expire_after_15_minutes_by_default(monkeypatch):
+    from jose import jwt
+
+    monkeypatch.setattr(security.settings, "JWT_SECRET_KEY", "s" * 32)
+    token = security.create_access_token({"sub": "user"})
+    payload = jwt.decode(
+        token,
+        security.settings.JWT_SECRET_KEY,
+        algorithms=[security.settings.ALGORITHM],
+    )
+    assert 14 * 60 < payload["exp"] - time.time() <= 15 * 60 + 1
+
+
+def test_tokens_need_a_secret_key(monkeypatch):
+    from jose import jwt
+
+    monkeypatch.setattr(security.settings, "JWT_SECRET_KEY", "")
+    security.token_cache.clear()
+    forged = jwt.encode(
+        {"sub": "admin", "exp": time.time() + 60}, "", algorithm="HS256"
+    )
+
+    assert security.verify_token(forged) is None
+    assert len(security.token_cache) == 0
+    with pytest.raises(security.MissingSecretKey):
+        security.create_access_token({"sub": "user"})
+
+
+def test_short_secret_keys_are_rejected():
+    from pydantic import ValidationError
+    from app.core.config import Settings
+
+    with pytest.raises(ValidationError):
+        Settings(_env_file=None, JWT_SECRET_KEY="your-secret-key-here")
+    assert Settings(_env_file=None, JWT_SECRET_KEY="k" * 32).JWT_SECRET_KEY == "k" * 32
@@ -0,0 +1,41 @@
+from app import serve
+
+
+def test_defaults_fall_back_without_optional_packages():
+    assert serve.default_workers() >= 1
+    assert serve.event_loop() in ("uvloop", "asyncio")
+    assert serve.http_protocol() in ("httptools", "h11")
+
+
+def test_in_memory_storage_is_not_worker_safe(monkeypatch):
+    monkeypatch.setattr(serve.settings, "STORAGE_BACKEND", "memory")
+    assert serve.worker_safety_problems(1) == []
+    assert serve.worker_safety_problems(4)
+
+    monkeypatch.setattr(serve.settings, "STORAGE_BACKEND", "local")
+    assert serve.worker_safety_problems(4) == []
+
+
+def test_default_workers_fall_back_to_one_without_shared_storage(monkeypatch):
+    monkeypatch.setattr(serve, "default_workers", lambda: 8)
+    monkeypatch.setattr(serve.settings, "STORAGE_BACKEND", "memory")
+    assert serve.resolve_workers(None) == 1
+    # Explicit counts are kept, and refused by the safety check instead
+    assert serve.resolve_workers(4) == 4
+
+    monkeypatch.setattr(serve.settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(serve.settings, "STORAGE_CATALOG", "")
+    assert serve.resolve_workers(None) == 8
+
+
+def test_app_never_patches_the_event_loop():
+    # uvloop is picked whenever it is installed, and nest_asyncio fails on its loops
+    from pathlib import Path
+
+    app_dir = Path(serve.__file__).parent
+    patching = [
+        str(path.relative_to(app_dir))
+        for path in app_dir.rglob("*.py")
+        if "nest_asyncio.apply" in path.read_text(encoding="utf-8")
+    ]
+    assert patching == []
@@ -0,0 +1,73 @@
+from collections import Counter
+from datetime import datetime, timedelta
+import random
+from app.services.sketches import DailySketches, HyperLogLog, SpaceSaving
+
+
+def test_space_saving_is_exact_under_capacity():
+    sketch = SpaceSaving(capacity=10)
+    for skill in ["python", "sql", "python", "go", "python", "sql"]:
+        sketch.add(skill)
+
+    assert [(row["_id"], row["count"], row["error"]) for row in sketch.top(2)] == [
+        ("python", 3, 0),
+        ("sql", 2, 0),
+    ]
+
+
+def test_space_saving_bounds_heavy_hitter_error():
+    random.seed(7)
+    stream = ["python"] * 500 + ["sql"] * 300 + [f"skill-{i}" for i in range(2000)]
+    random.shuffle(stream)
+    sketch = SpaceSaving(capacity=50)
+    for skill in stream:
+        sketch.add(skill)
+
+    true_counts = Counter(stream)
+    top = sketch.top(2)
+    assert [row["_id"] for row in top] == ["python", "sql"]
+    for row in top:
+        assert row["count"] - row["error"] <= true_counts[row["_id"]] <= row["count"]
+        assert row["error"] <= len(stream) / 50
+
+
+def test_merge_and_round_trip():
+    monday, tuesday = SpaceSaving(capacity=5), SpaceSaving(capacity=5)
+    for skill in ["python", "sql", "python"]:
+        monday.add(skill)
+    for skill in ["python", "go"]:
+        tuesday.add(skill)
+
+    merged = SpaceSaving.from_document(monday.to_document()).merge(tuesday)
+    assert {row["_id"]: row["count"] for row in merged.top(5)} == {
+        "python": 3,
+        "sql": 1,
+        "go": 1,
+    }
+
+
+def test_daily_sketches_merge_window():
+    sketches = DailySketches(
+        "test", factory=lambda: SpaceSaving(10), load=SpaceSaving.from_document
+    )
+    now = datetime.utcnow()
+    sketches.sketch_for(now).add("python", timestamp=now)
+    sketches.sketch_for(now - timedelta(days=1)).add("python")
+    sketches.sketch_for(now - timedelta(days=10)).add("python")
+
+    assert sketches.merged(7).top(1)[0]["count"] == 2
+    assert sketches.merged(30).top(1)[0]["count"] == 3
+    assert sketches.merged(7).top(1)[0]["last_seen"] == now
+
+
+def test_hyperloglog_estimates_and_merges():
+    monday, tuesday = HyperLogLog(), HyperLogLog()
+    for i in range(20000):
+        monday.add(f"user-{i}")
+    for i in range(10000, 40000):
+        tuesday.add(f"user-{i}")
+
+    assert abs(monday.count() - 20000) / 20000 < 0.03
+    union = HyperLogLog.from_document(monday.to_document()).merge(tuesday)
+    assert abs(union.count() - 40000) / 40000 < 0.03
+    assert HyperLogLog().count() == 0
@@ -0,0 +1,78 @@
+from bson import ObjectId
+from app.services.skill_index import SkillIndex
+
+
+def _index(*resumes):
+    index = SkillIndex()
+    for resume in resumes:
+        index.upsert(resume)
+    return index
+
+
+def test_boolean_matching():
+    a, b, c = ObjectId(), ObjectId(), ObjectId()
+    index = _index(
+        {"_id": a, "skills_normalized": ["python", "sql", "docker"]},
+        {"_id": b, "skills_normalized": ["python", "java"]},
+        {"_id": c, "skills_normalized": ["sql"]},
+    )
+
+    assert index.match_all(["python", "sql"]) == [a]
+    assert index.match_any(["java", "sql"]) == [a, b, c]
+    assert index.match_at_least(["python", "sql", "java"], 2) == [a, b]
+
+
+def test_upsert_replaces_postings():
+    a = ObjectId()
+    index = _index({"_id": a, "skills_normalized": ["python"]})
+    index.upsert({"_id": a, "skills_normalized": ["go"]})
+
+    assert index.match_any(["python"]) == []
+    assert index.match_any(["go"]) == [a]
+    index.remove(a)
+    assert index.match_any(["go"]) == [] and len(index) == 0
+
+
+def test_rank_orders_by_coverage_then_count():
+    full, partial, weighted = ObjectId(), ObjectId(), ObjectId()
+    index = _index(
+        {
+            "_id": partial,
+            "skills_normalized": ["python"],
+            "location": "Bangkok",
+            "total_experience": 3,
+        },
+        {
+            "_id": full,
+            "skills_normalized": ["python", "sql", "docker"],
+            "location": "Bangkok",
+            "total_experience": 8,
+        },
+        {
+            "_id": weighted,
+            "skills_normalized": ["docker"],
+            "location": "Remote",
+            "total_experience": 1,
+        },
+    )
+    wanted = ["python", "sql", "docker"]
+
+    ranked = index.rank(wanted, {"docker": 4.0}, must_have=[])
+    assert [item.id for item in ranked] == [full, weighted, partial]
+    assert ranked[0].coverage == 1.0 and ranked[0].match_count == 3
+
+    assert [item.id for item in index.rank(wanted, {}, [], min_match=2)] == [full]
+    assert [
+        item.id
+        for item in index.rank(
+            wanted, {}, ["python"], location="Bangkok", experience_years=5
+        )
+    ] == [full]
+
+    facets = index.facets([item.id for item in ranked], 10, [0, 2, 5, 10, 15])
+    assert facets["location"][0] == {"value": "Bangkok", "count": 2}
+    assert facets["experience"] == [
+        {"value": 0, "count": 1},
+        {"value": 2, "count": 1},
+        {"value": 5, "count": 1},
+    ]
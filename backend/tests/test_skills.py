@@ -0,0 +1,76 @@
+from app.utils.skills import canonicalize_skill, canonicalize_skills
+import pytest
+
+
+def test_synonyms_share_a_canonical_key():
+    assert canonicalize_skills(["JS", "Javascript", "JavaScript (ES6)"]) == [
+        "javascript"
+    ]
+    assert canonicalize_skill("Python 3.11") == "python"
+    assert canonicalize_skill("k8s") == "kubernetes"
+
+
+def test_unknown_skills_are_normalized():
+    assert canonicalize_skill("  Prompt   Engineering ") == "prompt engineering"
+
+
+def test_extractor_finds_canonical_skills_in_markdown():
+    pytest.importorskip("spacy")
+    from app.services.skill_extractor import SkillExtractor
+
+    text = (
+        "## Skills\n- Golang, Postgres\n- CI/CD with GitHub Actions\n\n"
+        "Ready to go live."
+    )
+    assert SkillExtractor().extract(text) == [
+        "go",
+        "postgresql",
+        "ci/cd",
+        "github actions",
+    ]
+
+
+def test_extractor_ignores_ambiguous_short_forms_in_prose():
+    pytest.importorskip("spacy")
+    from app.services.skill_extractor import SkillExtractor
+
+    text = (
+        "John Doe CV. Worked at Shell and Oracle as a PM from Spring 2019, "
+        "on the Node team for UI and UX reviews, then at American Express."
+    )
+    assert SkillExtractor().extract(text) == []
+    # Longer forms still name the skills, and skill lists still map short forms
+    assert SkillExtractor().extract(
+        "Shell scripting, Oracle DB, NodeJS, Spring Boot"
+    ) == ["bash", "oracle database", "node.js", "spring boot"]
+    assert canonicalize_skills(["Node", "Spring", "Oracle"]) == [
+        "node.js",
+        "spring boot",
+        "oracle database",
+    ]
+
+
+def test_extractor_ignores_everyday_words_at_sentence_start():
+    pytest.importorskip("spacy")
+    from app.services.skill_extractor import SkillExtractor
+
+    text = (
+        "React to changes quickly. Rust belt logistics. Swift delivery. "
+        "Go to market plans."
+    )
+    assert SkillExtractor().extract(text) == []
+    assert SkillExtractor().extract("Built with ReactJS and Golang") == ["react", "go"]
+    assert canonicalize_skills(["React", "Go", "Rust", "Swift"]) == [
+        "react",
+        "go",
+        "rust",
+        "swift",
+    ]
+
+
+def test_git_hosting_platforms_are_their_own_skills():
+    assert canonicalize_skills(["Git", "GitHub", "GitLab", "Version Control"]) == [
+        "git",
+        "github",
+        "gitlab",
+    ]
@@ -0,0 +1,130 @@
+import os
+from io import BytesIO
+import pytest
+from fastapi import UploadFile
+from app.services import storage_service as storage_module
+from app.services.storage_backends import (
+    AzureBlobStorageBackend,
+    LocalDiskStorageBackend,
+    MemoryStorageBackend,
+)
+from app.services.upload_catalog import MemoryUploadCatalog
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def check_round_trip(backend):
+    size = await backend.save(
+        "abc123", "résumé.pdf", chunks(b"hello ", b"world"), "application/pdf"
+    )
+
+    assert size == 11
+    assert await backend.metadata("abc123") == {
+        "filename": "résumé.pdf",
+        "size": 11,
+        "content_type": "application/pdf",
+    }
+    streamed = [chunk async for chunk in backend.open("abc123")]
+    assert b"".join(streamed) == b"hello world" and len(streamed) > 1
+    assert await backend.read("abc123") == ("résumé.pdf", b"hello world")
+
+    await backend.delete("abc123")
+    assert not await backend.exists("abc123")
+    with pytest.raises(FileNotFoundError):
+        await backend.read("abc123")
+
+
+@pytest.mark.asyncio
+async def test_memory_backend():
+    await check_round_trip(MemoryStorageBackend(chunk_size=5))
+
+
+@pytest.mark.asyncio
+async def test_local_disk_backend(tmp_path):
+    backend = LocalDiskStorageBackend(str(tmp_path), chunk_size=5)
+    await check_round_trip(backend)
+    with pytest.raises(FileNotFoundError):
+        await backend.metadata("../etc")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not os.environ.get("AZURITE_CONNECTION_STRING"),
+    reason=(
+        "set AZURITE_CONNECTION_STRING (e.g. UseDevelopmentStorage=true) "
+        "to test against Azurite"
+    ),
+)
+async def test_azure_blob_backend():
+    pytest.importorskip("azure.storage.blob")
+    backend = AzureBlobStorageBackend(
+        os.environ["AZURITE_CONNECTION_STRING"], "test-uploads", chunk_size=5
+    )
+    try:
+        await check_round_trip(backend)
+    finally:
+        await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_open_buffer_shares_stored_content(tmp_path):
+    memory = MemoryStorageBackend()
+    await memory.save("a", "cv.pdf", chunks(b"%PDF-1.7 body"))
+    stored = await memory.open_buffer("a")
+    assert stored.buffer.obj is (await memory.read("a"))[1]
+    assert stored.reader().read() == b"%PDF-1.7 body"
+
+    disk = LocalDiskStorageBackend(str(tmp_path))
+    await disk.save("b", "cv.pdf", chunks(b"%PDF-1.7 ", b"body"))
+    with await disk.open_buffer("b") as stored:
+        assert stored.path.endswith("b")
+        assert bytes(stored.buffer[:8]) == b"%PDF-1.7"
+        reader = stored.reader()
+        assert reader.read(4) == b"%PDF" and reader.read() == b"-1.7 body"
+
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_blob(monkeypatch):
+    service = storage_module.StorageService()
+    backend = MemoryStorageBackend()
+    monkeypatch.setattr(service, "backend", backend)
+    monkeypatch.setattr(service, "catalog", MemoryUploadCatalog())
+    monkeypatch.setattr(storage_module.settings, "STORAGE_GC_GRACE_SECONDS", 0)
+
+    first = await service.store(
+        UploadFile(file=BytesIO(b"same resume"), filename="cv.pdf")
+    )
+    second = await service.store(
+        UploadFile(file=BytesIO(b"same resume"), filename="cv (1).pdf")
+    )
+
+    assert first["file_id"] != second["file_id"]
+    assert first["digest"] == second["digest"]
+    assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+    assert len(backend._files) == 1
+    assert await service.get_file(second["file_id"]) == ("cv (1).pdf", b"same resume")
+
+    await service.cleanup_file(first["file_id"])
+    assert await service.collect_garbage() == 0
+    assert not await service.exists(first["file_id"])
+    with await service.open_file(second["file_id"]) as stored:
+        assert (
+            stored.filename == "cv (1).pdf" and bytes(stored.buffer) == b"same resume"
+        )
+
+    await service.cleanup_file(second["file_id"])
+    assert await service.collect_garbage() == 1
+    assert backend._files == {}
+
+
+def test_default_storage_needs_no_database():
+    from app.core.config import Settings
+    from app.services.storage_backends import create_backend
+    from app.services.upload_catalog import create_catalog
+
+    defaults = Settings(_env_file=None)
+    assert isinstance(create_backend(defaults), MemoryStorageBackend)
+    assert isinstance(create_catalog(defaults), MemoryUploadCatalog)